@@ -1,6 +1,15 @@
-from .ai_assistant.chat_processor import FIFAAssistant
-from .services.data_processing import load_and_preprocess_data
-from .services.embeddings import generate_embeddings
-from .ai_assistant.recommendation_engine import TeamRecommender
+from .lazy import lazy_exports
+
+# Las exportaciones se importan al primer uso: cargarlas arrastra pandas,
+# faiss y sentence_transformers/torch aunque sólo se quiera un router
+_EXPORTS = {
+    'FIFAAssistant': '.ai_assistant.chat_processor',
+    'load_and_preprocess_data': '.services.data_processing',
+    'generate_embeddings': '.services.embeddings',
+    'TeamRecommender': '.ai_assistant.recommendation_engine',
+}
+
 __all__ = ['FIFAAssistant', 'load_and_preprocess_data', 'generate_embeddings', 'TeamRecommender']
-__version__ = '1.0.0'
\ No newline at end of file
+__version__ = '1.0.0'
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -1,4 +1,11 @@
-from .chat_processor import FIFAAssistant
-from .recommendation_engine import TeamRecommender
+from app.lazy import lazy_exports
 
-__all__ = ['FIFAAssistant', 'TeamRecommender']
\ No newline at end of file
+# Importación diferida (ver app/__init__.py)
+_EXPORTS = {
+    'FIFAAssistant': '.chat_processor',
+    'TeamRecommender': '.recommendation_engine',
+}
+
+__all__ = ['FIFAAssistant', 'TeamRecommender']
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -1,25 +1,33 @@
-from typing import Dict, Any, List, Optional
-from sentence_transformers import SentenceTransformer
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import re
 import logging
-from app.services.data_processing import filter_by_position
-from .intent_detection import IntentDetector
-from sentence_transformers import SentenceTransformer
-from app.services.data_processing import filter_by_position
-from app.services.embeddings import get_similar_players
+from config import settings
+from .intent_matrix import IntentMatrix, clean_message
+from app.services.metrics import span
+from app.services.session_store import MemorySessionStore, SessionStore
+
+if TYPE_CHECKING:
+    # Sólo para las anotaciones: importar sentence_transformers carga torch
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
 class FIFAAssistant:
-    def __init__(self, df: pd.DataFrame, embedder: SentenceTransformer):
+    def __init__(self, df: pd.DataFrame, embedder: "SentenceTransformer",
+                 model_name: str = settings.MODEL_NAME, intent_cache_dir: Optional[str] = None,
+                 sessions: Optional[SessionStore] = None):
         self.df = df
         self.embedder = embedder
-        self.context: Dict[str, Dict[str, Any]] = {}
-        self.setup_intents()
+        # Contexto de conversación por usuario, acotado y con expiración
+        if sessions is None:
+            sessions = MemorySessionStore(
+                settings.SESSION_TTL_SECONDS, settings.SESSION_MAX_ENTRIES, settings.SESSION_MAX_BYTES
+            )
+        self.sessions = sessions
+        self.setup_intents(model_name, intent_cache_dir)
     
-    def setup_intents(self):
+    def setup_intents(self, model_name: str = settings.MODEL_NAME, cache_dir: Optional[str] = None):
         """Define los patrones de intención y respuestas del asistente"""
         self.intents = {
             'greeting': {
@@ -90,50 +98,47 @@ class FIFAAssistant:
             }
         }
         
-        # Generar embeddings para las intenciones
-        self.intent_embeddings = {}
-        for intent, data in self.intents.items():
-            if 'patterns' in data and data['patterns']:
-                self.intent_embeddings[intent] = self.embedder.encode(data['patterns'])
+        # Matriz de embeddings de las intenciones (persistida y compartida en el proceso)
+        self.intent_matrix = IntentMatrix(self.intents, self.embedder, model_name, cache_dir)
     
-    def detect_intent(self, message: str) -> Optional[str]:
-        """Detecta la intención del mensaje usando similitud semántica"""
-        cleaned_msg = re.sub(r'[^\w\s]', '', message.lower())
-        msg_embedding = self.embedder.encode([cleaned_msg])
-        
-        best_intent = None
-        best_similarity = 0.0
+    def detect_intent(self, message: str, message_embedding: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        Detecta la intención del mensaje usando similitud semántica.
+
+        Si el llamador ya codificó el mensaje normalizado (p. ej. en un lote
+        del BatchingEncoder) puede pasar el vector en `message_embedding`.
+        """
+        if message_embedding is None:
+            message_embedding = self.embedder.encode([clean_message(message)])
         
-        for intent, embeddings in self.intent_embeddings.items():
-            sim = cosine_similarity(msg_embedding, embeddings)
-            max_sim = np.max(sim)
-            
-            if max_sim > best_similarity and max_sim > 0.7:  # Umbral de similitud
-                best_similarity = max_sim
-                best_intent = intent
+        match = self.intent_matrix.best(message_embedding, threshold=0.7)  # Umbral de similitud
         
         # Manejar casos especiales basados en contexto
-        if not best_intent:
+        if not match:
             return None
         
-        return best_intent
+        return match[0]
     
-    def process_message(self, user_id: str, message: str) -> str:
+    def process_message(self, user_id: str, message: str,
+                        message_embedding: Optional[np.ndarray] = None) -> str:
         """Procesa un mensaje del usuario y genera una respuesta apropiada"""
-        if user_id not in self.context:
-            self.context[user_id] = {}
-        
-        # Detectar intención
-        intent = self.detect_intent(message)
+        # Detectar intención (fuera del lock de la sesión: es lo más costoso)
+        with span('chat.detect_intent'):
+            intent = self.detect_intent(message, message_embedding)
         
+        with span('chat.respond'), self.sessions.session(user_id) as context:
+            return self._respond(intent, message, context)
+    
+    def _respond(self, intent: Optional[str], message: str, context: Dict[str, Any]) -> str:
+        """Genera la respuesta y actualiza el contexto de la sesión"""
         # Manejar mensajes basados en contexto si no se detecta intención clara
         if not intent:
-            if 'awaiting_style' in self.context[user_id]:
+            if 'awaiting_style' in context:
                 intent = 'style_description'
-                self.context[user_id]['style'] = message
-            elif 'awaiting_formation' in self.context[user_id]:
+                context['style'] = message
+            elif 'awaiting_formation' in context:
                 intent = 'formation_received'
-                self.context[user_id]['formation'] = message
+                context['formation'] = message
             else:
                 intent = 'unknown'
         
@@ -143,22 +148,22 @@ class FIFAAssistant:
         
         # Generar respuesta
         if responses:
-            response = np.random.choice(responses)
+            response = str(np.random.choice(responses))
             
             # Reemplazar variables en la respuesta
-            if 'style' in self.context[user_id]:
-                response = response.replace('{style}', self.context[user_id]['style'])
-            if 'formation' in self.context[user_id]:
-                response = response.replace('{formation}', self.context[user_id]['formation'])
+            if 'style' in context:
+                response = response.replace('{style}', context['style'])
+            if 'formation' in context:
+                response = response.replace('{formation}', context['formation'])
             
             # Establecer contexto si es necesario
             if 'context_set' in intent_data:
-                self.context[user_id][intent_data['context_set']] = True
+                context[intent_data['context_set']] = True
             
             # Limpiar contexto si se completó una acción
             if intent == 'formation_received':
-                self.context[user_id].pop('awaiting_formation', None)
-                self.context[user_id].pop('awaiting_style', None)
+                context.pop('awaiting_formation', None)
+                context.pop('awaiting_style', None)
             
             return response
         
@@ -166,16 +171,15 @@ class FIFAAssistant:
     
     def is_ready_to_generate_team(self, user_id: str) -> bool:
         """Verifica si hay suficiente contexto para generar un equipo"""
-        user_context = self.context.get(user_id, {})
+        user_context = self.sessions.get(user_id) or {}
         return 'style' in user_context and 'formation' in user_context
     
     def generate_team_from_context(self, user_id: str) -> Dict[str, Any]:
         """Genera un equipo basado en el contexto acumulado"""
-        if user_id not in self.context:
+        ctx = self.sessions.get(user_id)
+        if ctx is None:
             return {"error": "No hay contexto para este usuario"}
         
-        ctx = self.context[user_id]
-        
         if 'style' not in ctx or 'formation' not in ctx:
             return {"error": "Falta información para generar el equipo"}
         
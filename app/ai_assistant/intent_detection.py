@@ -1,9 +1,11 @@
-import re
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
 import logging
-from sklearn.metrics.pairwise import cosine_similarity
+from config import settings
+from .intent_matrix import IntentMatrix, clean_message
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +15,15 @@ class IntentDetector:
     
     Args:
         embedder (SentenceTransformer): Modelo de embeddings para texto
+        model_name (str): Nombre del modelo, parte de la clave de la matriz persistida
+        cache_dir (str): Directorio donde persistir la matriz de intenciones
     """
     
-    def __init__(self, embedder: SentenceTransformer):
+    def __init__(self, embedder: "SentenceTransformer", model_name: str = settings.MODEL_NAME,
+                 cache_dir: Optional[str] = None):
         self.embedder = embedder
         self.intents = self._initialize_intents()
-        self.intent_embeddings = self._generate_intent_embeddings()
+        self.intent_matrix = IntentMatrix(self.intents, embedder, model_name, cache_dir)
     
     def _initialize_intents(self) -> Dict[str, Dict[str, Any]]:
         """Define los patrones de intención y respuestas del asistente"""
@@ -81,20 +86,14 @@ class IntentDetector:
             }
         }
     
-    def _generate_intent_embeddings(self) -> Dict[str, np.ndarray]:
-        """Genera embeddings para todos los patrones de intención"""
-        embeddings = {}
-        for intent, data in self.intents.items():
-            if 'patterns' in data and data['patterns']:
-                embeddings[intent] = self.embedder.encode(data['patterns'])
-        return embeddings
-    
-    def detect_intent(self, message: str) -> Optional[Dict[str, Any]]:
+    def detect_intent(self, message: str,
+                      message_embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
         """
         Detecta la intención en un mensaje del usuario
         
         Args:
             message (str): Mensaje de entrada del usuario
+            message_embedding (np.ndarray): Embedding del mensaje normalizado, si ya se calculó
             
         Returns:
             Dict[str, Any]: Diccionario con la intención detectada y metadata
@@ -102,20 +101,15 @@ class IntentDetector:
         """
         try:
             # Preprocesamiento del mensaje
-            cleaned_msg = re.sub(r'[^\w\s]', '', message.lower())
-            msg_embedding = self.embedder.encode([cleaned_msg])
-            
-            # Búsqueda de intención más similar
-            best_intent = None
-            best_similarity = 0.0
+            msg_embedding = message_embedding
+            if msg_embedding is None:
+                msg_embedding = self.embedder.encode([clean_message(message)])
             
-            for intent, embeddings in self.intent_embeddings.items():
-                sim = np.max(cosine_similarity(msg_embedding, embeddings))
-                if sim > best_similarity and sim > 0.65:  # Umbral de similitud
-                    best_similarity = sim
-                    best_intent = intent
+            # Búsqueda de intención más similar: un único producto matriz-vector
+            match = self.intent_matrix.best(msg_embedding, threshold=0.65)  # Umbral de similitud
             
-            if best_intent:
+            if match:
+                best_intent, best_similarity = match
                 return {
                     'intent': best_intent,
                     'confidence': float(best_similarity),
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INTENT_MATRIX_VERSION = 1
+
+# Matrices ya construidas en este proceso, por clave de contenido
+_memo: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+_memo_lock = threading.Lock()
+
+
+def clean_message(message: str) -> str:
+    """Normalización del mensaje previa a codificarlo (minúsculas, sin puntuación)"""
+    return re.sub(r'[^\w\s]', '', message.lower())
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class IntentMatrix:
+    """
+    Patrones de intención codificados como una única matriz normalizada.
+
+    Cada fila es el embedding L2-normalizado de un patrón y `offsets` marca
+    dónde empieza cada intención, de modo que detectar la intención de un
+    mensaje es un producto matriz-vector seguido de un máximo por segmento.
+    La matriz se persiste en `cache_dir` con una clave derivada del modelo y
+    de los patrones, y se comparte en memoria entre instancias del proceso.
+    """
+
+    def __init__(self, intents: Dict[str, Dict[str, Any]], embedder, model_name: str,
+                 cache_dir: Optional[str] = None):
+        self.labels: List[str] = [
+            intent for intent, data in intents.items() if data.get('patterns')
+        ]
+        patterns = [intents[intent]['patterns'] for intent in self.labels]
+        self.offsets = np.cumsum([0] + [len(p) for p in patterns[:-1]]).astype(np.int64)
+        self.key = self._content_key(model_name, self.labels, patterns)
+        self.path = Path(cache_dir) / f"intents-{self.key[:16]}.npz" if cache_dir else None
+        self.matrix, self.intent_ids = self._load_or_build(embedder, patterns)
+
+    @staticmethod
+    def _content_key(model_name: str, labels: List[str], patterns: List[List[str]]) -> str:
+        payload = json.dumps(
+            {'version': INTENT_MATRIX_VERSION, 'model': model_name,
+             'intents': list(zip(labels, patterns))},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load_or_build(self, embedder, patterns: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        with _memo_lock:
+            if self.key in _memo:
+                return _memo[self.key]
+
+            built = self._load()
+            if built is None:
+                built = self._build(embedder, patterns)
+                self._save(*built)
+            _memo[self.key] = built
+            return built
+
+    def _load(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self.path is None or not self.path.exists():
+            return None
+        try:
+            with np.load(self.path) as data:
+                if str(data['key']) != self.key:
+                    return None
+                logger.info(f"Matriz de intenciones cargada desde {self.path}")
+                return data['matrix'], data['intent_ids']
+        except Exception as e:
+            logger.warning(f"Matriz de intenciones ilegible en {self.path}, se regenera: {str(e)}")
+            return None
+
+    def _build(self, embedder, patterns: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        flat = [pattern for group in patterns for pattern in group]
+        if not flat:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        logger.info(f"Codificando {len(flat)} patrones de {len(self.labels)} intenciones")
+        # Una sola llamada al modelo para todos los patrones
+        matrix = _normalize_rows(embedder.encode(flat))
+        intent_ids = np.repeat(np.arange(len(patterns)), [len(group) for group in patterns])
+        return matrix, intent_ids
+
+    def _save(self, matrix: np.ndarray, intent_ids: np.ndarray):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp.npz')
+            np.savez(tmp_path, matrix=matrix, intent_ids=intent_ids, key=np.array(self.key))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo persistir la matriz de intenciones: {str(e)}")
+
+    def scores(self, message_embedding: np.ndarray) -> np.ndarray:
+        """Similitud coseno máxima del mensaje con los patrones de cada intención"""
+        if not self.labels:
+            return np.zeros(0, dtype=np.float32)
+        query = _normalize_rows(np.asarray(message_embedding).reshape(-1))
+        return np.maximum.reduceat(self.matrix @ query, self.offsets)
+
+    def best(self, message_embedding: np.ndarray, threshold: float) -> Optional[Tuple[str, float]]:
+        """Intención más similar si supera el umbral (ante empates, la primera definida)"""
+        scores = self.scores(message_embedding)
+        if not len(scores):
+            return None
+        best = int(np.argmax(scores))
+        if scores[best] <= threshold:
+            return None
+        return self.labels[best], float(scores[best])
@@ -1,20 +1,104 @@
 
 # seleccion avanzada de equipo 
 
+import json
 import pandas as pd
 import numpy as np
-import faiss
-from typing import Dict, List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import logging
+from app.services.metrics import span
+from app.services.player_store import compact_frame
+from .team_optimizer import GroupCandidates, prune_candidates, solve_team
 
 
 logger = logging.getLogger(__name__)
 
+OPTIMIZERS = ('greedy', 'exact')
+
+# Vecinos semánticos de la descripción que reciben bonificación por similitud
+SEMANTIC_CANDIDATES = 512
+
+# Grupos de candidatos: posiciones del dataset y score compuesto que los ordena
+POSITION_POOLS = {
+    'GK': (('GK',), 'GK_Score'),
+    'CB': (('CB',), 'CB_Score'),
+    'FB': (('LB', 'RB', 'LWB', 'RWB'), 'FB_Score'),
+    'CM': (('CM',), 'CM_Score'),
+    'CAM_CDM': (('CAM', 'CDM'), 'CAM_CDM_Score'),
+    'ST': (('ST', 'LW', 'RW', 'CF'), 'ST_Score'),
+}
+
+# Columnas de la matriz de atributos sobre la que se calculan los scores
+SCORE_ATTRIBUTES = [
+    'Overall', 'Potential', 'Height', 'SprintSpeed', 'Agility', 'Dribbling',
+    'BallControl', 'Jumping', 'Interceptions', 'Marking', 'Crossing',
+    'ShortPassing', 'Positioning', 'Vision', 'Penalties', 'ShotPower',
+    'DefendingTotal', 'PhysicalityTotal', 'ShootingTotal', 'PassingTotal'
+]
+
+def _equal_weights(*attributes: str) -> Dict[str, float]:
+    return {attr: 1.0 for attr in attributes}
+
+# Cada score compuesto es el promedio ponderado de sus atributos
+SCORE_WEIGHTS = {
+    'GK_Score': _equal_weights('Overall', 'Penalties', 'ShotPower'),
+    'CB_Score': _equal_weights('Potential', 'Height', 'ShootingTotal', 'PassingTotal',
+                               'DefendingTotal', 'BallControl', 'Jumping', 'Interceptions',
+                               'Marking'),
+    'FB_Score': _equal_weights('Potential', 'ShootingTotal', 'PassingTotal', 'DefendingTotal',
+                               'BallControl', 'Jumping', 'Interceptions', 'Marking',
+                               'SprintSpeed', 'Agility'),
+    'CM_Score': _equal_weights('Potential', 'ShootingTotal', 'PassingTotal', 'DefendingTotal',
+                               'BallControl', 'Jumping', 'Interceptions', 'Marking', 'Crossing',
+                               'PhysicalityTotal', 'ShortPassing', 'Positioning', 'Vision'),
+    'CAM_CDM_Score': _equal_weights('Potential', 'ShootingTotal', 'PassingTotal',
+                                    'DefendingTotal', 'BallControl', 'Interceptions', 'Marking',
+                                    'Crossing', 'PhysicalityTotal', 'ShortPassing', 'Positioning',
+                                    'Vision', 'SprintSpeed', 'Agility', 'Dribbling'),
+    'ST_Score': _equal_weights('Potential', 'ShootingTotal', 'PassingTotal', 'BallControl',
+                               'Marking', 'PhysicalityTotal', 'ShortPassing', 'Positioning',
+                               'Vision', 'SprintSpeed', 'Agility', 'Dribbling', 'Jumping'),
+}
+
+def weight_matrix(weights: Dict[str, Dict[str, float]]) -> np.ndarray:
+    """Matriz (atributos x scores) a partir de pesos por atributo"""
+    matrix = np.zeros((len(SCORE_ATTRIBUTES), len(weights)))
+    for col, score_weights in enumerate(weights.values()):
+        for attr, weight in score_weights.items():
+            if attr not in SCORE_ATTRIBUTES:
+                raise ValueError(f"Atributo desconocido en los pesos: {attr}")
+            if weight < 0:
+                raise ValueError(f"Los pesos no pueden ser negativos: {attr}={weight}")
+            matrix[SCORE_ATTRIBUTES.index(attr), col] = weight
+    if np.any(matrix.sum(axis=0) <= 0):
+        raise ValueError("Cada perfil de score necesita al menos un peso positivo")
+    return matrix
+
+def weighted_scores(attributes: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Promedio ponderado de atributos con un único producto matricial.
+
+    Un score es NaN si falta alguno de los atributos que usa, igual que al
+    sumar columnas de pandas.
+    """
+    scores = (np.nan_to_num(attributes) @ matrix) / matrix.sum(axis=0)
+    scores[np.isnan(attributes) @ (matrix != 0)] = np.nan
+    return scores
+
+class CandidatePool(NamedTuple):
+    """Candidatos de un grupo de posiciones ordenados por score descendente"""
+    rows: np.ndarray    # posición de cada candidato en self.df
+    ids: np.ndarray
+    values: np.ndarray
+    scores: np.ndarray
+    attributes: np.ndarray  # filas de la matriz de atributos, en el mismo orden
+
 class TeamRecommender:
     def __init__(self, df: pd.DataFrame, embedder, index):
         self.df = self._preprocess_data(df)
         self.embedder = embedder
         self.index = index
+        self._build_candidate_pools()
     
     def _preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
         required_cols = ['ID', 'Name', 'BestPosition', 'Overall', 'ValueEUR', 'Nationality', 
@@ -28,208 +112,477 @@ class TeamRecommender:
         if missing_cols:
             raise ValueError(f"Columnas faltantes: {missing_cols}")
         
-        df = df[required_cols].copy()
-        df = df.dropna(subset=['BestPosition', 'Overall'])
-        df['ValueEUR'] = pd.to_numeric(df['ValueEUR'], errors='coerce').fillna(0)
+        # Sin .copy(): compact_frame arma un DataFrame nuevo con los tipos del
+        # esquema compacto y reutiliza las columnas que ya los tienen
+        df = compact_frame(df[required_cols].dropna(subset=['BestPosition', 'Overall']))
+        if df['ValueEUR'].hasnans:
+            df['ValueEUR'] = df['ValueEUR'].fillna(0)
         
-        # Calcular scores compuestos
-        df['GK_Score'] = (df['Overall'] + df['Penalties'] + df['ShotPower']) / 3
-        df['CB_Score'] = (df['Potential'] + df['Height'] + df['ShootingTotal'] + 
-                         df['PassingTotal'] + df['DefendingTotal'] + df['BallControl'] + 
-                         df['Jumping'] + df['Interceptions'] + df['Marking']) / 9
-        df['FB_Score'] = (df['Potential'] + df['ShootingTotal'] + df['PassingTotal'] + 
-                         df['DefendingTotal'] + df['BallControl'] + df['Jumping'] + 
-                         df['Interceptions'] + df['Marking'] + df['SprintSpeed'] + 
-                         df['Agility']) / 10
-        df['CM_Score'] = (df['Potential'] + df['ShootingTotal'] + df['PassingTotal'] + 
-                         df['DefendingTotal'] + df['BallControl'] + df['Jumping'] + 
-                         df['Interceptions'] + df['Marking'] + df['Crossing'] + 
-                         df['PhysicalityTotal'] + df['ShortPassing'] + df['Positioning'] + 
-                         df['Vision']) / 12
-        df['CAM_CDM_Score'] = (df['Potential'] + df['ShootingTotal'] + df['PassingTotal'] + 
-                              df['DefendingTotal'] + df['BallControl'] + df['Interceptions'] + 
-                              df['Marking'] + df['Crossing'] + df['PhysicalityTotal'] + 
-                              df['ShortPassing'] + df['Positioning'] + df['Vision'] + 
-                              df['SprintSpeed'] + df['Agility'] + df['Dribbling']) / 15
-        df['ST_Score'] = (df['Potential'] + df['ShootingTotal'] + df['PassingTotal'] + 
-                         df['BallControl'] + df['Marking'] + df['PhysicalityTotal'] + 
-                         df['ShortPassing'] + df['Positioning'] + df['Vision'] + 
-                         df['SprintSpeed'] + df['Agility'] + df['Dribbling'] + 
-                         df['Jumping']) / 13
+        # Calcular scores compuestos: matriz de atributos x matriz de pesos
+        attributes = df[SCORE_ATTRIBUTES].to_numpy(dtype=np.float32)
+        scores = weighted_scores(attributes, weight_matrix(SCORE_WEIGHTS)).astype(np.float32)
+        for col, score_col in enumerate(SCORE_WEIGHTS):
+            df[score_col] = scores[:, col]
         
         return df
 
-    def generate_team(self, description: str, formation: str, criteria: Dict, budget: float) -> Dict:
+    def _build_candidate_pools(self):
+        """Precalcula los arrays de candidatos por posición, ordenados por su score"""
+        self._columns = {
+            col: self.df[col].to_numpy()
+            for col in self.df.columns
+            if pd.api.types.is_numeric_dtype(self.df[col])
+        }
+        self._attributes = self.df[SCORE_ATTRIBUTES].to_numpy(dtype=np.float32)
+        self._names = self.df['Name'].to_numpy()
+        self._nationalities = self.df['Nationality'].to_numpy()
+        self._id_to_row = {player_id: row for row, player_id in enumerate(self._columns['ID'].tolist())}
+        self._pools: Dict[Tuple[Tuple[str, ...], str], CandidatePool] = {}
+        for positions, score_col in POSITION_POOLS.values():
+            self._get_pool(positions, score_col)
+
+    def _get_pool(self, pos_filter, score_col: str) -> CandidatePool:
+        """Devuelve (construyéndolo una única vez) el pool de candidatos de un grupo"""
+        key = (tuple(pos_filter), score_col)
+        pool = self._pools.get(key)
+        if pool is None:
+            scores = self._columns[score_col]
+            rows = np.flatnonzero(
+                self.df['BestPosition'].isin(key[0]).to_numpy() & ~np.isnan(scores)
+            )
+            pool = self._sorted_pool(rows, scores[rows])
+            self._pools[key] = pool
+        return pool
+
+    def _request_pool(self, pool_key: str, pools: Optional[Dict[str, CandidatePool]] = None) -> CandidatePool:
+        """Pool de la solicitud (con pesos o semántica propios) o el precalculado"""
+        if pools is not None:
+            return pools[pool_key]
+        return self._get_pool(*POSITION_POOLS[pool_key])
+
+    def _sorted_pool(self, rows: np.ndarray, scores: np.ndarray) -> CandidatePool:
+        # Orden estable: ante empates se respeta el orden del dataset, como nlargest
+        valid = ~np.isnan(scores)
+        rows, scores = rows[valid], scores[valid]
+        order = np.argsort(-scores, kind='stable')
+        rows = rows[order]
+        return CandidatePool(
+            rows=rows,
+            ids=self._columns['ID'][rows],
+            values=self._columns['ValueEUR'][rows],
+            scores=scores[order],
+            attributes=self._attributes[rows],
+        )
+
+    def _weighted_pool(self, pool: CandidatePool, weights: Dict[str, float],
+                       shared: Optional[Dict] = None) -> CandidatePool:
+        """Reordena un pool con pesos propios de la solicitud, sin tocar el DataFrame"""
+        key = ('weights', id(pool), tuple(sorted(weights.items())))
+        if shared is not None and key in shared:
+            return shared[key]
+        scores = weighted_scores(pool.attributes, weight_matrix({'custom': weights}))[:, 0]
+        weighted = self._resorted_pool(pool, scores)
+        if shared is not None:
+            shared[key] = weighted
+        return weighted
+
+    def _resorted_pool(self, pool: CandidatePool, scores: np.ndarray) -> CandidatePool:
+        # Se parte del orden del dataset para desempatar igual que nlargest
+        base = np.argsort(pool.rows, kind='stable')
+        return self._sorted_pool(pool.rows[base], scores[base])
+
+    def _request_pools(self, description: str, score_weights: Optional[Dict[str, Dict[str, float]]],
+                       semantic_weight: float, shared: Optional[Dict] = None) -> Optional[Dict[str, CandidatePool]]:
+        """Pools propios de la solicitud, o None si usa los precalculados"""
+        if not score_weights and not semantic_weight:
+            return None
+        pools = {}
+        for pool_key, (positions, score_col) in POSITION_POOLS.items():
+            pool = self._get_pool(positions, score_col)
+            weights = (score_weights or {}).get(pool_key)
+            pools[pool_key] = self._weighted_pool(pool, weights, shared) if weights else pool
+        if semantic_weight:
+            similarity = self._description_similarity(description, list(pools.values()), shared)
+            pools = {
+                pool_key: self._blended_pool(pool, similarity, semantic_weight, shared)
+                for pool_key, pool in pools.items()
+            }
+        return pools
+
+    def _description_similarity(self, description: str, pools: List[CandidatePool],
+                                shared: Optional[Dict] = None) -> np.ndarray:
+        """
+        Similitud (0-1) de cada fila con la descripción del equipo.
+
+        Una sola codificación y una sola búsqueda por equipo: la consulta se
+        restringe a los candidatos de todos los pools y sólo los
+        SEMANTIC_CANDIDATES más cercanos reciben similitud mayor que cero. Los
+        IDs del índice FAISS son las etiquetas del DataFrame de jugadores.
+        """
+        key = ('semantic', description)
+        if shared is not None and key in shared:
+            return shared[key]
+        # faiss sólo se carga cuando se usa la mezcla semántica
+        import faiss
+        from app.services.vector_index import filtered_search
+
+        rows = np.unique(np.concatenate([pool.rows for pool in pools]))
+        labels = self.df.index.to_numpy()[rows]
+        with span('team.encode'):
+            query = np.asarray(self.embedder.encode([description]), dtype='float32')
+        with span('team.faiss_search'):
+            distances, found = filtered_search(self.index, query, labels, min(SEMANTIC_CANDIDATES, len(rows)))
+
+        similarity = np.zeros(len(self.df))
+        valid = found[0] >= 0
+        if valid.any():
+            closeness = distances[0][valid].astype(np.float64)
+            if self.index.metric_type != faiss.METRIC_INNER_PRODUCT:
+                closeness = -closeness
+            spread = closeness.max() - closeness.min()
+            similarity[self.df.index.get_indexer(found[0][valid])] = (
+                (closeness - closeness.min()) / spread if spread > 0 else 1.0
+            )
+        if shared is not None:
+            shared[key] = similarity
+        return similarity
+
+    def _blended_pool(self, pool: CandidatePool, similarity: np.ndarray, semantic_weight: float,
+                      shared: Optional[Dict] = None) -> CandidatePool:
+        """Reordena el pool por (1 - w) * score + w * 100 * similitud"""
+        key = ('blend', id(pool), id(similarity), semantic_weight)
+        if shared is not None and key in shared:
+            return shared[key]
+        blended = (1 - semantic_weight) * pool.scores + semantic_weight * 100 * similarity[pool.rows]
+        result = self._resorted_pool(pool, blended)
+        if shared is not None:
+            shared[key] = result
+        return result
+
+    def _criteria_columns(self, criteria: Dict) -> List[Tuple[np.ndarray, float]]:
+        """Traduce criterios 'min_<atributo>' a pares (columna, mínimo)"""
+        resolved = []
+        for attr, min_val in criteria.items():
+            col = attr.replace('min_', '').capitalize()
+            if min_val is not None and col in self._columns:
+                resolved.append((self._columns[col], min_val))
+        return resolved
+
+    @staticmethod
+    def _criteria_key(criteria: Dict) -> Tuple:
+        return tuple(sorted((k, v) for k, v in criteria.items() if v is not None))
+
+    def _criteria_positions(self, pool: CandidatePool, criteria: Dict, shared: Dict) -> np.ndarray:
+        """
+        Índices del pool que cumplen los criterios, calculados una vez por lote.
+
+        `shared` vive lo que dura un lote de solicitudes: las que repiten grupo
+        de posiciones y criterios reutilizan la misma máscara.
+        """
+        key = (id(pool), self._criteria_key(criteria))
+        positions = shared.get(key)
+        if positions is None:
+            mask = np.ones(len(pool.rows), dtype=bool)
+            for column, min_val in self._criteria_columns(criteria):
+                mask &= column[pool.rows] >= min_val
+            positions = shared[key] = np.flatnonzero(mask)
+        return positions
+
+    def _first_available(self, pool: CandidatePool, criteria: Dict, budget: float,
+                         used_ids: set, shared: Optional[Dict] = None) -> Optional[int]:
+        """
+        Recorre el pool ordenado y devuelve la posición del primer candidato válido.
+
+        Se evalúa por bloques crecientes, por lo que el costo depende de cuántos
+        candidatos hay que saltar y no del tamaño del dataset.
+        """
+        if shared is None:
+            order, criteria_cols = None, self._criteria_columns(criteria)
+            total = len(pool.rows)
+        else:
+            order, criteria_cols = self._criteria_positions(pool, criteria, shared), []
+            total = len(order)
+        start, size = 0, 16
+        while start < total:
+            stop = min(total, start + size)
+            chunk = np.arange(start, stop) if order is None else order[start:stop]
+            mask = pool.values[chunk] <= budget
+            for column, min_val in criteria_cols:
+                mask &= column[pool.rows[chunk]] >= min_val
+            for position in chunk[mask]:
+                if pool.ids[position] not in used_ids:
+                    return int(position)
+            start, size = stop, size * 2
+        return None
+
+    def _player_from_row(self, row: int, pos_name: str) -> Dict:
+        return {
+            'ID': int(self._columns['ID'][row]),
+            'Name': self._names[row],
+            'Position': pos_name,
+            # Escalares de Python: sumar uint8/float32 del esquema compacto desbordaría o perdería precisión
+            'Overall': int(self._columns['Overall'][row]),
+            'ValueEUR': float(self._columns['ValueEUR'][row]),
+            'Nationality': self._nationalities[row],
+        }
+
+    def _selection_reason(self, pool_key: str, pos_type: str, row: int, score: float) -> str:
+        """Texto que explica por qué se eligió al jugador para el puesto."""
+        if pool_key == 'GK':
+            return f"Mejor portero disponible (GK Score: {score:.2f}) con {self._columns['Overall'][row]} de overall"
+        if pool_key == 'CB':
+            return f"Central (CB Score: {score:.2f}) con buen potencial y habilidades defensivas"
+        if pool_key == 'FB':
+            return f"Lateral ({pos_type}, FB Score: {score:.2f}) con velocidad y habilidad ofensiva/defensiva"
+        if pool_key == 'CM':
+            return f"Mediocentro (CM Score: {score:.2f}) con equilibrio entre ataque y defensa"
+        if pool_key == 'CAM_CDM':
+            role = "Mediocentro ofensivo" if pos_type == 'CAM' else "Mediocentro defensivo"
+            return f"{role} (CAM/CDM Score: {score:.2f}) con habilidades completas"
+        role = {
+            'ST': "Delantero centro",
+            'LW': "Extremo izquierdo", 
+            'RW': "Extremo derecho",
+            'CF': "Mediapunta"
+        }.get(pos_type, pos_type)
+        return f"{role} (ST Score: {score:.2f}) con habilidades ofensivas completas"
+
+    def generate_teams(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Genera varios equipos en un único lote.
+
+        Las solicitudes comparten las máscaras de criterios por grupo de
+        posiciones, y las idénticas se resuelven una sola vez.
+        """
+        shared: Dict = {}
+        solved: Dict[str, Dict] = {}
+        teams = []
+        for request in requests:
+            key = json.dumps(request, sort_keys=True, default=str)
+            if key not in solved:
+                solved[key] = self.generate_team(**request, shared=shared)
+            teams.append(solved[key])
+        return teams
+
+    def generate_team(self, description: str, formation: str, criteria: Dict, budget: float,
+                      optimizer: str = 'greedy', score_weights: Optional[Dict[str, Dict[str, float]]] = None,
+                      semantic_weight: float = 0.0, shared: Optional[Dict] = None) -> Dict:
+        """
+        Genera el equipo para la formación y el presupuesto dados.
+
+        `score_weights` permite reemplazar, por grupo de posiciones (GK, CB, FB,
+        CM, CAM_CDM, ST), los pesos de atributos del score que ordena a los
+        candidatos; se evalúan sobre la matriz de atributos de cada pool.
+
+        Con `semantic_weight` > 0 el score de cada candidato se mezcla con la
+        similitud entre su embedding y el de `description`.
+        """
+        if optimizer not in OPTIMIZERS:
+            raise ValueError(f"Optimizador desconocido: {optimizer}. Opciones: {', '.join(OPTIMIZERS)}")
+        for pool_key, weights in (score_weights or {}).items():
+            if pool_key not in POSITION_POOLS:
+                raise ValueError(f"Grupo de posiciones desconocido: {pool_key}. Opciones: {', '.join(POSITION_POOLS)}")
+            weight_matrix({pool_key: weights})
+        if not 0 <= semantic_weight <= 1:
+            raise ValueError(f"semantic_weight debe estar entre 0 y 1: {semantic_weight}")
         try:
             positions = self._parse_formation(formation)
             if not positions:
                 return self._empty_response(formation, description)
             
-            selected_players = []
-            used_ids = set()
-            remaining_budget = budget
+            with span('team.pools'):
+                pools = self._request_pools(description, score_weights, semantic_weight, shared)
             
-            # 1. Seleccionar portero (GK)
-            gk = self._select_gk(criteria.get('GK', {}), remaining_budget, used_ids)
-            if gk is not None:
-                selected_players.append(gk)
-                used_ids.add(gk['ID'])
-                remaining_budget -= gk['ValueEUR']
+            if optimizer == 'exact':
+                with span('team.select'):
+                    selected_players = self._select_exact(formation, criteria, budget, pools, shared)
+                with span('team.format'):
+                    return self._format_response(selected_players, formation, description)
             
-            # 2. Seleccionar defensores según formación
-            def_players = self._select_defenders(formation, criteria.get('DEF', {}), remaining_budget, used_ids)
-            selected_players.extend(def_players)
-            used_ids.update([p['ID'] for p in def_players])
-            remaining_budget -= sum(p['ValueEUR'] for p in def_players)
+            with span('team.select'):
+                selected_players = []
+                used_ids = set()
+                remaining_budget = budget
             
-            # 3. Seleccionar mediocampistas según formación
-            mid_players = self._select_midfielders(formation, criteria.get('MID', {}), remaining_budget, used_ids)
-            selected_players.extend(mid_players)
-            used_ids.update([p['ID'] for p in mid_players])
-            remaining_budget -= sum(p['ValueEUR'] for p in mid_players)
+                # 1. Seleccionar portero (GK)
+                gk = self._select_gk(criteria.get('GK', {}), remaining_budget, used_ids, pools, shared)
+                if gk is not None:
+                    selected_players.append(gk)
+                    used_ids.add(gk['ID'])
+                    remaining_budget -= gk['ValueEUR']
             
-            # 4. Seleccionar atacantes según formación
-            att_players = self._select_attackers(formation, criteria.get('ATT', {}), remaining_budget, used_ids)
-            selected_players.extend(att_players)
-            used_ids.update([p['ID'] for p in att_players])
-            remaining_budget -= sum(p['ValueEUR'] for p in att_players)
+                # 2. Seleccionar defensores según formación
+                def_players = self._select_defenders(
+                    formation, criteria.get('DEF', {}), remaining_budget, used_ids, pools, shared
+                )
+                selected_players.extend(def_players)
+                used_ids.update([p['ID'] for p in def_players])
+                remaining_budget -= sum(p['ValueEUR'] for p in def_players)
             
-            return self._format_response(selected_players, formation, description)
+                # 3. Seleccionar mediocampistas según formación
+                mid_players = self._select_midfielders(
+                    formation, criteria.get('MID', {}), remaining_budget, used_ids, pools, shared
+                )
+                selected_players.extend(mid_players)
+                used_ids.update([p['ID'] for p in mid_players])
+                remaining_budget -= sum(p['ValueEUR'] for p in mid_players)
+            
+                # 4. Seleccionar atacantes según formación
+                att_players = self._select_attackers(
+                    formation, criteria.get('ATT', {}), remaining_budget, used_ids, pools, shared
+                )
+                selected_players.extend(att_players)
+                used_ids.update([p['ID'] for p in att_players])
+                remaining_budget -= sum(p['ValueEUR'] for p in att_players)
+            
+            with span('team.format'):
+                return self._format_response(selected_players, formation, description)
             
         except Exception as e:
             logger.error(f"Error generando equipo: {str(e)}", exc_info=True)
             return self._empty_response(formation, description)
 
-    def _select_gk(self, criteria: Dict, budget: float, used_ids: set) -> Dict:
+    def _formation_slots(self, formation: str) -> List[Tuple[str, str, str]]:
+        """Puestos de la formación como (línea, grupo de candidatos, posición)."""
+        slots = [('GK', 'GK', 'GK')]
+        slots += [('DEF', 'CB' if pos == 'CB' else 'FB', pos) for pos in self._get_defensive_positions(formation)]
+        slots += [('MID', 'CM' if pos == 'CM' else 'CAM_CDM', pos) for pos in self._get_midfield_positions(formation)]
+        slots += [('ATT', 'ST', pos) for pos in self._get_attacker_positions(formation)]
+        return slots
+
+    def _eligible_rows(self, pool: CandidatePool, criteria: Dict, budget: float,
+                       shared: Optional[Dict] = None) -> np.ndarray:
+        """Índices (dentro del pool) de los candidatos que cumplen criterios y presupuesto."""
+        if shared is not None:
+            positions = self._criteria_positions(pool, criteria, shared)
+            return positions[pool.values[positions] <= budget]
+        mask = pool.values <= budget
+        for column, min_val in self._criteria_columns(criteria):
+            mask &= column[pool.rows] >= min_val
+        return np.flatnonzero(mask)
+
+    def _select_exact(self, formation: str, criteria: Dict, budget: float,
+                      pools: Optional[Dict] = None, shared: Optional[Dict] = None) -> List[Dict]:
+        """
+        Selección óptima global: maximiza la suma de scores de los 11 puestos
+        con el presupuesto como restricción (ver team_optimizer.solve_team).
+        """
+        slots = self._formation_slots(formation)
+        groups = {}
+        for line, pool_key, pos_type in slots:
+            group = groups.setdefault(pool_key, {'line': line, 'positions': []})
+            group['positions'].append(pos_type)
+
+        candidates = {}
+        for pool_key, group in groups.items():
+            pool = self._request_pool(pool_key, pools)
+            line_criteria = criteria.get(group['line'], {})
+            if shared is None:
+                eligible = self._eligible_rows(pool, line_criteria, budget)
+            else:
+                # La poda no depende del presupuesto: se comparte entre las solicitudes del lote
+                key = ('pruned', id(pool), len(group['positions']), self._criteria_key(line_criteria))
+                if key not in shared:
+                    positions = self._criteria_positions(pool, line_criteria, shared)
+                    pruned = prune_candidates(pool.values[positions], pool.scores[positions],
+                                              len(group['positions']))
+                    shared[key] = np.sort(positions[pruned])
+                eligible = shared[key][pool.values[shared[key]] <= budget]
+            candidates[pool_key] = (pool, eligible)
+
+        selections = solve_team([
+            GroupCandidates(
+                values=pool.values[eligible],
+                scores=pool.scores[eligible],
+                slots=len(groups[pool_key]['positions'])
+            )
+            for pool_key, (pool, eligible) in candidates.items()
+        ], budget)
+
+        # Dentro de cada grupo, los mejores scores ocupan los primeros puestos
+        chosen = {}
+        for (pool_key, (pool, eligible)), picked in zip(candidates.items(), selections):
+            chosen[pool_key] = np.sort(eligible[picked]).tolist()
+
+        selected = []
+        for _, pool_key, pos_type in slots:
+            if not chosen[pool_key]:
+                continue
+            pool = candidates[pool_key][0]
+            position = chosen[pool_key].pop(0)
+            row, score = int(pool.rows[position]), pool.scores[position]
+            player = self._player_from_row(row, pos_type)
+            if pool_key != 'GK':
+                player[POSITION_POOLS[pool_key][1]] = score
+            player['SelectionReason'] = self._selection_reason(pool_key, pos_type, row, score)
+            selected.append(player)
+        return selected
+
+    def _select_gk(self, criteria: Dict, budget: float, used_ids: set,
+                   pools: Optional[Dict] = None, shared: Optional[Dict] = None) -> Dict:
         """Selecciona el mejor portero según criterios."""
-        filtered = self.df[
-            (self.df['BestPosition'] == 'GK') &
-            (~self.df['ID'].isin(used_ids)) &
-            (self.df['ValueEUR'] <= budget)
-        ].copy()
-        
-        for attr, min_val in criteria.items():
-            col = attr.replace('min_', '').capitalize()
-            if col in filtered.columns:
-                filtered = filtered[filtered[col] >= min_val]
-        
-        if filtered.empty:
+        pool = self._request_pool('GK', pools)
+        position = self._first_available(pool, criteria, budget, used_ids, shared)
+        if position is None:
             return None
             
-        best_gk = filtered.nlargest(1, 'GK_Score').iloc[0]
-        return {
-            'ID': best_gk['ID'],
-            'Name': best_gk['Name'],
-            'Position': 'GK',
-            'Overall': best_gk['Overall'],
-            'ValueEUR': best_gk['ValueEUR'],
-            'Nationality': best_gk['Nationality'],
-            'SelectionReason': f"Mejor portero disponible (GK Score: {best_gk['GK_Score']:.2f}) con {best_gk['Overall']} de overall"
-        }
+        row = int(pool.rows[position])
+        best_gk = self._player_from_row(row, 'GK')
+        best_gk['SelectionReason'] = self._selection_reason('GK', 'GK', row, pool.scores[position])
+        return best_gk
 
-    def _select_defenders(self, formation: str, criteria: Dict, budget: float, used_ids: set) -> List[Dict]:
+    def _select_defenders(self, formation: str, criteria: Dict, budget: float, used_ids: set,
+                          pools: Optional[Dict] = None, shared: Optional[Dict] = None) -> List[Dict]:
         """Selecciona defensores según formación."""
         positions_needed = self._get_defensive_positions(formation)
-        selected = []
-        
-        for pos_type in positions_needed:
-            if budget <= 0:
-                break
-                
-            if pos_type == 'CB':
-                player = self._select_player(
-                    pos_filter=['CB'],
-                    score_col='CB_Score',
-                    criteria=criteria,
-                    budget=budget,
-                    used_ids=used_ids,
-                    pos_name='CB'
-                )
-                reason = f"Central (CB Score: {player['CB_Score']:.2f}) con buen potencial y habilidades defensivas"
-            else:  # FB (LW/RW)
-                player = self._select_player(
-                    pos_filter=['LB', 'RB', 'LWB', 'RWB'],
-                    score_col='FB_Score',
-                    criteria=criteria,
-                    budget=budget,
-                    used_ids=used_ids,
-                    pos_name=pos_type
-                )
-                reason = f"Lateral ({pos_type}, FB Score: {player['FB_Score']:.2f}) con velocidad y habilidad ofensiva/defensiva"
-            
-            if player is not None:
-                player['SelectionReason'] = reason
-                selected.append(player)
-                used_ids.add(player['ID'])
-                budget -= player['ValueEUR']
-        
-        return selected
+        return self._select_line(
+            [('CB' if pos_type == 'CB' else 'FB', pos_type) for pos_type in positions_needed],
+            criteria, budget, used_ids, pools, shared
+        )
 
-    def _select_midfielders(self, formation: str, criteria: Dict, budget: float, used_ids: set) -> List[Dict]:
+    def _select_midfielders(self, formation: str, criteria: Dict, budget: float, used_ids: set,
+                            pools: Optional[Dict] = None, shared: Optional[Dict] = None) -> List[Dict]:
         """Selecciona mediocampistas según formación."""
         positions_needed = self._get_midfield_positions(formation)
-        selected = []
-        
-        for pos_type in positions_needed:
-            if budget <= 0:
-                break
-                
-            if pos_type == 'CM':
-                player = self._select_player(
-                    pos_filter=['CM'],
-                    score_col='CM_Score',
-                    criteria=criteria,
-                    budget=budget,
-                    used_ids=used_ids,
-                    pos_name='CM'
-                )
-                reason = f"Mediocentro (CM Score: {player['CM_Score']:.2f}) con equilibrio entre ataque y defensa"
-            else:  # CAM o CDM
-                player = self._select_player(
-                    pos_filter=['CAM', 'CDM'],
-                    score_col='CAM_CDM_Score',
-                    criteria=criteria,
-                    budget=budget,
-                    used_ids=used_ids,
-                    pos_name=pos_type
-                )
-                role = "Mediocentro ofensivo" if pos_type == 'CAM' else "Mediocentro defensivo"
-                reason = f"{role} (CAM/CDM Score: {player['CAM_CDM_Score']:.2f}) con habilidades completas"
-            
-            if player is not None:
-                player['SelectionReason'] = reason
-                selected.append(player)
-                used_ids.add(player['ID'])
-                budget -= player['ValueEUR']
-        
-        return selected
+        return self._select_line(
+            [('CM' if pos_type == 'CM' else 'CAM_CDM', pos_type) for pos_type in positions_needed],
+            criteria, budget, used_ids, pools, shared
+        )
 
-    def _select_attackers(self, formation: str, criteria: Dict, budget: float, used_ids: set) -> List[Dict]:
+    def _select_attackers(self, formation: str, criteria: Dict, budget: float, used_ids: set,
+                          pools: Optional[Dict] = None, shared: Optional[Dict] = None) -> List[Dict]:
         """Selecciona atacantes según formación."""
         positions_needed = self._get_attacker_positions(formation)
+        return self._select_line(
+            [('ST', pos_type) for pos_type in positions_needed],
+            criteria, budget, used_ids, pools, shared
+        )
+
+    def _select_line(self, slots: List[Tuple[str, str]], criteria: Dict, budget: float,
+                     used_ids: set, pools: Optional[Dict] = None,
+                     shared: Optional[Dict] = None) -> List[Dict]:
+        """Cubre en orden los puestos de una línea con el mejor candidato disponible."""
         selected = []
         
-        for pos_type in positions_needed:
+        for pool_key, pos_type in slots:
             if budget <= 0:
                 break
                 
+            pos_filter, score_col = POSITION_POOLS[pool_key]
             player = self._select_player(
-                pos_filter=['ST', 'LW', 'RW', 'CF'],
-                score_col='ST_Score',
+                pos_filter=list(pos_filter),
+                score_col=score_col,
                 criteria=criteria,
                 budget=budget,
                 used_ids=used_ids,
-                pos_name=pos_type
+                pos_name=pos_type,
+                pool=self._request_pool(pool_key, pools),
+                shared=shared
             )
-            role = {
-                'ST': "Delantero centro",
-                'LW': "Extremo izquierdo", 
-                'RW': "Extremo derecho",
-                'CF': "Mediapunta"
-            }.get(pos_type, pos_type)
             
             if player is not None:
-                player['SelectionReason'] = f"{role} (ST Score: {player['ST_Score']:.2f}) con habilidades ofensivas completas"
+                row = self._id_to_row[player['ID']]
+                player['SelectionReason'] = self._selection_reason(pool_key, pos_type, row, player[score_col])
                 selected.append(player)
                 used_ids.add(player['ID'])
                 budget -= player['ValueEUR']
@@ -237,32 +590,19 @@ class TeamRecommender:
         return selected
 
     def _select_player(self, pos_filter: List[str], score_col: str, criteria: Dict, 
-                      budget: float, used_ids: set, pos_name: str) -> Dict:
+                      budget: float, used_ids: set, pos_name: str,
+                      pool: Optional[CandidatePool] = None,
+                      shared: Optional[Dict] = None) -> Dict:
         """Selecciona el mejor jugador para una posición específica."""
-        filtered = self.df[
-            (self.df['BestPosition'].isin(pos_filter)) &
-            (~self.df['ID'].isin(used_ids)) &
-            (self.df['ValueEUR'] <= budget)
-        ].copy()
-        
-        for attr, min_val in criteria.items():
-            col = attr.replace('min_', '').capitalize()
-            if col in filtered.columns:
-                filtered = filtered[filtered[col] >= min_val]
-        
-        if filtered.empty:
+        if pool is None:
+            pool = self._get_pool(pos_filter, score_col)
+        position = self._first_available(pool, criteria, budget, used_ids, shared)
+        if position is None:
             return None
             
-        best_player = filtered.nlargest(1, score_col).iloc[0]
-        return {
-            'ID': best_player['ID'],
-            'Name': best_player['Name'],
-            'Position': pos_name,
-            'Overall': best_player['Overall'],
-            'ValueEUR': best_player['ValueEUR'],
-            'Nationality': best_player['Nationality'],
-            score_col: best_player[score_col]
-        }
+        best_player = self._player_from_row(int(pool.rows[position]), pos_name)
+        best_player[score_col] = pool.scores[position]
+        return best_player
 
     def _parse_formation(self, formation: str) -> bool:
         """Valida la formación."""
@@ -310,6 +650,24 @@ class TeamRecommender:
         else:
             return ['ST'] * att_count
 
+    def team_score(self, team: Dict) -> float:
+        """
+        Suma de los scores de puesto de un equipo ya formateado: la función
+        objetivo del optimizador exacto, para comparar modos.
+        """
+        total = 0.0
+        for player in team['players']:
+            position = player['position']
+            if position in ('GK', 'CB', 'FB', 'CM'):
+                pool_key = position
+            elif position in ('CAM', 'CDM', 'RM', 'LM'):
+                pool_key = 'CAM_CDM'
+            else:
+                pool_key = 'ST'
+            row = self._id_to_row[player['id']]
+            total += float(self._columns[POSITION_POOLS[pool_key][1]][row])
+        return total
+
     def _format_response(self, players: List[Dict], formation: str, description: str) -> Dict:
         """Formatea la respuesta final."""
         if not players:
@@ -332,13 +690,16 @@ class TeamRecommender:
             }
             formatted_players.append(formatted)
         
+        with span('team.analysis'):
+            analysis = self._generate_team_analysis(formatted_players)
+        
         return {
             'formation': formation,
             'description': description,
             'players': formatted_players,
             'total_value': float(total_value),
             'avg_rating': float(round(avg_rating, 2)),
-            'team_analysis': self._generate_team_analysis(formatted_players)
+            'team_analysis': analysis
         }
 
     def _generate_team_analysis(self, players: List[Dict]) -> str:
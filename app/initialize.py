@@ -1,9 +1,10 @@
 # scripts/initialize.py
 
 
-import pandas as pd
-from services.data_processing import load_and_preprocess_data
-from services.embeddings import generate_embeddings
+from app.services.player_store import compile_player_store, load_player_store
+from app.services.data_processing import load_and_preprocess_data
+from app.services.embeddings import generate_embeddings
+from app.services.registry import resolve_path
 from config import settings
 import logging
 
@@ -11,15 +12,28 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def main():
+    logger.info("Compilando los CSV al almacén columnar por bloques...")
+    # Mismas rutas que usa el registro de la API, sin importar el directorio de trabajo
+    sources = [str(resolve_path(path.strip())) for path in settings.DATA_PATH.split(',') if path.strip()]
+    embeddings_path = str(resolve_path(settings.EMBEDDINGS_PATH))
+    store_path = compile_player_store(
+        sources, str(resolve_path(settings.PLAYER_STORE_PATH)), settings.INGEST_CHUNK_ROWS
+    )
+    logger.info(f"Almacén de jugadores guardado en: {store_path}")
+
     logger.info("Cargando y procesando datos...")
-    df = load_and_preprocess_data(settings.DATA_PATH)
-    
+    df = load_and_preprocess_data(str(store_path))
+
+    # El índice se construye sobre las filas del almacén, igual que en la API
     logger.info("Generando embeddings...")
-    embeddings, index = generate_embeddings(df, settings.EMBEDDINGS_PATH)
-    
-    logger.info(f"Embeddings guardados en: {settings.EMBEDDINGS_PATH}")
+    embeddings, index = generate_embeddings(
+        load_player_store(str(store_path)), embeddings_path, chunk_rows=settings.INGEST_CHUNK_ROWS
+    )
+
+    logger.info(f"Embeddings guardados en: {embeddings_path}")
     logger.info(f"Dimensión de los embeddings: {embeddings.shape}")
     logger.info(f"Tamaño del índice FAISS: {index.ntotal} vectores indexados")
+    logger.info(f"Jugadores disponibles: {len(df)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,30 @@
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+# Dependencias que se cargan en el arranque de los recursos (registry.load) o
+# al primer uso, nunca al importar la app
+HEAVY_MODULES = ('torch', 'faiss', 'sentence_transformers', 'sklearn', 'transformers')
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    __getattr__ y __dir__ de un paquete cuyas exportaciones se importan al
+    primer uso. `exports` asocia cada nombre con su módulo, relativo al
+    paquete; el valor importado queda en el paquete y no se vuelve a resolver.
+
+        __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+    """
+    module = sys.modules[package]
+
+    def __getattr__(name: str):
+        if name in exports:
+            value = getattr(importlib.import_module(exports[name], package), name)
+            setattr(module, name, value)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(module)) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,11 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app import FIFAAssistant, load_and_preprocess_data
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.routers import teams, chat
+from app.services import metrics
+from app.services.executor import cpu_executor
+from app.services.prefork import memory_usage
+from app.services.registry import registry, resolve_path
+from app.services.result_cache import team_cache
+from app.services.session_store import create_session_store
 from config import settings
 import logging
 
-from app.services.embeddings import load_embeddings_index, generate_embeddings
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -13,7 +21,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def load_resources():
+    """Carga el registro con la configuración (en el arranque o, con app.server, antes de crear los workers)"""
+    return registry.load(
+        settings.DATA_PATH,
+        settings.EMBEDDINGS_PATH,
+        settings.MODEL_NAME,
+        store_path=settings.PLAYER_STORE_PATH,
+        cache_size=settings.EMBEDDING_CACHE_SIZE,
+        cache_max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+        batch_size=settings.ENCODER_MAX_BATCH_SIZE,
+        batch_wait_ms=settings.ENCODER_MAX_WAIT_MS,
+        chunk_rows=settings.INGEST_CHUNK_ROWS,
+        # En una recarga se conservan las conversaciones en curso
+        sessions=registry.sessions or create_session_store(
+            settings.SESSION_BACKEND,
+            str(resolve_path(settings.SESSION_PATH)),
+            settings.SESSION_TTL_SECONDS,
+            settings.SESSION_MAX_ENTRIES,
+            settings.SESSION_MAX_BYTES,
+        ),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Iniciando la aplicación...")
+    # Con app.server los recursos ya vienen cargados del proceso padre
+    if settings.PRELOAD_RESOURCES and not registry.ready:
+        # Los recursos pesados se cargan una sola vez por proceso
+        try:
+            await asyncio.to_thread(load_resources)
+        except Exception as e:
+            logger.error(f"La aplicación arrancó sin recursos precargados: {str(e)}")
+    yield
+    if registry.encoder is not None:
+        await registry.encoder.close()
+    if registry.sessions is not None:
+        registry.sessions.close()
+    cpu_executor.shutdown()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="FIFA Team Builder AI Assistant",
     description="API para construir equipos de fútbol ideales con asistente inteligente",
     version="2.0.0",
@@ -35,19 +83,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Mide cada request y devuelve el desglose por etapa en Server-Timing"""
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+    start = time.perf_counter()
+    spans, token = metrics.start_request()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_request(token)
+    elapsed = time.perf_counter() - start
+    # La plantilla de la ruta (no la URL) para no multiplicar las series
+    route = request.scope.get('route')
+    metrics.http_seconds.observe(
+        elapsed, request.method, getattr(route, 'path', 'unmatched'), str(response.status_code)
+    )
+    response.headers['Server-Timing'] = metrics.server_timing(spans, elapsed)
+    return response
+
 # Incluir routers
 app.include_router(teams.router)
 app.include_router(chat.router)
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Iniciando la aplicación...")
-    # Aquí podrías inicializar recursos que necesiten estar disponibles al inicio
-
 @app.get("/health", tags=["Health Check"])
 async def health_check():
     return {
         "status": "healthy",
         "version": app.version,
         "environment": settings.ENVIRONMENT
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", tags=["Health Check"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Histogramas de latencia por etapa y estadísticas en formato de texto de Prometheus"""
+    body = metrics.render({
+        'executor': cpu_executor.stats(),
+        'team_cache': team_cache.stats(),
+        'embedding_cache': registry.embedder.stats() if hasattr(registry.embedder, 'stats') else None,
+        'encoder': registry.encoder.stats() if registry.encoder is not None else None,
+        'process': memory_usage(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    """Indica si los recursos compartidos están cargados y cuánto tardó cada uno"""
+    status = registry.status()
+    status["executor"] = cpu_executor.stats()
+    status["team_cache"] = team_cache.stats()
+    # Con app.server, private_bytes es lo que agrega cada worker sobre lo compartido
+    status["memory"] = memory_usage()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -1,6 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.ai_assistant.chat_processor import FIFAAssistant
+from app.ai_assistant.intent_matrix import clean_message
+from app.services.executor import ExecutorSaturated, cpu_executor
+from app.services.metrics import span
+from app.services.registry import registry
 import logging
 
 router = APIRouter(
@@ -15,16 +19,15 @@ class ChatRequest(BaseModel):
     user_id: str
     message: str
 
-def get_assistant():
-    # Configuración inicial del asistente
-    from sentence_transformers import SentenceTransformer
-    import pandas as pd
-    
-    # Carga datos y modelo (ajusta las rutas)
-    df = pd.read_csv("data/players_21.csv")
-    embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-    
-    return FIFAAssistant(df=df, embedder=embedder)
+def get_assistant() -> FIFAAssistant:
+    """Dependency que provee el asistente precargado en el arranque"""
+    if registry.assistant is None:
+        logger.error(f"Asistente no disponible: {registry.error}")
+        raise HTTPException(
+            status_code=503,
+            detail="El asistente todavía no está disponible"
+        )
+    return registry.assistant
 
 @router.post("")
 async def chat(
@@ -32,8 +35,22 @@ async def chat(
     assistant: FIFAAssistant = Depends(get_assistant)
 ):
     try:
-        response = assistant.process_message(request.user_id, request.message)
+        async with cpu_executor.admit():
+            # Los mensajes concurrentes se codifican juntos en un mismo lote
+            embedding = None
+            if registry.encoder is not None:
+                with span('chat.encode'):
+                    embedding = await registry.encoder.encode(clean_message(request.message))
+            response = await cpu_executor.run(
+                assistant.process_message, request.user_id, request.message, message_embedding=embedding
+            )
         return {"response": response}
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Chat error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error processing message")
\ No newline at end of file
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional
 import logging
-from app.ai_assistant.recommendation_engine import TeamRecommender 
+from app.ai_assistant.recommendation_engine import TeamRecommender
+from app.services.executor import ExecutorSaturated, cpu_executor
+from app.services.registry import registry
+from app.services.result_cache import canonical_key, etag_matches, team_cache
 
 router = APIRouter(prefix="/api/teams", tags=["teams"])
 logger = logging.getLogger(__name__)
@@ -38,63 +41,80 @@ class TeamRequest(BaseModel):
     team_formation: str = Field(..., pattern=r'^\d-\d(-\d)*$')
     budget: float = Field(..., gt=0)
     criteria: Dict[str, PositionCriteria]
+    optimizer: Literal['greedy', 'exact'] = Field(
+        'greedy',
+        description="'exact' maximiza el score de los 11 puestos con el presupuesto como restricción. "
+                    "Es exacto cuando el presupuesto dividido por el MCD de los valores no supera 16384 "
+                    "unidades; si no, redondea los costos y puede perder hasta un 0,07% del presupuesto"
+    )
+    # Pesos de atributos por grupo de posiciones (GK, CB, FB, CM, CAM_CDM, ST)
+    score_weights: Optional[Dict[str, Dict[str, float]]] = None
+    # Peso (0-1) de la similitud con la descripción del equipo al ordenar candidatos
+    semantic_weight: float = Field(0.0, ge=0, le=1)
 
-def initialize_models():
-    """Inicializa los modelos y datos necesarios"""
-    try:
-        from pathlib import Path
-        import pandas as pd
-        from sentence_transformers import SentenceTransformer
-        from app.services.embeddings import generate_embeddings
-        
-        base_dir = Path(__file__).resolve().parent.parent.parent
-        data_path = base_dir / "data" / "players_21.csv"
-        
-        if not data_path.exists():
-            raise FileNotFoundError(f"Archivo no encontrado: {data_path}")
-        
-        df = pd.read_csv(data_path)
-        embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-        
-        embeddings_path = base_dir / "data" / "embeddings.index"
-        embeddings, index = generate_embeddings(df, str(embeddings_path))
-        
-        return df, embedder, index
-        
-    except Exception as e:
-        logger.error(f"Error inicializando modelos: {str(e)}")
-        raise
+class TeamBatchRequest(BaseModel):
+    requests: List[TeamRequest] = Field(..., min_length=1, max_length=500)
 
-def get_recommender():
-    """Dependency que provee el recomendador configurado"""
-    try:
-        df, embedder, index = initialize_models()
-        return TeamRecommender(df=df, embedder=embedder, index=index)
-    except Exception as e:
-        logger.error(f"Error inicializando recomendador: {str(e)}")
+class TeamBatchResponse(BaseModel):
+    teams: List[TeamResponse]
+
+def _team_arguments(request: TeamRequest) -> Dict:
+    """Valida la formación y traduce la solicitud a argumentos del recomendador"""
+    parts = list(map(int, request.team_formation.split('-')))
+    if sum(parts) != 10:
+        raise ValueError("La formación debe sumar 10 jugadores de campo")
+    
+    return {
+        'description': request.team_description,
+        'formation': request.team_formation,
+        'criteria': {pos: crit.dict() for pos, crit in request.criteria.items()},
+        'budget': request.budget,
+        'optimizer': request.optimizer,
+        'score_weights': request.score_weights,
+        'semantic_weight': request.semantic_weight
+    }
+
+def _saturated(error: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Servidor saturado, reintente en unos segundos",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def get_recommender() -> TeamRecommender:
+    """Dependency que provee el recomendador precargado en el arranque"""
+    if registry.recommender is None:
+        logger.error(f"Recomendador no disponible: {registry.error}")
         raise HTTPException(
-            status_code=500,
-            detail="Error interno al configurar el recomendador"
+            status_code=503,
+            detail="El recomendador todavía no está disponible"
         )
+    return registry.recommender
 
 @router.post("/generate", response_model=TeamResponse)
 async def generate_team(
     request: TeamRequest, 
-    recommender: TeamRecommender = Depends(get_recommender)
+    response: Response,
+    recommender: TeamRecommender = Depends(get_recommender),
+    if_none_match: Optional[str] = Header(None)
 ):
     try:
-        # Validar formación
-        parts = list(map(int, request.team_formation.split('-')))
-        if sum(parts) != 10:
-            raise ValueError("La formación debe sumar 10 jugadores de campo")
+        # Validar formación y generar equipo (fuera del event loop)
+        arguments = _team_arguments(request)
+        
+        async def compute():
+            async with cpu_executor.admit():
+                return await cpu_executor.run(recommender.generate_team, **arguments)
         
-        # Generar equipo
-        team_data = recommender.generate_team(
-            description=request.team_description,
-            formation=request.team_formation,
-            criteria={pos: crit.dict() for pos, crit in request.criteria.items()},
-            budget=request.budget
+        # Las solicitudes equivalentes comparten resultado (y cálculo si llegan a la vez)
+        # Un equipo vacío puede venir de un error capturado en generate_team: no se guarda
+        team_data, etag, source = await team_cache.get_or_compute(
+            canonical_key(arguments), compute, cacheable=lambda team: bool(team["players"])
         )
+        headers = {"ETag": etag, "X-Cache": source}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
         
         # Verificar si hay resultados
         if not team_data["players"]:
@@ -108,8 +128,36 @@ async def generate_team(
         
         return TeamResponse(**team_data)
         
+    except ExecutorSaturated as e:
+        raise _saturated(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error generando equipo: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Error al generar equipo")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error al generar equipo")
+
+@router.post("/generate:batch", response_model=TeamBatchResponse)
+async def generate_teams_batch(
+    batch: TeamBatchRequest,
+    recommender: TeamRecommender = Depends(get_recommender)
+):
+    """Genera varios equipos en un lote que comparte el filtrado entre solicitudes"""
+    try:
+        arguments = []
+        for position, request in enumerate(batch.requests):
+            try:
+                arguments.append(_team_arguments(request))
+            except ValueError as e:
+                raise ValueError(f"Solicitud {position}: {str(e)}")
+        
+        async with cpu_executor.admit():
+            teams = await cpu_executor.run(recommender.generate_teams, arguments)
+        return TeamBatchResponse(teams=[TeamResponse(**team) for team in teams])
+        
+    except ExecutorSaturated as e:
+        raise _saturated(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generando lote de equipos: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error al generar equipos")
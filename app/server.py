@@ -0,0 +1,60 @@
+"""
+Servidor de producción con precarga y fork de los workers.
+
+    python -m app.server --workers 8 --port 8000
+
+A diferencia de `uvicorn --workers N` (que arranca N intérpretes y cada uno
+carga su copia del DataFrame, del modelo y del índice), el proceso padre
+carga los recursos una vez, abre el socket y crea los workers con fork():
+los arrays de jugadores, los scores compuestos, los pesos del modelo y el
+índice se comparten copy-on-write, y los vectores y el índice ya están
+mapeados desde disco. Cada worker sólo suma su propio heap de requests.
+"""
+
+import argparse
+import logging
+import socket
+import sys
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    from app.services.prefork import Prefork, freeze_heap, limit_native_threads
+
+    # Antes de importar faiss/torch: sus pools de hilos no sobreviven a fork()
+    limit_native_threads(settings.WORKER_NATIVE_THREADS)
+
+    import uvicorn
+    from app.main import app, load_resources
+
+    try:
+        load_resources()
+    except Exception as e:
+        logger.error(f"No se pudieron precargar los recursos: {str(e)}")
+        sys.exit(1)
+    freeze_heap()
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    logger.info(f"Escuchando en {args.host}:{args.port} con {args.workers} workers")
+
+    def worker():
+        config = uvicorn.Config(app, log_level=args.log_level, lifespan='on')
+        uvicorn.Server(config).run(sockets=[sock])
+
+    sys.exit(Prefork(worker, args.workers).run())
+
+
+if __name__ == "__main__":
+    main()
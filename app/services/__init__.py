@@ -7,18 +7,15 @@ Exporta todos los servicios disponibles para ser utilizados en la aplicación:
 - Utilidades compartidas
 """
 
-from .data_processing import (
-    load_and_preprocess_data,
-    filter_by_position
-    )
-  
-from .embeddings import (
-    generate_embeddings,
-    load_embeddings_index,
-    
-)
-
+from app.lazy import lazy_exports
 
+# Importación diferida: embeddings carga faiss y sentence_transformers
+_EXPORTS = {
+    'load_and_preprocess_data': '.data_processing',
+    'filter_by_position': '.data_processing',
+    'generate_embeddings': '.embeddings',
+    'load_embeddings_index': '.embeddings',
+}
 
 # Exporta todas las funciones públicamente disponibles
 __all__ = [
@@ -33,4 +30,6 @@ __all__ = [
 ]
 
 # Versión del módulo de servicios
-__version__ = '1.1.0'
\ No newline at end of file
+__version__ = '1.1.0'
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
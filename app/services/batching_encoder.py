@@ -0,0 +1,131 @@
+import asyncio
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingEncoder:
+    """
+    Servicio asíncrono que agrupa las codificaciones concurrentes.
+
+    Cada request encola su texto y espera un future; un único worker junta
+    lo que llega dentro de la ventana (`max_wait_ms`) hasta `max_batch_size`
+    textos, hace una sola llamada a `encode` en un hilo y resuelve cada
+    future con su vector. Con un solo request en vuelo, la latencia añadida
+    está acotada por la ventana.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self):
+        # El worker vive en el event loop que hace la primera llamada
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Devuelve el embedding de `text` (vector 1-D) codificado dentro de un lote"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self, batch: List[Tuple[str, asyncio.Future]]):
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Lo que ya está encolado entra sin esperar más
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = []
+            try:
+                await self._collect(batch)
+                await self._encode_batch([item for item in batch if not item[1].cancelled()])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+
+    async def _encode_batch(self, pending: List[Tuple[str, asyncio.Future]]):
+        if not pending:
+            return
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                None, self.embedder.encode, [text for text, _ in pending]
+            )
+        except Exception as e:
+            logger.error(f"Error codificando un lote de {len(pending)} textos: {str(e)}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(pending)
+        self.largest_batch = max(self.largest_batch, len(pending))
+        for (_, future), vector in zip(pending, np.asarray(vectors)):
+            if not future.done():
+                future.set_result(vector)
+
+    async def close(self):
+        """Detiene el worker; los requests pendientes reciben CancelledError"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+
+    def close_threadsafe(self):
+        """
+        close() desde código síncrono o desde otro hilo (p. ej. al recargar el
+        registro en un hilo mientras el event loop sigue atendiendo requests).
+        """
+        loop, worker = self._loop, self._worker
+        if worker is None or loop is None or worker.done():
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.close(), loop)
+        else:
+            # Sin loop en marcha la tarea ya no avanza: sólo se suelta
+            self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'largest_batch': self.largest_batch,
+            'mean_batch': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
@@ -1,64 +1,65 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Sequence, Union
 import logging
+from app.services.player_store import NUMERIC_COLUMNS, load_players
 
 logger = logging.getLogger(__name__)
 
-def load_and_preprocess_data(filepath: str) -> pd.DataFrame:
-    """Carga y preprocesa el dataset de FIFA 21"""
+# Clasificación de posiciones
+POSITION_MAPPING = {
+    'GK': 'Goalkeeper',
+    'CB': 'Defender', 'RB': 'Defender', 'LB': 'Defender', 
+    'RWB': 'Defender', 'LWB': 'Defender',
+    'CDM': 'Midfielder', 'CM': 'Midfielder', 'CAM': 'Midfielder', 
+    'RM': 'Midfielder', 'LM': 'Midfielder',
+    'RW': 'Forward', 'LW': 'Forward', 'CF': 'Forward', 'ST': 'Forward'
+}
+
+def _positions_column(df: pd.DataFrame) -> str:
+    return 'player_positions' if 'player_positions' in df.columns else 'Positions'
+
+def prepare_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Posición principal, grupo de posición y conversión numérica de un bloque.
+
+    Conserva las filas y los nombres de columna del CSV (TeamRecommender usa
+    'Overall', 'BestPosition', ...), así que compile_player_store lo aplica
+    a cada bloque antes de agregarlo al almacén.
+    """
+    positions_col = _positions_column(df)
+    if positions_col in df.columns and 'main_position' not in df.columns:
+        main_position = df[positions_col].str.split(',').str[0].str.strip()
+        df['main_position'] = main_position
+        df['position_group'] = main_position.map(POSITION_MAPPING).fillna('Other')
+
+    # Convertir columnas numéricas
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def preprocess_players(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpieza, normalización de columnas, posición principal y conversión numérica"""
+    # Verificar nombres alternativos de columnas
+    positions_col = _positions_column(df)
+    overall_col = 'overall' if 'overall' in df.columns else 'Overall'
+    
+    # Limpieza básica
+    df = df.dropna(subset=[positions_col, overall_col])
+    
+    # Con el almacén, la posición y la conversión ya se hicieron al compilar
+    df = prepare_chunk(df)
+    
+    # Normalizar nombres de columnas
+    df.columns = df.columns.str.lower()
+    return df
+
+def load_and_preprocess_data(filepath: Union[str, Sequence[str]]) -> pd.DataFrame:
+    """Carga y preprocesa el dataset de FIFA (uno o varios CSV, a través del almacén columnar)"""
     try:
         logger.info(f"Cargando datos desde {filepath}")
-        df = pd.read_csv(filepath, low_memory=False)
-        
-        # Verificar nombres alternativos de columnas
-        positions_col = 'player_positions' if 'player_positions' in df.columns else 'Positions'
-        overall_col = 'overall' if 'overall' in df.columns else 'Overall'
-        
-        # Limpieza básica
-        df = df.dropna(subset=[positions_col, overall_col])
-        df = df[df[positions_col].notna()]
-        
-        # Normalizar nombres de columnas
-        df.columns = df.columns.str.lower()
-        
-        # Crear columna de posición principal (usando el nombre correcto)
-        positions_col = positions_col.lower()
-        df['main_position'] = df[positions_col].str.split(',').str[0].str.strip()
-        
-        # Clasificación de posiciones
-        position_mapping = {
-            'GK': 'Goalkeeper',
-            'CB': 'Defender', 'RB': 'Defender', 'LB': 'Defender', 
-            'RWB': 'Defender', 'LWB': 'Defender',
-            'CDM': 'Midfielder', 'CM': 'Midfielder', 'CAM': 'Midfielder', 
-            'RM': 'Midfielder', 'LM': 'Midfielder',
-            'RW': 'Forward', 'LW': 'Forward', 'CF': 'Forward', 'ST': 'Forward'
-        }
-        
-        df['position_group'] = df['main_position'].map(position_mapping)
-        df['position_group'] = df['position_group'].fillna('Other')
-        
-        # Convertir columnas numéricas
-        numeric_cols = [
-            'pace', 'shooting', 'passing', 'dribbling', 'defending', 'physic',
-            'attacking_crossing', 'attacking_finishing', 'attacking_heading_accuracy',
-            'attacking_short_passing', 'attacking_volleys', 'skill_dribbling',
-            'skill_curve', 'skill_fk_accuracy', 'skill_long_passing', 'skill_ball_control',
-            'movement_acceleration', 'movement_sprint_speed', 'movement_agility',
-            'movement_reactions', 'movement_balance', 'power_shot_power',
-            'power_jumping', 'power_stamina', 'power_strength', 'power_long_shots',
-            'mentality_aggression', 'mentality_interceptions', 'mentality_positioning',
-            'mentality_vision', 'mentality_penalties', 'mentality_composure',
-            'defending_marking', 'defending_standing_tackle', 'defending_sliding_tackle',
-            'goalkeeping_diving', 'goalkeeping_handling', 'goalkeeping_kicking',
-            'goalkeeping_positioning', 'goalkeeping_reflexes'
-        ]
-        
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
+        df = preprocess_players(load_players(filepath))
         logger.info(f"Datos cargados correctamente. {len(df)} jugadores disponibles")
         return df
     
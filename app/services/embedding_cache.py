@@ -0,0 +1,111 @@
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Argumentos de encode() que no alteran los vectores resultantes
+_NEUTRAL_KWARGS = {'batch_size', 'show_progress_bar'}
+
+
+class CachedEmbedder:
+    """
+    Envoltorio LRU alrededor de un modelo de embeddings.
+
+    Los vectores se indexan por el texto exacto que se codifica; el chat ya
+    envía el mensaje normalizado (minúsculas y sin puntuación), así que las
+    variantes de un mismo mensaje comparten entrada. La caché está acotada
+    tanto en número de entradas como en bytes, y sólo se consulta el modelo
+    (en una única llamada por lote) para los textos que no están en ella.
+    """
+
+    def __init__(self, embedder, max_entries: int = 4096, max_bytes: int = 32 * 1024 * 1024):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # Resto de la API del modelo (p. ej. get_sentence_embedding_dimension)
+        if name == 'embedder':
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    def encode(self, sentences, **kwargs):
+        if set(kwargs) - _NEUTRAL_KWARGS:
+            return self.embedder.encode(sentences, **kwargs)
+
+        single = isinstance(sentences, str)
+        texts: List[str] = [sentences] if single else list(sentences)
+        vectors = self._lookup(texts)
+
+        pending = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if pending:
+            encoded = np.asarray(self.embedder.encode(pending, **kwargs))
+            fresh = dict(zip(pending, encoded))
+            self._store(fresh)
+            vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+
+        if single:
+            return vectors[0].copy()
+        if not vectors:
+            return np.asarray(self.embedder.encode([], **kwargs))
+        return np.stack(vectors)
+
+    def _lookup(self, texts: List[str]) -> List:
+        with self._lock:
+            vectors = []
+            for text in texts:
+                vector = self._entries.get(text)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(text)
+                    self.hits += 1
+                vectors.append(vector)
+            return vectors
+
+    def _store(self, fresh: Dict[str, np.ndarray]):
+        with self._lock:
+            for text, vector in fresh.items():
+                if vector.nbytes > self.max_bytes or self.max_entries <= 0:
+                    continue
+                vector = vector.copy()
+                vector.setflags(write=False)
+                previous = self._entries.pop(text, None)
+                if previous is not None:
+                    self._bytes -= previous.nbytes
+                self._entries[text] = vector
+                self._bytes += vector.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la caché (aciertos, fallos, desalojos y ocupación)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,65 +1,272 @@
 import faiss
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-import pickle
+import hashlib
+import json
 import os
 import logging
-from typing import Tuple, Dict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from app.services.data_processing import load_and_preprocess_data
+from app.services.metrics import span
+from app.services.player_store import CHUNK_ROWS
+from app.services.vector_index import (
+    build_index, filtered_search, index_params as default_index_params, read_index, same_structure,
+    vector_dtype
+)
+from config import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
-def generate_embeddings(df: pd.DataFrame, save_path: str) -> Tuple[np.ndarray, faiss.Index]:
-    """Genera embeddings para los jugadores y crea índice FAISS"""
+EMBEDDING_STORE_VERSION = 2
+# Bytes por lectura al calcular el digest del archivo de vectores
+_DIGEST_BLOCK = 1 << 20
+
+def build_player_descriptions(df: pd.DataFrame) -> pd.Series:
+    """Construye la descripción textual de cada jugador que se usa para los embeddings"""
+    # Verificación exhaustiva de columnas
+    required_columns = {
+        'name': ['short_name', 'name', 'Name'],
+        'age': ['age', 'Age'],
+        'nationality': ['nationality', 'Nationality'],
+        'positions': ['player_positions', 'Positions', 'Position'],
+        'overall': ['overall', 'Overall']
+    }
+    
+    # Encontrar los nombres reales de las columnas
+    col_mapping = {}
+    for key, alternatives in required_columns.items():
+        for alt in alternatives:
+            if alt in df.columns:
+                col_mapping[key] = alt
+                break
+        else:
+            available = [c for c in df.columns if c.lower() == key.lower()]
+            if available:
+                col_mapping[key] = available[0]
+            else:
+                raise KeyError(f"No se encontró ninguna columna compatible para: {alternatives}")
+    
+    logger.info(f"Columnas detectadas: {col_mapping}")
+    
+    return (
+        df[col_mapping['name']].astype(str) + ' is a ' + 
+        df[col_mapping['age']].astype(str) + ' years old ' +
+        df[col_mapping['positions']].astype(str) + ' from ' + 
+        df[col_mapping['nationality']].astype(str) + '. ' +
+        'Overall rating: ' + df[col_mapping['overall']].astype(str)
+    )
+
+def _content_hashes(descriptions: List[str]) -> np.ndarray:
+    """Hash de contenido por fila de la descripción generada"""
+    return np.array(
+        [hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest() for text in descriptions],
+        dtype='S32'
+    )
+
+def _dataset_hash(hashes: np.ndarray) -> str:
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+def _file_digest(path: str) -> str:
+    """Digest del contenido de un archivo, leído por bloques"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_DIGEST_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _store_paths(save_path: str) -> Dict[str, str]:
+    """Rutas de los artefactos del almacén de embeddings junto al índice"""
+    base, _ = os.path.splitext(save_path)
+    return {
+        'index': save_path,
+        'vectors': f"{base}.vectors.npy",
+        'hashes': f"{base}.hashes.npy",
+        'manifest': f"{base}.manifest.json",
+    }
+
+def _atomic_save(path: str, writer: Callable[[str], None]):
+    """Escribe en un archivo temporal y lo renombra para no dejar artefactos a medias"""
+    tmp_path = f"{path}.tmp"
+    writer(tmp_path)
+    os.replace(tmp_path, path)
+
+def _save_npy(array: np.ndarray) -> Callable[[str], None]:
+    def writer(path: str):
+        with open(path, 'wb') as f:
+            np.save(f, array)
+    return writer
+
+def _save_json(data: Dict) -> Callable[[str], None]:
+    def writer(path: str):
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    return writer
+
+def load_embedding_store(save_path: str, verify: bool = True) -> Optional[Dict]:
+    """
+    Carga manifiesto, hashes y vectores persistidos (o None si no existen).
+
+    Vectores y hashes se reemplazan en pasos separados: con `verify` se
+    comprueban contra el manifiesto (filas, dimensión, hash del dataset y
+    digest de los vectores) y un almacén a medias se descarta en lugar de
+    reutilizar vectores de otras filas.
+    """
+    paths = _store_paths(save_path)
+    if not all(os.path.exists(paths[key]) for key in ('vectors', 'hashes', 'manifest')):
+        return None
+    try:
+        with open(paths['manifest'], 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != EMBEDDING_STORE_VERSION:
+            return None
+        hashes = np.load(paths['hashes'])
+        vectors = np.load(paths['vectors'], mmap_mode='r')
+        if verify and (
+            len(hashes) != manifest.get('rows')
+            or vectors.shape != (manifest.get('rows'), manifest.get('dimension'))
+            or _dataset_hash(hashes) != manifest.get('dataset_hash')
+            or _file_digest(paths['vectors']) != manifest.get('vectors_digest')
+        ):
+            logger.warning(f"Almacén de embeddings inconsistente con su manifiesto, se regenerará: {save_path}")
+            return None
+        return {'manifest': manifest, 'hashes': hashes, 'vectors': vectors}
+    except Exception as e:
+        logger.warning(f"Almacén de embeddings ilegible, se regenerará: {str(e)}")
+        return None
+
+def generate_embeddings(
+    df: pd.DataFrame,
+    save_path: str,
+    embedder: Optional["SentenceTransformer"] = None,
+    model_name: str = settings.MODEL_NAME,
+    index_params: Optional[Dict] = None,
+    chunk_rows: int = CHUNK_ROWS
+) -> Tuple[np.ndarray, faiss.Index]:
+    """
+    Genera embeddings para los jugadores y crea índice FAISS.
+
+    Los vectores se persisten junto a un hash de contenido por fila y un
+    manifiesto (modelo, dimensión, hash del dataset, parámetros del índice):
+    sólo se codifican los jugadores nuevos o modificados y un dataset sin
+    cambios se carga de disco. El tipo de índice sale de `index_params` (por
+    defecto, de la configuración); si cambia, se reconstruye sin recodificar.
+    Con almacenamiento comprimido (float16, sq8, pq) los vectores de origen
+    también se persisten en float16.
+
+    Los jugadores se procesan por bloques de `chunk_rows` filas: cada bloque
+    se codifica y se escribe en el .vectors.npy mapeado en disco, y el
+    índice se construye desde ese archivo, así que la memoria no crece con
+    una matriz completa de vectores en RAM.
+    """
     try:
         logger.info("Generando embeddings para los jugadores...")
-        embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-        
-        # Verificación exhaustiva de columnas
-        required_columns = {
-            'name': ['short_name', 'name', 'Name'],
-            'age': ['age', 'Age'],
-            'nationality': ['nationality', 'Nationality'],
-            'positions': ['player_positions', 'Positions', 'Position'],
-            'overall': ['overall', 'Overall']
-        }
+        if len(df) == 0:
+            raise ValueError("No hay jugadores para generar embeddings")
+        paths = _store_paths(save_path)
+        params = index_params or default_index_params()
         
-        # Encontrar los nombres reales de las columnas
-        col_mapping = {}
-        for key, alternatives in required_columns.items():
-            for alt in alternatives:
-                if alt in df.columns:
-                    col_mapping[key] = alt
-                    break
-            else:
-                available = [c for c in df.columns if c.lower() == key.lower()]
-                if available:
-                    col_mapping[key] = available[0]
-                else:
-                    raise KeyError(f"No se encontró ninguna columna compatible para: {alternatives}")
+        # Crear descripción textual
+        df['player_description'] = build_player_descriptions(df)
+        hashes = _content_hashes(df['player_description'].tolist())
+        dataset_hash = _dataset_hash(hashes)
         
-        logger.info(f"Columnas detectadas: {col_mapping}")
+        store = load_embedding_store(save_path)
+        if store is not None and store['manifest'].get('model_name') != model_name:
+            logger.info("El modelo cambió, se descartan los embeddings persistidos")
+            store = None
         
-        # Crear descripción textual
-        df['player_description'] = (
-            df[col_mapping['name']].astype(str) + ' is a ' + 
-            df[col_mapping['age']].astype(str) + ' years old ' +
-            df[col_mapping['positions']].astype(str) + ' from ' + 
-            df[col_mapping['nationality']].astype(str) + '. ' +
-            'Overall rating: ' + df[col_mapping['overall']].astype(str)
-        )
+        if store is not None and store['manifest'].get('dataset_hash') == dataset_hash:
+            if (same_structure(store['manifest'].get('index'), params)
+                    and os.path.exists(paths['index'])):
+                index = read_index(paths['index'], params, mmap=settings.FAISS_MMAP)
+                if index.ntotal == len(df):
+                    logger.info(f"Dataset sin cambios, embeddings cargados desde {save_path}")
+                    return store['vectors'], index
+            elif len(store['vectors']) == len(df):
+                logger.info("Cambió la configuración del índice, se reconstruye con los vectores persistidos")
+                vectors = store['vectors']
+                index = build_index(vectors, params)
+                manifest = {**store['manifest'], 'index': params}
+                if vectors.dtype != vector_dtype(params):
+                    vectors = np.asarray(vectors, dtype=vector_dtype(params))
+                    _atomic_save(paths['vectors'], _save_npy(vectors))
+                    manifest['vectors_digest'] = _file_digest(paths['vectors'])
+                _atomic_save(paths['index'], lambda path: faiss.write_index(index, path))
+                _atomic_save(paths['manifest'], _save_json(manifest))
+                return vectors, index
+        
+        # Reutilizar los vectores cuyo contenido no cambió: búsqueda binaria
+        # sobre los hashes persistidos en lugar de un dict por jugador
+        known_order = known_sorted = None
+        if store is not None and len(store['hashes']):
+            known_order = np.argsort(store['hashes'], kind='stable')
+            known_sorted = store['hashes'][known_order]
+        
+        os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+        descriptions = df['player_description']
+        tmp_vectors = f"{paths['vectors']}.tmp"
+        embeddings = None
+        encoded_rows = 0
+        for start in range(0, len(df), max(1, chunk_rows)):
+            stop = min(len(df), start + max(1, chunk_rows))
+            chunk_hashes = hashes[start:stop]
+            rows = np.full(stop - start, -1, dtype=np.int64)
+            if known_sorted is not None:
+                found = np.minimum(np.searchsorted(known_sorted, chunk_hashes), len(known_sorted) - 1)
+                matched = known_sorted[found] == chunk_hashes
+                rows[matched] = known_order[found[matched]]
+            
+            missing = np.flatnonzero(rows < 0)
+            new_vectors = None
+            if len(missing):
+                # Descripciones repetidas dentro del bloque se codifican una vez
+                _, first, inverse = np.unique(chunk_hashes[missing], return_index=True, return_inverse=True)
+                if embedder is None:
+                    from sentence_transformers import SentenceTransformer
+                    embedder = SentenceTransformer(model_name)
+                texts = descriptions.iloc[start + missing[first]].tolist()
+                new_vectors = np.asarray(embedder.encode(texts), dtype='float32')[inverse.ravel()]
+                encoded_rows += len(texts)
+            
+            if embeddings is None:
+                dimension = new_vectors.shape[1] if new_vectors is not None else store['vectors'].shape[1]
+                embeddings = np.lib.format.open_memmap(
+                    tmp_vectors, mode='w+', dtype=vector_dtype(params), shape=(len(df), dimension)
+                )
+            block = np.empty((stop - start, dimension), dtype='float32')
+            reused = rows >= 0
+            if reused.any():
+                block[reused] = store['vectors'][rows[reused]]
+            if new_vectors is not None:
+                block[missing] = new_vectors
+            embeddings[start:stop] = block
+        logger.info(f"Jugadores codificados: {encoded_rows} de {len(df)}")
         
-        # Generar embeddings
-        embeddings = embedder.encode(df['player_description'].tolist())
+        embeddings.flush()
         
         # Crear índice FAISS
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings)
+        index = build_index(embeddings, params)
+        del embeddings
         
         # Guardar
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        faiss.write_index(index, save_path)
+        manifest = {
+            'version': EMBEDDING_STORE_VERSION,
+            'model_name': model_name,
+            'dimension': int(dimension),
+            'rows': len(df),
+            'dataset_hash': dataset_hash,
+            'vectors_digest': _file_digest(tmp_vectors),
+            'index': params,
+        }
+        os.replace(tmp_vectors, paths['vectors'])
+        _atomic_save(paths['hashes'], _save_npy(hashes))
+        _atomic_save(paths['index'], lambda path: faiss.write_index(index, path))
+        # El manifiesto se escribe al final: sólo describe artefactos completos
+        _atomic_save(paths['manifest'], _save_json(manifest))
+        embeddings = np.load(paths['vectors'], mmap_mode='r')
         
         logger.info(f"Embeddings generados correctamente. Dimensiones: {embeddings.shape}")
         return embeddings, index
@@ -69,10 +276,12 @@ def generate_embeddings(df: pd.DataFrame, save_path: str) -> Tuple[np.ndarray, f
         raise
 
 def load_embeddings_index(filepath: str) -> faiss.Index:
-    """Carga el índice FAISS desde disco"""
+    """Carga el índice FAISS desde disco (mapeado en memoria si FAISS_MMAP)"""
     try:
         logger.info(f"Cargando índice FAISS desde {filepath}")
-        return faiss.read_index(filepath)
+        store = load_embedding_store(filepath, verify=False)
+        params = store['manifest'].get('index') if store is not None else None
+        return read_index(filepath, params, mmap=settings.FAISS_MMAP)
     except Exception as e:
         logger.error(f"Error cargando índice: {str(e)}")
         raise
@@ -81,22 +290,28 @@ def get_similar_players(
     players_df: pd.DataFrame,
     index: faiss.Index,
     criteria: Dict[str, int],
-    embedder: SentenceTransformer,
+    embedder: "SentenceTransformer",
     top_k: int = 5
 ) -> pd.DataFrame:
     """
     Encuentra jugadores similares a los criterios dados usando búsqueda semántica.
+
+    Los criterios se aplican dentro de la búsqueda FAISS (como selector de
+    IDs), por lo que se devuelven hasta `top_k` jugadores que los cumplen
+    aunque el filtro sea muy selectivo. Los IDs del índice son las etiquetas
+    del índice de `players_df`.
     """
     try:
         # 1. Verificar y normalizar nombres de columnas
         rating_col = 'Overall' if 'Overall' in players_df.columns else 'overall'
         
         # 2. Filtrar jugadores por criterios mínimos
-        for attr, min_value in criteria.items():
-            # Buscar el nombre real de la columna (case insensitive)
-            attr_cols = [col for col in players_df.columns if col.lower() == attr.lower()]
-            if attr_cols:
-                players_df = players_df[players_df[attr_cols[0]] >= min_value]
+        with span('similar.filter'):
+            for attr, min_value in criteria.items():
+                # Buscar el nombre real de la columna (case insensitive)
+                attr_cols = [col for col in players_df.columns if col.lower() == attr.lower()]
+                if attr_cols:
+                    players_df = players_df[players_df[attr_cols[0]] >= min_value]
         
         if players_df.empty:
             return pd.DataFrame()
@@ -104,11 +319,12 @@ def get_similar_players(
         # 3. Obtener índices de los jugadores filtrados
         player_indices = players_df.index.values
         
-        # 4. Buscar jugadores similares en el índice FAISS
-        distances, indices = index.search(np.array([team_embedding]), top_k)
+        # 4. Buscar sólo entre los jugadores filtrados en el índice FAISS
+        with span('similar.faiss_search'):
+            distances, indices = filtered_search(index, team_embedding, player_indices, top_k)
         
-        # 5. Filtrar jugadores que cumplen los criterios
-        similar_indices = [i for i in indices[0] if i in player_indices]
+        # 5. Descartar huecos (-1) si el índice no completó los resultados
+        similar_indices = [i for i in indices[0] if i >= 0]
         similar_players = players_df.loc[similar_indices]
         
         # 6. Ordenar por puntuación general (usando el nombre de columna correcto)
@@ -116,4 +332,4 @@ def get_similar_players(
         
     except Exception as e:
         logger.error(f"Error en búsqueda de jugadores similares: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from app.services.metrics import observe_stage
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """No hay lugar en el executor: el cliente debe reintentar más tarde"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Servidor saturado, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Executor acotado para el trabajo de CPU de los endpoints.
+
+    Como mucho `max_concurrency` tareas corren a la vez (un hilo cada una) y
+    otras `max_queue` pueden esperar turno; cualquier request adicional se
+    rechaza de inmediato con ExecutorSaturated en lugar de acumular latencia.
+    Así el event loop queda libre para el resto de endpoints (p. ej. /health).
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, retry_after: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Sólo se modifican desde el event loop, no necesitan lock
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_concurrency + self.max_queue
+
+    @asynccontextmanager
+    async def admit(self):
+        """Reserva un lugar para el request o lo rechaza si el executor está lleno"""
+        if self.admitted >= self.capacity:
+            self.rejected += 1
+            logger.warning(f"Executor saturado ({self.admitted} requests en curso), request rechazado")
+            raise ExecutorSaturated(self.retry_after)
+        self.admitted += 1
+        try:
+            yield self
+        finally:
+            self.admitted -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta `fn` en un hilo del pool sin bloquear el event loop.
+
+        El hilo corre con una copia del contexto del request (los spans de
+        métricas llegan a su Server-Timing) y se registra cuánto esperó turno.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="cpu-worker")
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def call():
+            observe_stage('executor.queue', time.perf_counter() - submitted)
+            return fn(*args, **kwargs)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, functools.partial(context.run, call)
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.admitted,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'rejected': self.rejected,
+            'completed': self.completed,
+        }
+
+
+cpu_executor = BoundedExecutor(
+    settings.CPU_MAX_CONCURRENCY,
+    settings.CPU_QUEUE_DEPTH,
+    settings.CPU_RETRY_AFTER_SECONDS,
+)
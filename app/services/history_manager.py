@@ -0,0 +1,339 @@
+import atexit
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.services.roster_similarity import MinHashLSH, jaccard, roster_tokens
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def team_hash(response_data: Dict) -> str:
+    """Hash estable del contenido del equipo (igual en todos los procesos, a diferencia de hash())"""
+    canonical = json.dumps(response_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class HistoryManager:
+    """
+    Historial de equipos generados en SQLite (WAL), sólo de inserción.
+
+    `add_request` encola la entrada y vuelve de inmediato; un hilo escritor
+    la guarda en lotes, así el request no espera al disco. Cada entrada lleva
+    un número de secuencia y el escritor publica el último que guardó: una
+    lectura espera sólo a las entradas encoladas antes de ella (las de ese
+    usuario si la consulta es por usuario), no a que se vacíe la cola, y usa
+    los índices por usuario y por hash. La retención se aplica por cantidad
+    y por antigüedad en lugar de truncar el archivo.
+
+    Cada plantilla se indexa además con MinHash/LSH sobre los IDs de sus
+    jugadores (tabla roster_bands), de modo que `get_similar_rosters` sólo
+    compara contra las entradas que comparten alguna cubeta.
+    """
+
+    def __init__(self, storage_path: str = settings.HISTORY_PATH,
+                 max_entries: int = settings.HISTORY_MAX_ENTRIES,
+                 max_age_days: float = settings.HISTORY_MAX_AGE_DAYS,
+                 legacy_path: Optional[str] = "data/team_history.json",
+                 batch_size: int = 256,
+                 num_perm: int = settings.HISTORY_MINHASH_PERMUTATIONS,
+                 bands: int = settings.HISTORY_LSH_BANDS,
+                 by_position: bool = settings.HISTORY_LSH_BY_POSITION):
+        self.storage_path = Path(storage_path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.batch_size = max(1, batch_size)
+        self.lsh = MinHashLSH(num_perm, bands)
+        self.by_position = by_position
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Última secuencia encolada, última guardada y la última pendiente de cada usuario
+        self._sequence = 0
+        self._committed = 0
+        self._pending_users: Dict[Optional[str], int] = {}
+        self._written = threading.Condition()
+        self._ensure_storage()
+        if legacy_path:
+            self._import_legacy(Path(legacy_path))
+        self._read_local = threading.local()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.storage_path), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_storage(self):
+        """Crea la base de historial y sus índices si no existen"""
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    user_id TEXT,
+                    team_hash TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    response TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS history_user ON history (user_id, id);
+                CREATE INDEX IF NOT EXISTS history_team_hash ON history (team_hash, id);
+                CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+                CREATE TABLE IF NOT EXISTS roster_bands (
+                    bucket INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS roster_bands_id ON roster_bands (id);
+                CREATE TABLE IF NOT EXISTS history_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+            self._check_lsh(conn)
+        finally:
+            conn.close()
+
+    def _lsh_params(self) -> str:
+        return json.dumps({'num_perm': self.lsh.num_perm, 'bands': self.lsh.bands, 'by_position': self.by_position})
+
+    def _check_lsh(self, conn: sqlite3.Connection):
+        """Reindexa las plantillas si cambiaron los parámetros de MinHash/LSH"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM history_meta WHERE key = 'lsh'").fetchone()
+            params = self._lsh_params()
+            if row is None or row[0] != params:
+                conn.execute("DELETE FROM roster_bands")
+                rows = conn.execute("SELECT id, response FROM history").fetchall()
+                for row_id, response in rows:
+                    self._index_roster(conn, row_id, json.loads(response))
+                conn.execute("INSERT OR REPLACE INTO history_meta (key, value) VALUES ('lsh', ?)", (params,))
+                if rows:
+                    logger.info(f"Reindexadas {len(rows)} plantillas del historial para búsqueda por similitud")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _index_roster(self, conn: sqlite3.Connection, row_id: int, response_data: Dict):
+        buckets = self.lsh.buckets(roster_tokens(response_data, self.by_position))
+        conn.executemany("INSERT OR IGNORE INTO roster_bands (bucket, id) VALUES (?, ?)",
+                         [(bucket, row_id) for bucket in buckets])
+
+    def _import_legacy(self, legacy_path: Path):
+        """Importa una sola vez el historial del antiguo archivo JSON"""
+        if not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                entries = json.load(f)
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None:
+                    for entry in entries:
+                        # El hash antiguo dependía del proceso: se recalcula
+                        entry['team_hash'] = team_hash(entry.get('response', {}))
+                        entry['created_at'] = datetime.fromisoformat(entry['timestamp']).timestamp()
+                    self._insert(conn, entries)
+                    logger.info(f"Importadas {len(entries)} entradas de historial desde {legacy_path}")
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error importando historial antiguo: {str(e)}")
+
+    def _insert(self, conn: sqlite3.Connection, entries: List[Dict]):
+        for e in entries:
+            row_id = conn.execute(
+                "INSERT INTO history (timestamp, created_at, user_id, team_hash, request, response) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (e['timestamp'], e['created_at'], e.get('user_id'), e['team_hash'],
+                 json.dumps(e.get('request', {}), default=str), json.dumps(e.get('response', {}), default=str))
+            ).lastrowid
+            self._index_roster(conn, row_id, e.get('response', {}))
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not _STOP]
+            stopping = len(items) < len(batch)
+            entries = [entry for _, entry in items]
+            try:
+                if entries:
+                    conn.execute("BEGIN IMMEDIATE")
+                    self._insert(conn, entries)
+                    self._apply_retention(conn)
+                    conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logger.error(f"Error guardando {len(entries)} entradas de historial: {str(e)}")
+            finally:
+                if items:
+                    self._mark_written(items[-1][0], {entry.get('user_id') for entry in entries})
+        conn.close()
+
+    def _mark_written(self, sequence: int, user_ids: set):
+        """Publica la última secuencia procesada (guardada o descartada por error)"""
+        with self._written:
+            self._committed = sequence
+            for user_id in user_ids:
+                if self._pending_users.get(user_id, 0) <= sequence:
+                    self._pending_users.pop(user_id, None)
+            self._written.notify_all()
+
+    def _wait_written(self, user_id: Optional[str] = None):
+        """Espera a las entradas encoladas hasta ahora (sólo las de `user_id` si se indica)"""
+        with self._written:
+            target = self._sequence if user_id is None else self._pending_users.get(user_id, 0)
+            while self._committed < target and self._writer.is_alive():
+                self._written.wait(0.1)
+
+    def _apply_retention(self, conn: sqlite3.Connection):
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            conn.execute("DELETE FROM roster_bands WHERE id IN (SELECT id FROM history WHERE created_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM history WHERE created_at < ?", (cutoff,))
+        if self.max_entries:
+            last_dropped = conn.execute(
+                "SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_entries,)
+            ).fetchone()
+            if last_dropped is not None:
+                conn.execute("DELETE FROM roster_bands WHERE id <= ?", (last_dropped[0],))
+                conn.execute("DELETE FROM history WHERE id <= ?", (last_dropped[0],))
+
+    def add_request(self, user_id: str, request_data: Dict, response_data: Dict):
+        """Añade una nueva solicitud al historial (se escribe en segundo plano)"""
+        try:
+            now = datetime.now()
+            entry = {
+                "timestamp": now.isoformat(),
+                "created_at": now.timestamp(),
+                "user_id": user_id,
+                "request": request_data,
+                "response": response_data,
+                "team_hash": team_hash(response_data)
+            }
+            with self._written:
+                # Secuencia y cola en el mismo orden: el escritor las guarda en orden
+                self._sequence += 1
+                self._pending_users[user_id] = self._sequence
+                self._queue.put((self._sequence, entry))
+            return entry
+        except Exception as e:
+            logger.error(f"Error añadiendo al historial: {str(e)}")
+            return None
+
+    def flush(self):
+        """Espera a que las entradas encoladas hasta ahora estén en disco"""
+        self._wait_written()
+
+    def close(self):
+        # Sin esto atexit mantiene viva la instancia hasta que termina el proceso
+        atexit.unregister(self.close)
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _reader(self, user_id: Optional[str] = None) -> sqlite3.Connection:
+        self._wait_written(user_id)
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            conn = self._read_local.conn = self._connect()
+        return conn
+
+    def _query(self, sql: str, params: tuple = (), user_id: Optional[str] = None) -> List[Dict]:
+        conn = self._reader(user_id)
+        return [
+            {
+                "timestamp": row["timestamp"],
+                "user_id": row["user_id"],
+                "request": json.loads(row["request"]),
+                "response": json.loads(row["response"]),
+                "team_hash": row["team_hash"],
+            }
+            for row in conn.execute(sql, params)
+        ]
+
+    def get_history(self, user_id: str = None, limit: Optional[int] = None) -> List[Dict]:
+        """Obtiene el historial completo o filtrado por usuario (del más antiguo al más reciente)"""
+        try:
+            where, params = ("WHERE user_id = ?", (user_id,)) if user_id else ("", ())
+            if limit is None:
+                return self._query(f"SELECT * FROM history {where} ORDER BY id", params, user_id)
+            recent = self._query(f"SELECT * FROM history {where} ORDER BY id DESC LIMIT ?",
+                                 params + (limit,), user_id)
+            return recent[::-1]
+        except Exception as e:
+            logger.error(f"Error leyendo historial: {str(e)}")
+            return []
+
+    def get_last_team(self, user_id: str) -> Dict:
+        """Obtiene el último equipo generado por el usuario"""
+        user_history = self.get_history(user_id, limit=1)
+        return user_history[-1] if user_history else None
+
+    def get_similar_teams(self, team_hash: str) -> List[Dict]:
+        """Busca equipos idénticos en el historial (mismo hash de contenido)"""
+        try:
+            return self._query("SELECT * FROM history WHERE team_hash = ? ORDER BY id", (team_hash,))
+        except Exception as e:
+            logger.error(f"Error leyendo historial: {str(e)}")
+            return []
+
+    def get_similar_rosters(self, response_data: Dict, limit: int = 10, min_similarity: float = 0.3,
+                            max_candidates: int = 1000) -> List[Dict]:
+        """
+        Equipos del historial con plantillas parecidas (Jaccard sobre los IDs de jugadores).
+
+        Los candidatos salen de las cubetas LSH compartidas (ordenados por
+        cantidad de bandas en común, como mucho `max_candidates`) y se puntúan
+        con el Jaccard exacto; cada entrada incluye su 'similarity'.
+        """
+        try:
+            tokens = roster_tokens(response_data, self.by_position)
+            buckets = self.lsh.buckets(tokens)
+            if not buckets:
+                return []
+            conn = self._reader()
+            placeholders = ','.join('?' * len(buckets))
+            candidates = [row[0] for row in conn.execute(
+                f"SELECT id FROM roster_bands WHERE bucket IN ({placeholders}) "
+                f"GROUP BY id ORDER BY COUNT(*) DESC, id DESC LIMIT ?",
+                (*buckets, max_candidates)
+            )]
+            if not candidates:
+                return []
+            entries = self._query(
+                f"SELECT * FROM history WHERE id IN ({','.join('?' * len(candidates))}) ORDER BY id DESC",
+                tuple(candidates)
+            )
+            for entry in entries:
+                entry['similarity'] = jaccard(tokens, roster_tokens(entry['response'], self.by_position))
+            similar = [entry for entry in entries if entry['similarity'] >= min_similarity]
+            # sorted es estable: a igual similitud quedan primero los más recientes
+            return sorted(similar, key=lambda entry: -entry['similarity'])[:limit]
+        except Exception as e:
+            logger.error(f"Error buscando plantillas similares: {str(e)}")
+            return []
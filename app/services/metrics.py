@@ -0,0 +1,148 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites de los buckets en segundos (los de los clientes de Prometheus, más 30 y 60)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans del request en curso (para Server-Timing); None fuera de un request
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    'request_spans', default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Histograma acumulativo por combinación de etiquetas, al estilo Prometheus.
+
+    `observe` sólo hace una búsqueda binaria y tres sumas bajo un lock; el
+    formato de texto se arma únicamente cuando alguien consulta /metrics.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        with self._lock:
+            return {
+                labels: {'counts': list(counts), 'sum': total, 'count': count}
+                for labels, (counts, total, count) in self._series.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            base = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = base + ',' if base else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_number(bound)}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series['sum']!r}")
+            lines.append(f"{self.name}_count{{{base}}} {series['count']}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+stage_seconds = Histogram(
+    'fifa_stage_duration_seconds', "Duración de cada etapa instrumentada", ('stage',)
+)
+http_seconds = Histogram(
+    'fifa_http_request_duration_seconds', "Duración de los requests HTTP por ruta", ('method', 'route', 'status')
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Registra la duración de una etapa (en el histograma y en el request en curso)"""
+    if not settings.METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Mide el bloque como la etapa `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def start_request() -> Tuple[List[Tuple[str, float]], contextvars.Token]:
+    spans: List[Tuple[str, float]] = []
+    return spans, _request_spans.set(spans)
+
+
+def end_request(token: contextvars.Token):
+    _request_spans.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Valor del encabezado Server-Timing (las etapas repetidas se suman)"""
+    durations: Dict[str, float] = {}
+    for stage, seconds in list(spans):
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in durations.items())
+
+
+def _gauge(name: str, documentation: str, value: float) -> List[str]:
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {_format_number(value)}"]
+
+
+def render(gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """
+    Exposición en formato de texto de Prometheus.
+
+    `gauges` agrega, por prefijo, los valores numéricos de un dict de
+    estadísticas (p. ej. {'team_cache': team_cache.stats()}).
+    """
+    lines = stage_seconds.render() + http_seconds.render()
+    for prefix, stats in (gauges or {}).items():
+        for key, value in (stats or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines += _gauge(f"fifa_{prefix}_{key}", f"{prefix} {key}", value)
+    return '\n'.join(lines) + '\n'
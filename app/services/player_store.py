@@ -0,0 +1,469 @@
+import hashlib
+import json
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "fifa-player-store"
+STORE_VERSION = 4
+SCHEMA_FILE = "schema.json"
+
+# Filas por bloque al compilar: la memoria pico depende de esto y no del tamaño del CSV
+CHUNK_ROWS = 100_000
+# Filas por bloque al copiar o convertir un archivo de columna ya escrito (y
+# categorías por bloque al pasarlas a texto de ancho fijo)
+_COPY_ROWS = 1 << 20
+_COPY_TEXTS = 1 << 16
+
+# Atributos detallados del formato de sofifa (los arqueros no tienen pace,
+# shooting, etc.: se guardan como float32 con NaN)
+NUMERIC_COLUMNS = [
+    'pace', 'shooting', 'passing', 'dribbling', 'defending', 'physic',
+    'attacking_crossing', 'attacking_finishing', 'attacking_heading_accuracy',
+    'attacking_short_passing', 'attacking_volleys', 'skill_dribbling',
+    'skill_curve', 'skill_fk_accuracy', 'skill_long_passing', 'skill_ball_control',
+    'movement_acceleration', 'movement_sprint_speed', 'movement_agility',
+    'movement_reactions', 'movement_balance', 'power_shot_power',
+    'power_jumping', 'power_stamina', 'power_strength', 'power_long_shots',
+    'mentality_aggression', 'mentality_interceptions', 'mentality_positioning',
+    'mentality_vision', 'mentality_penalties', 'mentality_composure',
+    'defending_marking', 'defending_standing_tackle', 'defending_sliding_tackle',
+    'goalkeeping_diving', 'goalkeeping_handling', 'goalkeeping_kicking',
+    'goalkeeping_positioning', 'goalkeeping_reflexes'
+]
+
+# Columnas que consumen TeamRecommender._preprocess_data y el constructor de
+# descripciones de embeddings (con sus nombres alternativos) y los atributos
+# que devuelve load_and_preprocess_data
+STORE_COLUMNS = [
+    'ID', 'Name', 'BestPosition', 'Overall', 'ValueEUR', 'Nationality',
+    'Potential', 'Height', 'SprintSpeed', 'Agility', 'Dribbling',
+    'BallControl', 'Jumping', 'Interceptions', 'Marking', 'Crossing',
+    'ShortPassing', 'Positioning', 'Vision', 'Penalties', 'ShotPower',
+    'DefendingTotal', 'PhysicalityTotal', 'ShootingTotal', 'PassingTotal',
+    'Age', 'Positions', 'Position',
+    'short_name', 'name', 'age', 'nationality', 'player_positions', 'overall',
+    *NUMERIC_COLUMNS,
+]
+
+# Valoraciones de 0 a 99 (y edad y altura en cm): caben en un byte
+RATING_COLUMNS = [
+    'Overall', 'Potential', 'SprintSpeed', 'Agility', 'Dribbling', 'BallControl',
+    'Jumping', 'Interceptions', 'Marking', 'Crossing', 'ShortPassing', 'Positioning',
+    'Vision', 'Penalties', 'ShotPower', 'DefendingTotal', 'PhysicalityTotal',
+    'ShootingTotal', 'PassingTotal', 'Age', 'Height', 'overall', 'age',
+]
+
+# Esquema compacto declarado de cada columna. Una columna entera con faltantes,
+# decimales o valores fuera de rango se guarda como float32 (conserva los NaN).
+# Las de texto son categóricas: cada nombre o nacionalidad distinto se guarda una vez.
+COMPACT_SCHEMA: Dict[str, str] = {
+    'ID': 'int32',
+    'ValueEUR': 'int32',
+    **{col: 'uint8' for col in RATING_COLUMNS + NUMERIC_COLUMNS},
+    **{col: 'category' for col in (
+        'Name', 'short_name', 'name', 'BestPosition', 'Positions', 'Position',
+        'player_positions', 'Nationality', 'nationality', 'main_position', 'position_group',
+    )},
+}
+
+
+def default_store_path(source_path: str) -> Path:
+    """Ruta del almacén columnar asociado a un CSV (players_21.csv -> players_21.store)"""
+    return Path(source_path).with_suffix('.store')
+
+
+def is_store(path: str) -> bool:
+    return (Path(path) / SCHEMA_FILE).exists()
+
+
+def _as_sources(source_path: Union[str, Sequence[str]]) -> List[Path]:
+    """Uno o varios CSV (p. ej. varias ediciones de FIFA) en el orden dado"""
+    paths = [source_path] if isinstance(source_path, (str, os.PathLike)) else list(source_path)
+    if not paths:
+        raise ValueError("No se indicó ningún archivo de jugadores")
+    return [Path(path) for path in paths]
+
+
+def _source_fingerprint(sources: List[Path]) -> List[Dict]:
+    fingerprint = []
+    for source in sources:
+        stat = source.stat()
+        fingerprint.append({'file': source.name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return fingerprint
+
+
+def read_schema(store_path: str) -> Optional[Dict]:
+    """Lee la cabecera del almacén (o None si no existe o es de otra versión)"""
+    schema_path = Path(store_path) / SCHEMA_FILE
+    if not schema_path.exists():
+        return None
+    with open(schema_path, 'r') as f:
+        schema = json.load(f)
+    if schema.get('format') != STORE_FORMAT or schema.get('version') != STORE_VERSION:
+        return None
+    return schema
+
+
+def is_fresh(store_path: str, source_path: Union[str, Sequence[str]]) -> bool:
+    """Indica si el almacén fue compilado a partir de la versión actual de los CSV"""
+    schema = read_schema(store_path)
+    if schema is None:
+        return False
+    return schema.get('source') == _source_fingerprint(_as_sources(source_path))
+
+
+def compact_column(series: pd.Series, dtype: Optional[str]) -> pd.Series:
+    """Convierte una columna a su tipo declarado (sin copiar si ya lo tiene)"""
+    if dtype is None:
+        return series
+    if dtype == 'category':
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        return series.astype('object').astype('category')
+    if series.dtype == dtype:
+        return series
+    values = pd.to_numeric(series, errors='coerce')
+    if np.dtype(dtype).kind in 'iu':
+        info = np.iinfo(dtype)
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        if (len(numbers) and not np.isnan(numbers).any() and numbers.min() >= info.min
+                and numbers.max() <= info.max and np.all(numbers == np.round(numbers))):
+            return values.astype(dtype)
+        dtype = 'float32'
+    return values.astype(dtype)
+
+
+def compact_frame(df: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Aplica el esquema compacto a las columnas declaradas; el resto queda igual"""
+    schema = COMPACT_SCHEMA if schema is None else schema
+    return pd.DataFrame(
+        {col: compact_column(df[col], schema.get(col)) for col in df.columns},
+        index=df.index, copy=False
+    )
+
+
+def memory_report(before: pd.DataFrame, after: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Bytes por columna antes y después de compactar (`after` por defecto es
+    compact_frame(before)), con una fila 'total' al final.
+    """
+    if after is None:
+        after = compact_frame(before)
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False).reindex(before.columns, fill_value=0)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': before_bytes,
+        'dtype_after': after.dtypes.astype(str).reindex(before.columns, fill_value=''),
+        'bytes_after': after_bytes,
+    })
+    report.loc['total'] = ['', int(before_bytes.sum()), '', int(after_bytes.sum())]
+    saved = 1 - report['bytes_after'] / report['bytes_before'].replace(0, np.nan)
+    report['saved_pct'] = (saved * 100).fillna(0.0).round(1)
+    return report
+
+
+def _copy_as_npy(raw_path: Path, target: Path, dtype: np.dtype, rows: int,
+                 out_dtype: Optional[np.dtype] = None):
+    """Escribe el .npy de una columna cruda por bloques (convirtiendo el tipo si hace falta)"""
+    out_dtype = np.dtype(out_dtype or dtype)
+    with open(raw_path, 'rb') as src, open(target, 'wb') as dst:
+        np.lib.format.write_array_header_1_0(dst, {
+            'descr': np.lib.format.dtype_to_descr(out_dtype), 'fortran_order': False, 'shape': (rows,)
+        })
+        while True:
+            block = np.fromfile(src, dtype=dtype, count=_COPY_ROWS)
+            if not len(block):
+                break
+            dst.write(block.astype(out_dtype, copy=False).tobytes())
+
+
+class _TextDictionary:
+    """
+    Diccionario valor -> código de una columna de texto, con memoria acotada.
+
+    En RAM sólo quedan los digests de 16 bytes ordenados y su código (unos
+    20 bytes por valor distinto, en lugar de un dict de str de Python); los
+    textos se escriben a disco en orden de código a medida que aparecen.
+    """
+
+    def __init__(self, directory: Path, name: str):
+        self.directory = directory
+        self.name = name
+        self.size = 0
+        self.max_chars = 1
+        self._digests = np.empty(0, dtype='S16')
+        self._codes = np.empty(0, dtype=np.int32)
+        self._text_path = directory / f"{name}.categories.raw"
+        self._lengths_path = directory / f"{name}.lengths.raw"
+        self._text = open(self._text_path, 'wb')
+        self._lengths = open(self._lengths_path, 'wb')
+
+    def codes(self, values: List[str]) -> np.ndarray:
+        """Código de cada valor (distintos entre sí), agregando los nuevos"""
+        digests = np.array(
+            [hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest() for value in values], dtype='S16'
+        )
+        codes = np.empty(len(values), dtype=np.int32)
+        found = np.zeros(len(values), dtype=bool)
+        if self.size:
+            slots = np.minimum(np.searchsorted(self._digests, digests), self.size - 1)
+            found = self._digests[slots] == digests
+            codes[found] = self._codes[slots[found]]
+
+        new = np.flatnonzero(~found)
+        if len(new):
+            codes[new] = np.arange(self.size, self.size + len(new), dtype=np.int32)
+            encoded = [values[i].encode('utf-8') for i in new]
+            self._text.write(b''.join(encoded))
+            self._lengths.write(np.array([len(e) for e in encoded], dtype=np.int64).tobytes())
+            self.max_chars = max(self.max_chars, max(len(values[i]) for i in new))
+            # Inserción ordenada: O(valores distintos) por bloque, sin reordenar todo
+            order = np.argsort(digests[new])
+            new_digests = digests[new][order]
+            slots = np.searchsorted(self._digests, new_digests)
+            self._digests = np.insert(self._digests, slots, new_digests)
+            self._codes = np.insert(self._codes, slots, codes[new][order])
+            self.size += len(new)
+        return codes
+
+    def finish(self, target: Path):
+        """Escribe las categorías como .npy de texto de ancho fijo, por bloques"""
+        self.close()
+        lengths = np.fromfile(self._lengths_path, dtype=np.int64)
+        dtype = np.dtype(f'<U{self.max_chars}')
+        with open(self._text_path, 'rb') as src, open(target, 'wb') as dst:
+            np.lib.format.write_array_header_1_0(dst, {
+                'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (self.size,)
+            })
+            for start in range(0, self.size, _COPY_TEXTS):
+                block = lengths[start:start + _COPY_TEXTS]
+                data = src.read(int(block.sum()))
+                offsets = np.concatenate([[0], np.cumsum(block)])
+                texts = [data[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+                dst.write(np.array(texts, dtype=dtype).tobytes())
+        self._text_path.unlink()
+        self._lengths_path.unlink()
+
+    def close(self):
+        for f in (self._text, self._lengths):
+            if not f.closed:
+                f.close()
+
+
+class _ColumnWriter:
+    """
+    Acumula una columna del almacén bloque a bloque en un archivo crudo.
+
+    Las numéricas toman el tipo declarado en COMPACT_SCHEMA; si un bloque
+    posterior necesita float32 (faltantes, decimales o fuera de rango), lo
+    ya escrito se convierte una sola vez. Las de texto usan un
+    _TextDictionary global y escriben códigos int32, que al cerrar se reducen
+    al entero más chico que alcanza.
+    """
+
+    def __init__(self, directory: Path, name: str, declared: Optional[str], categorical: bool):
+        self.directory = directory
+        self.name = name
+        self.declared = declared
+        self.kind = 'categorical' if categorical else 'numeric'
+        self.dtype = np.dtype('int32') if categorical else None
+        self.categories = _TextDictionary(directory, name) if categorical else None
+        self.rows = 0
+        self.path = directory / f"{name}.raw"
+        self._file = open(self.path, 'wb')
+
+    def _float_dtype(self) -> np.dtype:
+        return np.dtype('float32') if self.declared else np.dtype('float64')
+
+    def _widen(self, dtype: np.dtype):
+        """Cambia el tipo de la columna convirtiendo lo ya escrito"""
+        if self.dtype is None or self.rows == 0:
+            self.dtype = dtype
+            return
+        if dtype == self.dtype:
+            return
+        self._file.close()
+        converted = self.path.with_suffix('.widen')
+        with open(self.path, 'rb') as src, open(converted, 'wb') as dst:
+            while True:
+                block = np.fromfile(src, dtype=self.dtype, count=_COPY_ROWS)
+                if not len(block):
+                    break
+                dst.write(block.astype(dtype).tobytes())
+        os.replace(converted, self.path)
+        self._file = open(self.path, 'ab')
+        self.dtype = dtype
+
+    def append(self, series: pd.Series):
+        if self.kind == 'categorical':
+            categorical = pd.Categorical(series.astype('object'))
+            lookup = self.categories.codes([str(value) for value in categorical.categories])
+            codes = np.full(len(categorical), -1, dtype=np.int32)
+            valid = categorical.codes >= 0
+            codes[valid] = lookup[categorical.codes[valid]]
+            values = codes
+        else:
+            values = compact_column(series, self.declared).to_numpy()
+            if self.dtype is not None and values.dtype != self.dtype:
+                floating = values.dtype.kind == 'f' or self.dtype.kind == 'f'
+                wide = self._float_dtype() if self.declared and floating else np.result_type(self.dtype, values.dtype)
+                self._widen(wide)
+                values = values.astype(self.dtype)
+            elif self.dtype is None:
+                self.dtype = values.dtype
+        self._file.write(values.tobytes())
+        self.rows += len(values)
+
+    def append_missing(self, rows: int):
+        """Filas de un CSV que no trae esta columna: NaN o código -1"""
+        if rows == 0:
+            return
+        if self.kind == 'numeric':
+            if self.dtype is None or self.dtype.kind != 'f':
+                self._widen(self._float_dtype())
+            self._file.write(np.full(rows, np.nan, dtype=self.dtype).tobytes())
+        else:
+            self._file.write(np.full(rows, -1, dtype=np.int32).tobytes())
+        self.rows += rows
+
+    def finish(self) -> Dict:
+        """Escribe los .npy definitivos y devuelve la entrada del esquema"""
+        self._file.close()
+        if self.kind == 'numeric':
+            dtype = self.dtype or self._float_dtype()
+            _copy_as_npy(self.path, self.directory / f"{self.name}.npy", dtype, self.rows)
+            self.path.unlink()
+            return {'name': self.name, 'kind': 'numeric', 'dtype': str(dtype)}
+        size = self.categories.size
+        codes_dtype = next(t for t in (np.int8, np.int16, np.int32) if size <= np.iinfo(t).max)
+        _copy_as_npy(self.path, self.directory / f"{self.name}.codes.npy", self.dtype, self.rows, codes_dtype)
+        self.categories.finish(self.directory / f"{self.name}.categories.npy")
+        self.path.unlink()
+        return {'name': self.name, 'kind': 'categorical', 'dtype': 'category'}
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if self.categories is not None:
+            self.categories.close()
+
+
+def compile_player_store(source_path: Union[str, Sequence[str]], store_path: Optional[str] = None,
+                         chunksize: int = CHUNK_ROWS) -> Path:
+    """
+    Compila uno o varios CSV de jugadores a un almacén columnar binario.
+
+    Los CSV se leen por bloques de `chunksize` filas y sólo con las columnas
+    de STORE_COLUMNS; a cada bloque se le agregan la posición principal y
+    el grupo de posición y se convierten sus atributos numéricos
+    (data_processing.prepare_chunk), luego pasa al esquema compacto y se
+    agrega a su columna, de modo que la memoria pico depende del bloque (y
+    de los valores distintos de las columnas de texto), no del archivo. Cada
+    columna queda en su propio .npy (mapeable en memoria) y schema.json
+    actúa de cabecera con la versión del formato, el esquema y la huella de
+    los CSV de origen. Con varios CSV (p. ej. varias ediciones) las filas se
+    concatenan en orden y las columnas que falten en alguno quedan vacías.
+    """
+    # Import diferido: data_processing importa este módulo
+    from app.services.data_processing import prepare_chunk
+
+    writers: Dict[str, _ColumnWriter] = {}
+    try:
+        sources = _as_sources(source_path)
+        store = Path(store_path) if store_path else default_store_path(sources[0])
+        logger.info(f"Compilando {', '.join(str(s) for s in sources)} en el almacén columnar {store}")
+
+        tmp_store = store.with_name(store.name + '.tmp')
+        shutil.rmtree(tmp_store, ignore_errors=True)
+        tmp_store.mkdir(parents=True)
+
+        # El texto se lee como texto en todos los bloques: un bloque con sólo
+        # números no debe generar categorías distintas ('7' y 7.0)
+        text_columns = {col: 'str' for col, dtype in COMPACT_SCHEMA.items() if dtype == 'category'}
+        rows = 0
+        for source in sources:
+            reader = pd.read_csv(source, usecols=lambda c: c in STORE_COLUMNS, dtype=text_columns,
+                                 chunksize=max(1, chunksize))
+            for chunk in reader:
+                chunk = prepare_chunk(chunk)
+                for col in chunk.columns:
+                    if col not in writers:
+                        categorical = (COMPACT_SCHEMA.get(col) == 'category'
+                                       or not pd.api.types.is_numeric_dtype(chunk[col]))
+                        writers[col] = _ColumnWriter(tmp_store, col, COMPACT_SCHEMA.get(col), categorical)
+                        writers[col].append_missing(rows)
+                for col, writer in writers.items():
+                    if col in chunk.columns:
+                        writer.append(chunk[col])
+                    else:
+                        writer.append_missing(len(chunk))
+                rows += len(chunk)
+
+        schema = {
+            'format': STORE_FORMAT,
+            'version': STORE_VERSION,
+            'rows': rows,
+            'columns': [writer.finish() for writer in writers.values()],
+            'source': _source_fingerprint(sources),
+        }
+        with open(tmp_store / SCHEMA_FILE, 'w') as f:
+            json.dump(schema, f, indent=2)
+
+        shutil.rmtree(store, ignore_errors=True)
+        os.replace(tmp_store, store)
+        logger.info(f"Almacén compilado: {rows} jugadores, {len(writers)} columnas")
+        return store
+
+    except Exception as e:
+        logger.error(f"Error compilando el almacén de jugadores: {str(e)}")
+        raise
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+def load_player_store(store_path: str, mmap: bool = True) -> pd.DataFrame:
+    """Carga el almacén columnar como DataFrame (columnas numéricas mapeadas en memoria)"""
+    schema = read_schema(store_path)
+    if schema is None:
+        raise ValueError(f"Almacén de jugadores inválido o de otra versión: {store_path}")
+
+    store = Path(store_path)
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in schema['columns']:
+        name = column['name']
+        if column['kind'] == 'numeric':
+            data[name] = np.load(store / f"{name}.npy", mmap_mode=mmap_mode)
+        else:
+            codes = np.load(store / f"{name}.codes.npy")
+            categories = np.load(store / f"{name}.categories.npy")
+            data[name] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(data, copy=False)
+
+
+def load_players(source_path: Union[str, Sequence[str]], store_path: Optional[str] = None,
+                 chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Punto de entrada único para cargar jugadores.
+
+    Acepta un almacén, un CSV o una lista de CSV; en los dos últimos casos
+    usa (y si hace falta recompila por bloques) el almacén asociado en lugar
+    de parsear los CSV completos.
+    """
+    if isinstance(source_path, (str, os.PathLike)) and is_store(source_path):
+        return load_player_store(source_path)
+
+    store = store_path or str(default_store_path(_as_sources(source_path)[0]))
+    if not is_fresh(store, source_path):
+        compile_player_store(source_path, store, chunksize)
+    return load_player_store(store)
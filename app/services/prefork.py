@@ -0,0 +1,151 @@
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Variables que leen OpenMP (faiss, torch) y las bibliotecas BLAS al importarse
+NATIVE_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+# Campos de /proc/<pid>/smaps_rollup (en kB) agrupados por métrica
+_SMAPS_FIELDS = {
+    'Rss': 'rss_bytes',
+    'Pss': 'pss_bytes',
+    'Shared_Clean': 'shared_bytes',
+    'Shared_Dirty': 'shared_bytes',
+    'Private_Clean': 'private_bytes',
+    'Private_Dirty': 'private_bytes',
+}
+
+
+def limit_native_threads(threads: int = 1):
+    """
+    Limita los pools de hilos nativos de faiss, torch y BLAS.
+
+    Un pool de OpenMP creado antes de fork() no sobrevive en el hijo y, con
+    varios workers, el paralelismo ya lo dan los procesos. Debe llamarse antes
+    de cargar los recursos; si las bibliotecas ya están importadas se ajustan
+    directamente.
+    """
+    for var in NATIVE_THREAD_VARS:
+        os.environ.setdefault(var, str(threads))
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+    if 'faiss' in sys.modules:
+        sys.modules['faiss'].omp_set_num_threads(threads)
+
+
+def freeze_heap():
+    """
+    Pasa los objetos vivos a la generación permanente del recolector.
+
+    Las recolecciones de los workers no recorren (ni escriben en las cabeceras
+    de) los objetos cargados por el padre, así que sus páginas siguen
+    compartidas en lugar de copiarse en el primer gc.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    RSS, PSS y memoria compartida/privada de un proceso en bytes.
+
+    Lee /proc/<pid>/smaps_rollup (Linux); en otros sistemas devuelve {}. La
+    memoria privada de un worker es lo que realmente cuesta agregarlo.
+    """
+    usage: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup") as f:
+            for line in f:
+                field, _, rest = line.partition(':')
+                key = _SMAPS_FIELDS.get(field)
+                if key is not None:
+                    usage[key] = usage.get(key, 0) + int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return usage
+
+
+class Prefork:
+    """
+    Supervisor de workers creados con fork() a partir de un padre precargado.
+
+    El padre carga los recursos una sola vez; cada worker hereda sus páginas
+    (DataFrame, scores, pesos del modelo, índice) copy-on-write y ejecuta
+    `worker()`. Un worker que termina inesperadamente se reemplaza; SIGTERM o
+    SIGINT en el padre se reenvían a los workers y se espera a que terminen.
+    """
+
+    def __init__(self, worker: Callable[[], None], workers: int, respawn: bool = True,
+                 min_uptime_seconds: float = 1.0):
+        self.worker = worker
+        self.workers = max(1, workers)
+        self.respawn = respawn
+        self.min_uptime_seconds = min_uptime_seconds
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.worker()
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException as e:
+                logger.error(f"Error en el worker {os.getpid()}: {str(e)}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Worker {pid} iniciado")
+        return pid
+
+    def stop(self, signum: int = signal.SIGTERM, frame=None):
+        """Detiene los workers (también es el handler de SIGTERM/SIGINT del padre)"""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        """Crea los workers y los supervisa; devuelve 1 si alguno terminó con error"""
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        failed = False
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            while self.children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                started = self.children.pop(pid, None)
+                if started is None:
+                    continue
+                code = os.waitstatus_to_exitcode(status)
+                if code != 0 and not self.stopping:
+                    failed = True
+                if self.stopping or not self.respawn:
+                    continue
+                logger.warning(f"El worker {pid} terminó con código {code}; se reemplaza")
+                # Un worker que falla al arrancar no debe convertirse en un bucle de fork
+                uptime = time.monotonic() - started
+                if uptime < self.min_uptime_seconds:
+                    time.sleep(self.min_uptime_seconds - uptime)
+                if not self.stopping:
+                    self._spawn()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return 1 if failed else 0
@@ -0,0 +1,162 @@
+import time
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.services.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def resolve_path(path: str) -> Path:
+    """Resuelve rutas relativas de la configuración respecto a la raíz del proyecto"""
+    candidate = Path(path)
+    return candidate if candidate.is_absolute() else BASE_DIR / candidate
+
+
+class ResourceRegistry:
+    """
+    Registro de recursos compartidos por todo el proceso.
+
+    Se construye una sola vez durante el arranque de la aplicación y mantiene
+    el DataFrame de jugadores, el modelo de embeddings, el índice FAISS, el
+    recomendador y el asistente, de modo que cada request sólo los reutiliza.
+    """
+
+    def __init__(self):
+        self.df = None
+        self.embedder = None
+        self.index = None
+        self.recommender = None
+        self.assistant = None
+        self.encoder = None
+        self.sessions = None
+        self.load_times: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.recommender is not None and self.assistant is not None
+
+    def _timed(self, component: str, loader: Callable[[], Any]) -> Any:
+        """Ejecuta la carga de un componente registrando su tiempo"""
+        start = time.perf_counter()
+        result = loader()
+        self.load_times[component] = time.perf_counter() - start
+        observe_stage(f"load.{component}", self.load_times[component])
+        logger.info(f"Componente '{component}' cargado en {self.load_times[component]:.3f}s")
+        return result
+
+    def load(self, data_path: str, embeddings_path: str, model_name: str,
+             embedder=None, store_path: Optional[str] = None,
+             cache_size: int = 4096, cache_max_bytes: int = 32 * 1024 * 1024,
+             batch_size: int = 32, batch_wait_ms: float = 5.0, sessions=None,
+             chunk_rows: Optional[int] = None):
+        """
+        Carga todos los recursos compartidos (datos, modelo, índice y servicios).
+
+        `data_path` admite varios CSV separados por comas (p. ej. varias
+        ediciones), que se compilan por bloques de `chunk_rows` filas en un
+        único almacén.
+
+        En una recarga sin `sessions` se conserva el almacén de sesiones actual
+        (y sus conversaciones); si se pasa uno nuevo, el anterior se cierra.
+        """
+        from app.services.batching_encoder import BatchingEncoder
+        from app.services.embedding_cache import CachedEmbedder
+        from app.services.player_store import CHUNK_ROWS, load_players
+        from app.services.result_cache import team_cache
+        from app.ai_assistant.chat_processor import FIFAAssistant
+        from app.ai_assistant.recommendation_engine import TeamRecommender
+
+        if sessions is None:
+            sessions = self.sessions
+        try:
+            self.error = None
+            self.load_times = {}
+            data_files = [str(resolve_path(path.strip())) for path in data_path.split(',') if path.strip()]
+            for data_file in data_files:
+                if not Path(data_file).exists():
+                    raise FileNotFoundError(f"Archivo no encontrado: {data_file}")
+            source = data_files[0] if len(data_files) == 1 else data_files
+
+            store_file = str(resolve_path(store_path)) if store_path else None
+            df = self._timed(
+                'dataframe', lambda: load_players(source, store_file, chunk_rows or CHUNK_ROWS)
+            )
+            if embedder is None:
+                embedder = self._timed('embedder', lambda: self._load_embedder(model_name))
+            index = self._timed(
+                'index',
+                lambda: self._load_or_build_index(
+                    df, embedder, str(resolve_path(embeddings_path)), model_name
+                )
+            )
+            # Las descripciones del índice no pasan por la caché: sólo el tráfico de requests
+            embedder = CachedEmbedder(embedder, max_entries=cache_size, max_bytes=cache_max_bytes)
+            recommender = self._timed(
+                'recommender',
+                lambda: TeamRecommender(df=df, embedder=embedder, index=index)
+            )
+            assistant = self._timed(
+                'assistant',
+                lambda: FIFAAssistant(
+                    df=df, embedder=embedder, model_name=model_name,
+                    intent_cache_dir=str(resolve_path(embeddings_path).parent),
+                    sessions=sessions
+                )
+            )
+
+            self.df, self.embedder, self.index = df, embedder, index
+            self.recommender, self.assistant = recommender, assistant
+            previous_sessions, self.sessions = self.sessions, assistant.sessions
+            # Los equipos cacheados corresponden al dataset anterior
+            team_cache.invalidate()
+            previous, self.encoder = self.encoder, BatchingEncoder(
+                embedder, max_batch_size=batch_size, max_wait_ms=batch_wait_ms
+            )
+            # En una recarga, el worker del encoder anterior no debe quedar vivo
+            if previous is not None:
+                previous.close_threadsafe()
+            if previous_sessions is not None and previous_sessions is not self.sessions:
+                previous_sessions.close()
+            return self
+
+        except Exception as e:
+            # Un almacén nuevo que no llegó a registrarse no debe quedar abierto
+            if sessions is not None and sessions is not self.sessions:
+                sessions.close()
+            self.error = str(e)
+            logger.error(f"Error cargando recursos compartidos: {str(e)}")
+            raise
+
+    def _load_embedder(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    def _load_or_build_index(self, df, embedder, embeddings_path: str, model_name: str):
+        """Carga el índice persistido; sólo se codifican los jugadores nuevos o modificados"""
+        from app.services.embeddings import generate_embeddings
+
+        _, index = generate_embeddings(df, embeddings_path, embedder=embedder, model_name=model_name)
+        return index
+
+    def status(self) -> Dict[str, Any]:
+        """Estado de preparación con el tiempo de carga de cada componente"""
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "components": {
+                name: {"loaded": True, "load_time_ms": round(seconds * 1000, 2)}
+                for name, seconds in self.load_times.items()
+            },
+            "players": 0 if self.df is None else len(self.df),
+            "embedding_cache": self.embedder.stats() if hasattr(self.embedder, 'stats') else None,
+            "encoder": self.encoder.stats() if self.encoder is not None else None,
+            "sessions": self.sessions.stats() if self.sessions is not None else None,
+        }
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: Any) -> Any:
+    """Claves ordenadas y números equivalentes con una sola representación (2.0 -> 2)"""
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        number = round(float(value), 6)
+        return int(number) if number.is_integer() else number
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def canonical_key(arguments: Dict[str, Any]) -> str:
+    """Clave estable de una solicitud: igual para solicitudes equivalentes"""
+    canonical = json.dumps(_normalize(arguments), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def etag_for(value: Any) -> str:
+    body = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara un encabezado If-None-Match (lista, comodín o etiquetas débiles) con el ETag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+class ResultCache:
+    """
+    Caché LRU con TTL de resultados calculados en el event loop.
+
+    `get_or_compute` coalesce las solicitudes idénticas concurrentes: la
+    primera lanza el cálculo en una tarea y todas esperan esa tarea, de
+    modo que N requests iguales disparan un solo cálculo. `invalidate()`
+    descarta todo (p. ej. al recargar el dataset) y los cálculos que estaban
+    en curso ya no se guardan.
+
+    El estado sólo se modifica desde el event loop que usa la caché, sin
+    lock; `invalidate()` puede llamarse desde otro hilo (p. ej. al recargar
+    el registro en asyncio.to_thread) y en ese caso se agenda en ese loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self._clock = clock
+        # clave -> (expira_en, valor, etag)
+        self._entries: "OrderedDict[str, Tuple[float, Any, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.generation = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Sólo se modifican desde el event loop, no necesitan lock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, etag = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, etag
+
+    def _store(self, key: str, value: Any, etag: str):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             cacheable: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, str, str]:
+        """
+        Devuelve (valor, etag, origen) con origen 'hit', 'coalesced' o 'miss'.
+
+        Sólo se guardan los valores para los que `cacheable(valor)` es verdadero
+        (p. ej. no un equipo vacío por un error).
+        """
+        self._loop = asyncio.get_running_loop()
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[0], cached[1], 'hit'
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            source = 'coalesced'
+        else:
+            self.misses += 1
+            source = 'miss'
+            task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+            # Si todos los que esperaban se cancelaron nadie recupera el error
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+
+        # El cálculo es una tarea propia y shield evita que cancelar este
+        # request (el cliente se desconectó) la cancele: los demás que
+        # esperan la misma clave reciben el resultado
+        value, etag = await asyncio.shield(task)
+        return value, etag, source
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                       cacheable: Callable[[Any], bool]) -> Tuple[Any, str]:
+        generation = self.generation
+        try:
+            value = await compute()
+            etag = etag_for(value)
+            if generation == self.generation and cacheable(value):
+                self._store(key, value, etag)
+            return value, etag
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def invalidate(self):
+        """Descarta todo; desde otro hilo se ejecuta en el event loop de la caché"""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                current = asyncio.get_running_loop()
+            except RuntimeError:
+                current = None
+            if current is not loop:
+                loop.call_soon_threadsafe(self._invalidate)
+                return
+        self._invalidate()
+
+    def _invalidate(self):
+        self._entries.clear()
+        self._inflight.clear()
+        self.generation += 1
+        logger.info(f"Caché de resultados invalidada (generación {self.generation})")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            'generation': self.generation,
+        }
+
+
+team_cache = ResultCache(settings.TEAM_CACHE_SIZE, settings.TEAM_CACHE_TTL_SECONDS)
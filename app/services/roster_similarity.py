@@ -0,0 +1,80 @@
+import hashlib
+from typing import Dict, List, Set
+
+import numpy as np
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def roster_tokens(response_data: Dict, by_position: bool = False) -> Set[str]:
+    """
+    Conjunto de fichas de una plantilla para el Jaccard.
+
+    Cada jugador aporta su ID; con `by_position` aporta además la ficha
+    ID@posición, de modo que repetir jugador en la misma posición pesa el doble
+    que repetirlo en otra.
+    """
+    tokens = set()
+    for player in response_data.get('players') or []:
+        player_id = player.get('id', player.get('ID'))
+        if player_id is None:
+            continue
+        tokens.add(str(player_id))
+        if by_position:
+            tokens.add(f"{player_id}@{player.get('position', '')}")
+    return tokens
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashLSH:
+    """
+    Firmas MinHash y sus cubetas LSH por bandas.
+
+    La firma tiene `num_perm` mínimos de funciones hash multiply-shift; se parte
+    en `bands` bandas de num_perm/bands filas y cada banda da una cubeta. Dos
+    plantillas con Jaccard s comparten al menos una cubeta con probabilidad
+    1-(1-s^r)^b, así que sólo las parecidas llegan a compararse.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) debe ser múltiplo de bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Multiplicadores impares: la multiplicación módulo 2^64 es una biyección
+        self._a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+    @property
+    def threshold(self) -> float:
+        """Jaccard a partir del cual la probabilidad de ser candidato supera 1/2 (aprox.)"""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, tokens: Set[str]) -> np.ndarray:
+        if not tokens:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        x = np.fromiter((_token_hash(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+        hashed = (np.multiply.outer(x, self._a) + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def buckets(self, tokens: Set[str]) -> List[int]:
+        """Una cubeta (entero de 64 bits con signo, apto para SQLite) por banda"""
+        if not tokens:
+            return []
+        bands = self.signature(tokens).reshape(self.bands, self.rows)
+        return [
+            int.from_bytes(
+                hashlib.blake2b(band.tobytes(), digest_size=8, salt=i.to_bytes(8, 'little')).digest(),
+                'little', signed=True
+            )
+            for i, band in enumerate(bands)
+        ]
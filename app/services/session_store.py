@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SESSION_BACKENDS = ('memory', 'sqlite')
+
+
+def _encode(value: Dict[str, Any]) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+class _StripedLocks:
+    """
+    Locks por clave con memoria constante: cada clave cae en una de `stripes`
+    franjas, así no hay que crear (ni limpiar) un lock por usuario.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __call__(self, key: str) -> threading.Lock:
+        return self._locks[zlib.crc32(key.encode('utf-8')) % len(self._locks)]
+
+
+class SessionStore(ABC):
+    """
+    Estado de conversación por usuario con expiración por inactividad.
+
+    `session(key)` es la forma de leer-modificar-escribir: mantiene el lock de
+    la clave mientras dura el bloque y guarda el diccionario al salir, de modo
+    que dos mensajes simultáneos del mismo usuario no se pisan.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._key_locks = _StripedLocks()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Copia del estado de `key` o None si no existe o expiró"""
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any]):
+        """Guarda el estado de `key` y renueva su expiración"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        pass
+
+    @contextmanager
+    def session(self, key: str) -> Iterator[Dict[str, Any]]:
+        with self._key_locks(key):
+            value = self.get(key) or {}
+            yield value
+            self.put(key, value)
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sesiones en memoria del proceso, acotadas por cantidad y por bytes.
+
+    La expiración se renueva en cada acceso, por lo que el orden LRU coincide
+    con el orden de expiración: las sesiones vencidas están siempre al
+    principio del OrderedDict y se purgan sin recorrer el resto.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_entries: int = 10000,
+                 max_bytes: int = 16 * 1024 * 1024, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl_seconds, max_entries)
+        self.max_bytes = max_bytes
+        self._clock = clock
+        # clave -> (expira_en, estado serializado)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(key: str, encoded: str) -> int:
+        return len(key) + len(encoded)
+
+    def _drop(self, key: str):
+        _, encoded = self._entries.pop(key)
+        self._bytes -= self._size(key, encoded)
+
+    def _expire(self, now: float):
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._drop(key)
+            self.expirations += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire(self._clock())
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            # Se guarda serializado: cada lector recibe su propia copia
+            return json.loads(entry[1])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        encoded = _encode(value)
+        size = self._size(key, encoded)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                logger.warning(f"Sesión de '{key}' ({size} bytes) supera el límite del almacén, no se guarda")
+                return
+            self._entries[key] = (now + self.ttl, encoded)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sesiones en un archivo SQLite local compartido por todos los workers del nodo.
+
+    Usa WAL para que las lecturas no bloqueen a las escrituras y
+    `BEGIN IMMEDIATE` en `session()` para serializar el leer-modificar-escribir
+    de una misma conversación también entre procesos. Las filas vencidas y
+    las menos recientes que exceden `max_entries` o `max_bytes` se purgan
+    cada `prune_every` escrituras, así que entre purgas el archivo puede
+    pasarse del límite en a lo sumo esas escrituras.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 1800, max_entries: int = 10000,
+                 max_bytes: int = 16 * 1024 * 1024, prune_every: int = 256,
+                 clock: Callable[[], float] = time.time):
+        super().__init__(ttl_seconds, max_entries)
+        self.max_bytes = max_bytes
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.prune_every = max(1, prune_every)
+        self._clock = clock
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._pid = os.getpid()
+        self._writes = 0
+        self.pruned = 0
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Worker creado con fork(): las conexiones heredadas son del padre y no se tocan
+            self._local = threading.local()
+            self._connections = []
+            self._connections_lock = threading.Lock()
+            self._pid = os.getpid()
+        # sqlite3 no permite compartir una conexión entre hilos: una por hilo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        if conn.in_transaction:
+            # Llamada anidada dentro de session(): ya se tiene el lock de escritura
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT value FROM sessions WHERE key = ? AND expires_at > ?", (key, self._clock())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        encoded = _encode(value)
+        size = len(key) + len(encoded)
+        with self._transaction() as conn:
+            if size > self.max_bytes:
+                logger.warning(f"Sesión de '{key}' ({size} bytes) supera el límite del almacén, no se guarda")
+                conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+                return
+            conn.execute(
+                "INSERT INTO sessions (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, encoded, self._clock() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(conn)
+
+    def delete(self, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    @contextmanager
+    def session(self, key: str) -> Iterator[Dict[str, Any]]:
+        with self._key_locks(key), self._transaction():
+            value = self.get(key) or {}
+            yield value
+            self.put(key, value)
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Borra las sesiones vencidas y las menos recientes por encima de los límites"""
+        expired = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (self._clock(),)).rowcount
+        # Con expiración deslizante, la expiración más próxima es la menos usada
+        excess = conn.execute(
+            "DELETE FROM sessions WHERE key IN ("
+            "SELECT key FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        # Se conservan las más recientes mientras su tamaño acumulado entre en max_bytes
+        oversized = conn.execute(
+            "DELETE FROM sessions WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(LENGTH(key) + LENGTH(value)) "
+            "OVER (ORDER BY expires_at DESC, key ROWS UNBOUNDED PRECEDING) AS total FROM sessions) "
+            "WHERE total > ?)",
+            (self.max_bytes,)
+        ).rowcount
+        self.pruned += expired + excess + oversized
+
+    def prune(self):
+        with self._transaction() as conn:
+            self._prune(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(key) + LENGTH(value)), 0) FROM sessions WHERE expires_at > ?",
+            (self._clock(),)
+        ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'path': str(self.path),
+            'entries': entries,
+            'bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'pruned': self.pruned,
+        }
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def create_session_store(backend: str, path: Optional[str] = None, ttl_seconds: float = 1800,
+                         max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024) -> SessionStore:
+    """Construye el almacén de sesiones configurado"""
+    if backend == 'memory':
+        return MemorySessionStore(ttl_seconds, max_entries, max_bytes)
+    if backend == 'sqlite':
+        if not path:
+            raise ValueError("El almacén de sesiones 'sqlite' necesita una ruta")
+        return SQLiteSessionStore(path, ttl_seconds, max_entries, max_bytes)
+    raise ValueError(f"Almacén de sesiones desconocido: {backend}. Opciones: {', '.join(SESSION_BACKENDS)}")
@@ -0,0 +1,263 @@
+import logging
+import math
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ('flat', 'ivf', 'hnsw')
+METRICS = ('l2', 'ip')
+# Representación de los vectores dentro del índice: float32 exacto, float16,
+# escalar de 8 bits o product quantization (estas dos con re-ranking)
+STORAGES = ('float32', 'float16', 'sq8', 'pq')
+
+# Parámetros que definen la estructura del índice: si cambian hay que
+# reconstruirlo. nprobe, ef_search y rerank sólo afectan a la búsqueda.
+BUILD_KEYS = ('type', 'metric', 'nlist', 'hnsw_m', 'ef_construction', 'storage', 'pq_m')
+
+# Vectores que se agregan al índice por llamada a add()
+ADD_BATCH_ROWS = 65536
+
+
+def index_params(**overrides) -> Dict:
+    """Parámetros del índice según la configuración (con reemplazos opcionales)"""
+    params = {
+        'type': settings.FAISS_INDEX_TYPE,
+        'metric': settings.FAISS_METRIC,
+        'nlist': settings.FAISS_NLIST,
+        'nprobe': settings.FAISS_NPROBE,
+        'hnsw_m': settings.FAISS_HNSW_M,
+        'ef_construction': settings.FAISS_HNSW_EF_CONSTRUCTION,
+        'ef_search': settings.FAISS_HNSW_EF_SEARCH,
+        'storage': settings.EMBEDDING_STORAGE,
+        'pq_m': settings.FAISS_PQ_M,
+        'rerank': settings.FAISS_RERANK_FACTOR,
+    }
+    params.update(overrides)
+    if params['type'] not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice FAISS desconocido: {params['type']}. Opciones: {', '.join(INDEX_TYPES)}")
+    if params['metric'] not in METRICS:
+        raise ValueError(f"Métrica FAISS desconocida: {params['metric']}. Opciones: {', '.join(METRICS)}")
+    if params['storage'] not in STORAGES:
+        raise ValueError(f"Almacenamiento de vectores desconocido: {params['storage']}. Opciones: {', '.join(STORAGES)}")
+    return params
+
+
+def vector_dtype(params: Dict) -> str:
+    """dtype con el que se persisten los vectores de origen (.vectors.npy)"""
+    return 'float32' if params.get('storage', 'float32') == 'float32' else 'float16'
+
+
+def _pq_subquantizers(dimension: int, requested: int) -> int:
+    # PQ necesita que la dimensión sea múltiplo del número de subcuantizadores
+    return max(m for m in range(1, min(requested, dimension) + 1) if dimension % m == 0)
+
+
+def same_structure(a: Optional[Dict], b: Dict) -> bool:
+    return a is not None and all(a.get(key) == b.get(key) for key in BUILD_KEYS)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.array(vectors, dtype='float32', copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(vectors: np.ndarray, params: Dict) -> faiss.Index:
+    """
+    Construye el índice descrito por `params` sobre `vectors`.
+
+    Con métrica 'ip' los vectores se normalizan, de modo que el producto
+    interno es la similitud coseno; las consultas se normalizan igual en
+    prepare_queries.
+    """
+    n, dimension = vectors.shape
+    metric = faiss.METRIC_INNER_PRODUCT if params['metric'] == 'ip' else faiss.METRIC_L2
+
+    def prepared(block: np.ndarray) -> np.ndarray:
+        return _normalized(block) if params['metric'] == 'ip' else np.ascontiguousarray(block, dtype='float32')
+
+    storage = params.get('storage', 'float32')
+    qtype = {'float16': faiss.ScalarQuantizer.QT_fp16, 'sq8': faiss.ScalarQuantizer.QT_8bit}.get(storage)
+    pq_m = _pq_subquantizers(dimension, params.get('pq_m', 48))
+    # Con pocos vectores no alcanzan para entrenar 256 centroides por subespacio
+    pq_bits = 8 if n >= 256 else max(1, int(math.log2(n)))
+
+    if params['type'] == 'flat':
+        if storage == 'pq':
+            # IndexPQ no admite IDSelector: una IVF de una sola lista recorre
+            # todos los códigos igual que un índice plano
+            index = faiss.IndexIVFPQ(faiss.IndexFlat(dimension, metric), dimension, 1, pq_m, pq_bits, metric)
+        elif qtype is not None:
+            index = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+        else:
+            index = faiss.IndexFlat(dimension, metric)
+    elif params['type'] == 'ivf':
+        # nlist=0: regla habitual de ~4·sqrt(n) listas
+        nlist = params['nlist'] or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        quantizer = faiss.IndexFlat(dimension, metric)
+        if storage == 'pq':
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits, metric)
+        elif qtype is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, qtype, metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+    else:
+        if storage == 'pq':
+            index = faiss.IndexHNSWPQ(dimension, pq_m, params['hnsw_m'], pq_bits, metric)
+        elif qtype is not None:
+            index = faiss.IndexHNSWSQ(dimension, qtype, params['hnsw_m'], metric)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, params['hnsw_m'], metric)
+        index.hnsw.efConstruction = params['ef_construction']
+
+    if storage in ('sq8', 'pq'):
+        # Los códigos compactos eligen una lista corta que se reordena con
+        # las distancias sobre los vectores en float16
+        index = faiss.IndexRefine(index, faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, metric))
+
+    if not index.is_trained:
+        index.train(prepared(vectors))
+    # Por bloques: con vectores mapeados desde disco no se copia la matriz completa a RAM
+    for start in range(0, n, ADD_BATCH_ROWS):
+        index.add(prepared(vectors[start:start + ADD_BATCH_ROWS]))
+    apply_search_params(index, params)
+    logger.info(f"Índice FAISS '{params['type']}' ({params['metric']}, {storage}) construido con {n} vectores")
+    return index
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """Índice que hace la búsqueda gruesa (el base de un IndexRefine)"""
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.base_index)
+    return index
+
+
+def apply_search_params(index: faiss.Index, params: Dict) -> faiss.Index:
+    """Ajusta nprobe / efSearch / rerank, que no forman parte de la estructura persistida"""
+    if isinstance(index, faiss.IndexRefine):
+        index.k_factor = params.get('rerank', index.k_factor)
+    base = _base_index(index)
+    if params.get('type') == 'ivf':
+        faiss.extract_index_ivf(base).nprobe = params['nprobe']
+    elif params.get('type') == 'hnsw':
+        base.hnsw.efSearch = params['ef_search']
+    return index
+
+
+def read_index(path: str, params: Optional[Dict] = None, mmap: bool = True) -> faiss.Index:
+    """Lee un índice de disco, mapeado en memoria en lugar de copiarlo a RAM"""
+    flags = 0
+    if mmap:
+        flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    index = faiss.read_index(path, flags)
+    if params is not None:
+        apply_search_params(index, params)
+    return index
+
+
+def prepare_queries(index: faiss.Index, vectors: np.ndarray) -> np.ndarray:
+    """Matriz de consultas float32 (normalizada si el índice usa producto interno)"""
+    queries = np.atleast_2d(np.asarray(vectors, dtype='float32'))
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return _normalized(queries)
+    return np.ascontiguousarray(queries)
+
+
+def _search_parameters(index: faiss.Index, selector: faiss.IDSelector, effort: int):
+    """SearchParameters del tipo del índice con el selector y el esfuerzo pedido"""
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.IndexRefineSearchParameters(
+            k_factor=index.k_factor,
+            base_index_params=_search_parameters(_base_index(index), selector, effort)
+        )
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=effort)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=effort)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _refined_search(index: faiss.Index, queries: np.ndarray, k: int,
+                    selector: faiss.IDSelector, effort: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Búsqueda filtrada en un IndexRefine sin IndexRefineSearchParameters.
+
+    Las versiones de faiss anteriores a 1.8 no admiten parámetros de búsqueda
+    en IndexRefine: se buscan k·k_factor candidatos en el índice base con el
+    selector y se reordenan con las distancias sobre los vectores de refine.
+    """
+    base = _base_index(index)
+    refine = faiss.downcast_index(index.refine_index)
+    candidates = min(int(k * index.k_factor), base.ntotal)
+    _, labels = base.search(queries, candidates, params=_search_parameters(base, selector, effort))
+
+    inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+    missing = -np.inf if inner_product else np.inf
+    distances = np.full((len(queries), k), missing, dtype='float32')
+    result = np.full((len(queries), k), -1, dtype='int64')
+    for row, (query, found) in enumerate(zip(queries, labels)):
+        found = found[found >= 0]
+        if not len(found):
+            continue
+        vectors = np.vstack([refine.reconstruct(int(label)) for label in found])
+        if inner_product:
+            scores = vectors @ query
+            order = np.argsort(-scores, kind='stable')[:k]
+        else:
+            scores = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(scores, kind='stable')[:k]
+        distances[row, :len(order)] = scores[order]
+        result[row, :len(order)] = found[order]
+    return distances, result
+
+
+def _search(index: faiss.Index, queries: np.ndarray, k: int,
+            selector: faiss.IDSelector, effort: int) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(index, faiss.IndexRefine) and not hasattr(faiss, 'IndexRefineSearchParameters'):
+        return _refined_search(index, queries, k, selector, effort)
+    return index.search(queries, k, params=_search_parameters(index, selector, effort))
+
+
+def _search_effort(index: faiss.Index) -> Tuple[int, int]:
+    """Esfuerzo de búsqueda configurado (nprobe / efSearch) y su máximo útil"""
+    index = _base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return index.hnsw.efSearch, max(index.hnsw.efSearch, index.ntotal)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return ivf.nprobe, ivf.nlist
+    return 0, 0
+
+
+def filtered_search(index: faiss.Index, queries: np.ndarray, ids: np.ndarray,
+                    k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Búsqueda restringida a `ids` dentro de FAISS (IDSelector).
+
+    Los índices aproximados pueden devolver menos de `k` resultados cuando el
+    filtro es muy selectivo (las listas o el grafo visitados casi no tienen
+    candidatos válidos); en ese caso se duplica nprobe / efSearch hasta
+    completar min(k, len(ids)) resultados o recorrer el índice entero.
+    """
+    ids = np.ascontiguousarray(ids, dtype='int64')
+    queries = prepare_queries(index, queries)
+    wanted = min(k, len(ids))
+    selector = faiss.IDSelectorBatch(ids)
+    effort, max_effort = _search_effort(index)
+    if isinstance(_base_index(index), faiss.IndexHNSW):
+        # efSearch menor que k recorta los resultados
+        effort = max(effort, wanted)
+
+    while True:
+        distances, labels = _search(index, queries, wanted, selector, effort)
+        found = int((labels >= 0).sum(axis=1).min()) if len(labels) else wanted
+        if found >= wanted or effort >= max_effort:
+            return distances, labels
+        effort = min(max_effort, max(1, effort) * 2)
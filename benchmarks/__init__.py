@@ -0,0 +1,6 @@
+"""
+Benchmarks del FIFA Team Builder
+
+Se ejecutan como módulos desde la raíz del proyecto, por ejemplo:
+    python -m benchmarks.bench_optimizer
+"""
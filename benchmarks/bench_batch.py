@@ -0,0 +1,56 @@
+"""
+Costo por equipo de /api/teams/generate:batch frente a solicitudes sueltas.
+
+    python -m benchmarks.bench_batch --players 19000 --batch 100
+"""
+
+import argparse
+import time
+from unittest.mock import MagicMock
+
+from app.ai_assistant.recommendation_engine import TeamRecommender
+from benchmarks.synthetic import generate_players
+
+FORMATIONS = ['4-3-3', '4-4-2', '3-5-2']
+
+
+def build_requests(size: int, optimizer: str):
+    """Solicitudes que sólo difieren en presupuesto y formación, como las del frontend"""
+    return [
+        {
+            'description': "equipo de benchmark",
+            'formation': FORMATIONS[i % len(FORMATIONS)],
+            'criteria': {"GK": {"min_overall": 70}, "DEF": {"min_overall": 68}, "MID": {}, "ATT": {}},
+            'budget': 10e6 + 2.5e6 * i,
+            'optimizer': optimizer,
+        }
+        for i in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=19000)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    recommender = TeamRecommender(df=generate_players(args.players), embedder=MagicMock(), index=MagicMock())
+
+    for optimizer in ('greedy', 'exact'):
+        requests = build_requests(args.batch, optimizer)
+
+        start = time.perf_counter()
+        for request in requests:
+            recommender.generate_team(**request)
+        single_ms = (time.perf_counter() - start) * 1000 / len(requests)
+
+        start = time.perf_counter()
+        recommender.generate_teams(requests)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(requests)
+
+        print(f"{optimizer:>6}: individual {single_ms:.3f} ms/equipo, lote {batch_ms:.3f} ms/equipo "
+              f"({batch_ms / single_ms:.0%})")
+
+
+if __name__ == "__main__":
+    main()
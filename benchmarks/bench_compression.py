@@ -0,0 +1,79 @@
+"""
+Bytes por jugador y pérdida de recall de cada almacenamiento de vectores.
+
+    python -m benchmarks.bench_compression --vectors 100000 --k 10
+
+Para cada EMBEDDING_STORAGE se informa el tamaño del índice en disco, los
+bytes que recorre la búsqueda gruesa (los códigos compactos), el tamaño del
+.vectors.npy persistido y el recall@k frente al índice flat float32 actual.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.services.vector_index import _base_index, build_index, index_params, prepare_queries, vector_dtype
+from benchmarks.bench_faiss_index import clustered_vectors, recall_at_k
+
+CONFIGURATIONS = [
+    ('float32', [None]),
+    ('float16', [None]),
+    ('sq8', [1, 4]),
+    ('pq', [1, 4, 16]),
+]
+
+
+def scanned_bytes(index: faiss.Index) -> int:
+    """Bytes por vector de los códigos que recorre la búsqueda gruesa"""
+    base = _base_index(index)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return ivf.code_size
+    return faiss.downcast_index(base).code_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vectors', type=int, default=100000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--pq-m', type=int, default=48)
+    args = parser.parse_args()
+
+    data = clustered_vectors(args.vectors, args.dimension)
+    queries = clustered_vectors(args.queries, args.dimension, seed=1)
+    truth = None
+
+    print(f"{'almacenamiento':<18} {'disco B/j':>10} {'escaneo B/j':>12} {'npy B/j':>8} "
+          f"{'recall@' + str(args.k):>10} {'QPS':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage, rerank_factors in CONFIGURATIONS:
+            params = index_params(type='flat', metric='l2', storage=storage, pq_m=args.pq_m)
+            index = build_index(data, params)
+            path = os.path.join(tmp, f"{storage}.faiss")
+            faiss.write_index(index, path)
+            disk = os.path.getsize(path) / args.vectors
+            npy = np.dtype(vector_dtype(params)).itemsize * args.dimension
+            q = prepare_queries(index, queries)
+
+            for factor in rerank_factors:
+                if factor is not None:
+                    index.k_factor = factor
+                start = time.perf_counter()
+                _, found = index.search(q, args.k)
+                qps = len(q) / (time.perf_counter() - start)
+                if truth is None:
+                    truth = found
+
+                label = storage if factor is None else f"{storage} rerank x{factor}"
+                print(f"{label:<18} {disk:10.0f} {scanned_bytes(index):12d} {npy:8d} "
+                      f"{recall_at_k(found, truth):10.3f} {qps:8.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Mensajes por segundo del chat con y sin micro-batching de embeddings.
+
+    python -m benchmarks.bench_encoder --concurrency 64 --messages 2000
+    python -m benchmarks.bench_encoder --model paraphrase-MiniLM-L6-v2
+
+Sin --model se usa un modelo simulado con costo fijo por llamada más un
+costo por texto, que es el perfil de un transformer en CPU.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.batching_encoder import BatchingEncoder
+
+
+class SimulatedEmbedder:
+    def __init__(self, call_ms: float = 4.0, item_ms: float = 0.2, dimension: int = 384):
+        self.call_ms, self.item_ms, self.dimension = call_ms, item_ms, dimension
+
+    def encode(self, sentences, **kwargs):
+        time.sleep((self.call_ms + self.item_ms * len(sentences)) / 1000)
+        return np.zeros((len(sentences), self.dimension), dtype='float32')
+
+
+async def run(encode, messages: int, concurrency: int):
+    """Lanza `messages` codificaciones con a lo sumo `concurrency` en vuelo"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await encode(f"mensaje {i}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - start
+    return messages / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--batch', type=int, default=32)
+    parser.add_argument('--wait-ms', type=float, default=5.0)
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(args.model)
+    else:
+        embedder = SimulatedEmbedder()
+
+    async def unbatched(text):
+        return await asyncio.get_running_loop().run_in_executor(None, embedder.encode, [text])
+
+    async def scenario():
+        encoder = BatchingEncoder(embedder, max_batch_size=args.batch, max_wait_ms=args.wait_ms)
+        results = {
+            'sin lotes': await run(unbatched, args.messages, args.concurrency),
+            'con lotes': await run(encoder.encode, args.messages, args.concurrency),
+        }
+        await encoder.close()
+        return results, encoder.stats()
+
+    results, stats = asyncio.run(scenario())
+    for name, (throughput, p50, p99) in results.items():
+        print(f"{name:>10}: {throughput:8.1f} msg/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+    print(f"lote medio: {stats['mean_batch']} (máximo {stats['largest_batch']})")
+
+
+if __name__ == "__main__":
+    main()
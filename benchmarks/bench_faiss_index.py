@@ -0,0 +1,78 @@
+"""
+Recall@k frente a la búsqueda exacta y consultas por segundo de cada tipo de índice.
+
+    python -m benchmarks.bench_faiss_index --vectors 200000 --queries 1000 --k 10
+
+Los vectores son una mezcla de gaussianas (como los embeddings de jugadores,
+que se agrupan por posición y perfil); la referencia de cada métrica es el
+índice flat con esa misma métrica.
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.services.vector_index import apply_search_params, build_index, index_params, prepare_queries
+
+# Cada índice se construye una vez y se mide con varios parámetros de búsqueda
+CONFIGURATIONS = [
+    ('flat', [{}]),
+    ('ivf', [{'nprobe': 1}, {'nprobe': 8}, {'nprobe': 32}]),
+    ('hnsw', [{'ef_search': 16}, {'ef_search': 64}, {'ef_search': 128}]),
+]
+
+
+def clustered_vectors(n: int, dimension: int, seed: int = 0, clusters: int = 64) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.35 * rng.standard_normal((n, dimension)).astype('float32')
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vectors', type=int, default=200000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=0, help="0: todos los núcleos")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+    data = clustered_vectors(args.vectors, args.dimension)
+    queries = clustered_vectors(args.queries, args.dimension, seed=1)
+
+    print(f"{'índice':<28} {'métrica':>7} {'build s':>8} {'recall@' + str(args.k):>10} {'QPS':>10}")
+    for metric in ('l2', 'ip'):
+        truth = None
+        for index_type, searches in CONFIGURATIONS:
+            params = index_params(type=index_type, metric=metric)
+            start = time.perf_counter()
+            index = build_index(data, params)
+            build_seconds = time.perf_counter() - start
+            q = prepare_queries(index, queries)
+
+            for overrides in searches:
+                apply_search_params(index, {**params, **overrides})
+                start = time.perf_counter()
+                _, found = index.search(q, args.k)
+                qps = len(q) / (time.perf_counter() - start)
+                if truth is None:
+                    truth = found
+
+                label = index_type + ''.join(f" {key}={value}" for key, value in overrides.items())
+                print(f"{label:<28} {metric:>7} {build_seconds:8.2f} "
+                      f"{recall_at_k(found, truth):10.3f} {qps:10.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Memoria pico y tiempo de la compilación del almacén por bloques.
+
+Escribe un CSV sintético y, en un proceso nuevo por configuración (para que
+la memoria pico de una no contamine a la otra), compila el almacén con
+distintos tamaños de bloque. Como referencia mide también un `pd.read_csv`
+del archivo completo con las mismas columnas.
+
+    python -m benchmarks.bench_ingest --players 1000000 --chunks 20000,100000,1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import generate_players
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# VmHWM se reinicia con exec (ru_maxrss hereda el pico del proceso padre)
+_PEAK = """
+def peak_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+"""
+
+_COMPILE = _PEAK + """
+import json, sys, time
+from app.services.player_store import compile_player_store
+start = time.perf_counter()
+compile_player_store(sys.argv[1], sys.argv[2], chunksize=int(sys.argv[3]))
+print(json.dumps({'ms': (time.perf_counter() - start) * 1000,
+                  'peak_kb': peak_kb()}))
+"""
+
+_READ_WHOLE = _PEAK + """
+import json, sys, time
+import pandas as pd
+from app.services.player_store import STORE_COLUMNS
+start = time.perf_counter()
+pd.read_csv(sys.argv[1], usecols=lambda c: c in STORE_COLUMNS, low_memory=False)
+print(json.dumps({'ms': (time.perf_counter() - start) * 1000,
+                  'peak_kb': peak_kb()}))
+"""
+
+_BASELINE = _PEAK + """
+import json
+import pandas
+from app.services import player_store
+print(json.dumps({'ms': 0.0, 'peak_kb': peak_kb()}))
+"""
+
+
+def run(code: str, *args: str) -> dict:
+    env = {**os.environ, 'PYTHONPATH': str(ROOT) + os.pathsep + os.environ.get('PYTHONPATH', '')}
+    output = subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=1000000)
+    parser.add_argument('--chunks', default='20000,100000,1000000')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'players.csv')
+        generate_players(args.players).to_csv(csv_path, index=False)
+        size_mb = os.path.getsize(csv_path) / 1024 / 1024
+        print(f"CSV de {args.players} jugadores: {size_mb:.1f} MB")
+
+        rows = [('intérprete + pandas', run(_BASELINE)), ('read_csv completo', run(_READ_WHOLE, csv_path))]
+        for chunk in (int(value) for value in args.chunks.split(',') if value.strip()):
+            store_path = os.path.join(workdir, f'players-{chunk}.store')
+            rows.append((f'compilar, bloque {chunk}', run(_COMPILE, csv_path, store_path, str(chunk))))
+
+    print(f"{'configuración':<28} {'pico MB':>10} {'tiempo ms':>12}")
+    for name, result in rows:
+        print(f"{name:<28} {result['peak_kb'] / 1024:10.1f} {result['ms']:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
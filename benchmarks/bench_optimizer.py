@@ -0,0 +1,71 @@
+"""
+Compara el optimizador greedy con el exacto (knapsack de elección múltiple).
+
+Reporta, para cada formación y presupuesto, la suma de scores de los puestos,
+la cantidad de jugadores y la latencia de cada modo.
+
+    python -m benchmarks.bench_optimizer --players 19000
+"""
+
+import argparse
+import json
+import statistics
+import time
+from unittest.mock import MagicMock
+
+from app.ai_assistant.recommendation_engine import TeamRecommender
+from benchmarks.synthetic import generate_players
+
+FORMATIONS = ['4-3-3', '4-4-2', '3-5-2']
+BUDGETS = [5e6, 20e6, 50e6, 100e6, 300e6]
+CRITERIA = {"GK": {"min_overall": 60}, "DEF": {}, "MID": {}, "ATT": {}}
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=19000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    df = generate_players(args.players)
+    recommender = TeamRecommender(df=df, embedder=MagicMock(), index=MagicMock())
+
+    results = []
+    print(f"{'formación':>9} {'presupuesto':>12} | {'greedy':>16} {'ms':>7} | {'exacto':>16} {'ms':>7} {'max ms':>7}")
+    for formation in FORMATIONS:
+        for budget in BUDGETS:
+            row = {'formation': formation, 'budget': budget}
+            for optimizer in ('greedy', 'exact'):
+                team, median_ms, max_ms = timed(
+                    lambda: recommender.generate_team("benchmark", formation, CRITERIA, budget, optimizer=optimizer),
+                    args.repeat
+                )
+                row[optimizer] = {
+                    'score': round(recommender.team_score(team), 2),
+                    'players': len(team['players']),
+                    'total_value': team['total_value'],
+                    'median_ms': round(median_ms, 2),
+                    'max_ms': round(max_ms, 2),
+                }
+            results.append(row)
+            g, e = row['greedy'], row['exact']
+            print(f"{formation:>9} {budget:>12,.0f} | {g['score']:>9.1f} ({g['players']:>2} j) {g['median_ms']:>7.2f} | "
+                  f"{e['score']:>9.1f} ({e['players']:>2} j) {e['median_ms']:>7.2f} {e['max_ms']:>7.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'players': args.players, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
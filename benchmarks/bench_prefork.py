@@ -0,0 +1,84 @@
+"""
+Memoria de los workers en el modo preload-then-fork (app.server).
+
+Carga el registro una vez sobre datos sintéticos (con HashEmbedder), crea
+los workers con fork(), cada uno genera algunos equipos y reporta su
+memoria desde /proc/<pid>/smaps_rollup. La memoria privada de un worker es
+lo que cuesta agregarlo; se compara con la de un intérprete vacío y con la
+del padre (lo que costaría una copia completa con `uvicorn --workers`).
+
+    python -m benchmarks.bench_prefork --players 200000 --workers 4
+    python -m benchmarks.bench_prefork --no-freeze
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from app.services.prefork import Prefork, freeze_heap, limit_native_threads, memory_usage
+from benchmarks.synthetic import HashEmbedder, generate_players
+
+CRITERIA = {"GK": {"min_overall": 60}, "DEF": {}, "MID": {}, "ATT": {}}
+
+
+def interpreter_baseline() -> dict:
+    """Memoria de un intérprete que sólo importa numpy y pandas"""
+    code = ("import json, numpy, pandas; from app.services.prefork import memory_usage; "
+            "print(json.dumps(memory_usage()))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--no-freeze', action='store_true', help="No congelar el heap del padre antes de fork()")
+    args = parser.parse_args()
+
+    limit_native_threads(1)
+    from app.services.registry import ResourceRegistry
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_path = os.path.join(workdir, 'players.csv')
+        generate_players(args.players).to_csv(data_path, index=False)
+        registry = ResourceRegistry().load(
+            data_path, os.path.join(workdir, 'embeddings.faiss'), 'bench',
+            embedder=HashEmbedder(), store_path=os.path.join(workdir, 'players.store')
+        )
+        if not args.no_freeze:
+            freeze_heap()
+        parent = memory_usage()
+
+        read_fd, write_fd = os.pipe()
+
+        def worker():
+            os.close(read_fd)
+            for i in range(args.requests):
+                registry.recommender.generate_team(f"equipo {i}", "4-3-3", CRITERIA, 80e6)
+            registry.assistant.process_message(f"worker-{os.getpid()}", "quiero crear un equipo")
+            os.write(write_fd, (json.dumps(memory_usage()) + '\n').encode())
+
+        Prefork(worker, args.workers, respawn=False).run()
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            workers = [json.loads(line) for line in f if line.strip()]
+
+    baseline = interpreter_baseline()
+    mb = 1024 * 1024
+    print(f"{'proceso':<22} {'rss MB':>10} {'pss MB':>10} {'privado MB':>12}")
+    print(f"{'intérprete vacío':<22} {baseline.get('rss_bytes', 0) / mb:10.1f} "
+          f"{baseline.get('pss_bytes', 0) / mb:10.1f} {baseline.get('private_bytes', 0) / mb:12.1f}")
+    print(f"{'padre (precargado)':<22} {parent.get('rss_bytes', 0) / mb:10.1f} "
+          f"{parent.get('pss_bytes', 0) / mb:10.1f} {parent.get('private_bytes', 0) / mb:12.1f}")
+    for i, usage in enumerate(workers):
+        print(f"{f'worker {i}':<22} {usage.get('rss_bytes', 0) / mb:10.1f} "
+              f"{usage.get('pss_bytes', 0) / mb:10.1f} {usage.get('private_bytes', 0) / mb:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
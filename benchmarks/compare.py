@@ -0,0 +1,70 @@
+"""
+Compara dos archivos de resultados de benchmarks.suite y marca las regresiones.
+
+    python -m benchmarks.compare base.json nuevo.json --threshold 0.15
+
+Todas las métricas son tiempos (menor es mejor). Una métrica es regresión si
+empeora más que `threshold` (relativo) y más que `min-delta-ms` (absoluto,
+para no marcar ruido en mediciones de décimas de milisegundo). Sale con
+código 1 si hay alguna regresión, para poder usarlo en CI.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+
+def load_results(path: str) -> Tuple[Dict, Dict[str, float]]:
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('meta', {}), data['results']
+
+
+def compare(base: Dict[str, float], new: Dict[str, float], threshold: float,
+            min_delta_ms: float) -> List[Tuple[str, float, float, float, str]]:
+    """Filas (métrica, base, nuevo, cambio relativo, estado) de las métricas comunes"""
+    rows = []
+    for name in sorted(set(base) & set(new)):
+        before, after = base[name], new[name]
+        change = (after - before) / before if before else 0.0
+        if change > threshold and after - before > min_delta_ms:
+            status = 'REGRESIÓN'
+        elif change < -threshold and before - after > min_delta_ms:
+            status = 'mejora'
+        else:
+            status = ''
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    base_meta, base = load_results(args.base)
+    new_meta, new = load_results(args.new)
+    print(f"base: {base_meta.get('commit')} ({base_meta.get('timestamp')})   "
+          f"nuevo: {new_meta.get('commit')} ({new_meta.get('timestamp')})")
+    if base_meta.get('embedder') != new_meta.get('embedder') or base_meta.get('cpus') != new_meta.get('cpus'):
+        print("Aviso: los resultados se tomaron con otro embedder o en otra máquina")
+
+    rows = compare(base, new, args.threshold, args.min_delta_ms)
+    print(f"{'métrica':<52} {'base':>12} {'nuevo':>12} {'cambio':>8}")
+    for name, before, after, change, status in rows:
+        print(f"{name:<52} {before:12.2f} {after:12.2f} {change:+8.1%} {status}")
+    for name in sorted(set(base) ^ set(new)):
+        print(f"{name:<52} sólo en {'base' if name in base else 'nuevo'}")
+
+    regressions = [row for row in rows if row[4] == 'REGRESIÓN']
+    if regressions:
+        print(f"{len(regressions)} regresiones por encima de {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Tiempo de importación de la aplicación con `python -X importtime`.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module app.routers.teams --budget-ms 800 --top 15
+
+Importa el módulo en un proceso nuevo, muestra los módulos más lentos
+(tiempo acumulado) y sale con código 1 si el total supera el presupuesto o
+si se cargó alguna dependencia pesada que debería importarse al primer uso.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.lazy import HEAVY_MODULES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_BUDGET_MS = 2500
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def measure(module: str = 'app.main') -> List[Tuple[str, float, float, int]]:
+    """Filas (módulo, propio ms, acumulado ms, profundidad) de un proceso limpio"""
+    env = {**os.environ, 'PYTHONPATH': str(ROOT) + os.pathsep + os.environ.get('PYTHONPATH', '')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            rows.append((name, int(own) / 1000, int(cumulative) / 1000, len(indent) // 2))
+    return rows
+
+
+def summary(rows: List[Tuple[str, float, float, int]], module: str) -> Dict:
+    loaded = {name for name, _, _, _ in rows}
+    total = next((cumulative for name, _, cumulative, _ in reversed(rows) if name == module), 0.0)
+    return {
+        'total_ms': total,
+        'heavy': sorted(m for m in HEAVY_MODULES if m in loaded),
+        'modules': len(loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    result = summary(rows, args.module)
+    # Sólo los paquetes de primer nivel, para no contar dos veces los submódulos
+    top_level = [row for row in rows if row[3] <= 1]
+    print(f"{'módulo':<50} {'acumulado ms':>12}")
+    for name, _, cumulative, _ in sorted(top_level, key=lambda row: -row[2])[:args.top]:
+        print(f"{name:<50} {cumulative:12.1f}")
+    print(f"import {args.module}: {result['total_ms']:.1f} ms, {result['modules']} módulos "
+          f"(presupuesto {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if result['heavy']:
+        print(f"Dependencias pesadas cargadas al importar: {', '.join(result['heavy'])}")
+        failed = True
+    if result['total_ms'] > args.budget_ms:
+        print("Presupuesto de importación excedido")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
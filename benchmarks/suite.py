@@ -0,0 +1,157 @@
+"""
+Suite de micro-benchmarks del pipeline completo sobre datos sintéticos.
+
+    python -m benchmarks.suite --sizes 20k,200k --output bench-results.json
+    python -m benchmarks.compare base.json bench-results.json
+
+Para cada tamaño (20k, 200k, 2m jugadores) mide la carga del CSV
+(load_and_preprocess_data en frío y con el almacén columnar), la generación
+de embeddings (desde cero, sin cambios y con un 1% de jugadores
+modificados), get_similar_players, la construcción de TeamRecommender y
+generate_team; detect_intent se mide una vez. Sin --model se usa
+HashEmbedder, de modo que se mide el código del proyecto y no el modelo.
+
+Los resultados se guardan como {"meta": ..., "results": {"20k/generate_team/greedy_ms": ...}}
+para poder compararlos entre commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from app.ai_assistant.chat_processor import FIFAAssistant
+from app.ai_assistant.recommendation_engine import TeamRecommender
+from app.services.data_processing import load_and_preprocess_data
+from app.services.embeddings import generate_embeddings, get_similar_players
+from benchmarks.bench_optimizer import timed
+from benchmarks.synthetic import HashEmbedder, generate_players
+
+SIZES = {'20k': 20000, '200k': 200000, '2m': 2000000}
+CRITERIA = {"GK": {"min_overall": 70}, "DEF": {"min_overall": 68}, "MID": {}, "ATT": {}}
+MESSAGES = ["hola", "quiero crear un equipo", "juego ofensivo con contraataque", "4-3-3", "muchas gracias"]
+
+
+def once(fn: Callable) -> float:
+    start = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def bench_size(label: str, n: int, embedder, repeat: int, workdir: str) -> Dict[str, float]:
+    results = {}
+
+    def record(name: str, value: float):
+        results[f"{label}/{name}"] = value
+        print(f"{label:>5} {name:<44} {value:12.2f}", flush=True)
+
+    df = generate_players(n)
+    csv_path = os.path.join(workdir, f"players-{label}.csv")
+    df.to_csv(csv_path, index=False)
+    record('load_and_preprocess_data/cold_ms', once(lambda: load_and_preprocess_data(csv_path)))
+    record('load_and_preprocess_data/warm_ms', once(lambda: load_and_preprocess_data(csv_path)))
+
+    save_path = os.path.join(workdir, f"embeddings-{label}.faiss")
+    holder = {}
+    record('generate_embeddings/cold_ms',
+           once(lambda: holder.update(index=generate_embeddings(df, save_path, embedder=embedder, model_name="bench")[1])))
+    record('generate_embeddings/unchanged_ms',
+           once(lambda: holder.update(index=generate_embeddings(df, save_path, embedder=embedder, model_name="bench")[1])))
+    changed = df.copy()
+    rows = np.random.default_rng(1).choice(n, max(1, n // 100), replace=False)
+    changed.loc[rows, 'Overall'] = changed.loc[rows, 'Overall'] + 1
+    record('generate_embeddings/one_percent_changed_ms',
+           once(lambda: holder.update(index=generate_embeddings(changed, save_path, embedder=embedder, model_name="bench")[1])))
+    index = holder['index']
+
+    query = np.asarray(embedder.encode(["defensa central rápido y fuerte"]), dtype='float32')
+    for name, criteria in (('no_filter', {}), ('overall_80', {'Overall': 80})):
+        _, median_ms, _ = timed(
+            lambda: get_similar_players(query, df, index, criteria, embedder, top_k=10), repeat
+        )
+        record(f"get_similar_players/{name}_ms", round(median_ms, 2))
+
+    holder = {}
+    record('team_recommender/build_ms',
+           once(lambda: holder.update(recommender=TeamRecommender(df=df, embedder=embedder, index=index))))
+    recommender = holder['recommender']
+    for optimizer in ('greedy', 'exact'):
+        _, median_ms, _ = timed(
+            lambda: recommender.generate_team("equipo de benchmark", "4-3-3", CRITERIA, 80e6, optimizer=optimizer),
+            repeat
+        )
+        record(f"generate_team/{optimizer}_ms", round(median_ms, 2))
+    _, median_ms, _ = timed(
+        lambda: recommender.generate_team("equipo ofensivo de contraataque", "4-3-3", CRITERIA, 80e6,
+                                          semantic_weight=0.3),
+        repeat
+    )
+    record('generate_team/semantic_ms', round(median_ms, 2))
+    return results
+
+
+def bench_intents(embedder, repeat: int, workdir: str) -> Dict[str, float]:
+    assistant = FIFAAssistant(df=None, embedder=embedder, model_name="bench", intent_cache_dir=workdir)
+    _, median_ms, _ = timed(lambda: [assistant.detect_intent(m) for m in MESSAGES], repeat)
+    value = round(median_ms / len(MESSAGES), 4)
+    print(f"{'-':>5} {'detect_intent/per_message_ms':<44} {value:12.4f}")
+    return {'detect_intent/per_message_ms': value}
+
+
+def metadata(args) -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sizes': args.sizes,
+        'embedder': args.model or f"HashEmbedder({args.dimension})",
+        'repeat': args.repeat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='20k,200k,2m', help=f"Lista separada por comas de {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--model', default=None, help="Modelo de sentence-transformers en lugar del embedder simulado")
+    parser.add_argument('--output', default='bench-results.json')
+    args = parser.parse_args()
+
+    labels = [label.strip() for label in args.sizes.split(',') if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Tamaños desconocidos: {', '.join(unknown)}")
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(args.model)
+    else:
+        embedder = HashEmbedder(args.dimension)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        results.update(bench_intents(embedder, args.repeat, workdir))
+        for label in labels:
+            results.update(bench_size(label, SIZES[label], embedder, args.repeat, workdir))
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(args), 'results': results}, f, indent=2, sort_keys=True)
+    print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Distribución aproximada de posiciones principales en FIFA 21
+POSITION_SHARES = {
+    'GK': 0.11, 'CB': 0.18, 'LB': 0.06, 'RB': 0.06, 'LWB': 0.01, 'RWB': 0.01,
+    'CDM': 0.07, 'CM': 0.11, 'CAM': 0.07, 'LM': 0.04, 'RM': 0.04,
+    'LW': 0.03, 'RW': 0.03, 'CF': 0.01, 'ST': 0.17,
+}
+
+NATIONALITIES = [
+    'England', 'Germany', 'Spain', 'France', 'Argentina', 'Brazil', 'Italy',
+    'Colombia', 'Japan', 'Netherlands', 'Uruguay', 'Portugal', 'Mexico', 'Sweden',
+]
+
+ATTRIBUTES = [
+    'SprintSpeed', 'Agility', 'Dribbling', 'BallControl', 'Jumping',
+    'Interceptions', 'Marking', 'Crossing', 'ShortPassing', 'Positioning',
+    'Vision', 'Penalties', 'ShotPower', 'DefendingTotal', 'PhysicalityTotal',
+    'ShootingTotal', 'PassingTotal',
+]
+
+
+def generate_players(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera un dataset determinista con la forma del CSV de FIFA 21.
+
+    Incluye todas las columnas que exige TeamRecommender._preprocess_data y
+    las que usa el constructor de descripciones de embeddings. El valor de
+    mercado crece exponencialmente con el overall, como en el juego.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(list(POSITION_SHARES), size=n, p=list(POSITION_SHARES.values()))
+    overall = np.clip(rng.normal(66, 7, n), 47, 93).round()
+    age = rng.integers(16, 41, n)
+    potential = np.maximum(overall, overall + np.clip(28 - age, 0, None) * rng.uniform(0, 1.2, n)).round()
+    value = 50000 * np.exp(0.19 * (overall - 55)) * rng.lognormal(0, 0.35, n)
+    value = (np.round(value / 25000) * 25000).astype(np.int64)
+    value[rng.random(n) < 0.02] = 0  # jugadores libres
+
+    data = {
+        'ID': np.arange(100000, 100000 + n),
+        'Name': [f"J. Sintético {i}" for i in range(n)],
+        'Age': age,
+        'Nationality': rng.choice(NATIONALITIES, n),
+        'Overall': overall.astype(np.int64),
+        'Potential': np.minimum(potential, 95).astype(np.int64),
+        'BestPosition': positions,
+        'Positions': positions,
+        'ValueEUR': value,
+        'Height': rng.integers(160, 204, n),
+    }
+    for attr in ATTRIBUTES:
+        data[attr] = np.clip(overall + rng.normal(-4, 10, n), 10, 99).round().astype(np.int64)
+    return pd.DataFrame(data)
+
+
+class HashEmbedder:
+    """
+    Embedder determinista y barato para correr los benchmarks sin modelo.
+
+    Cada texto se reduce a un crc32 que elige dos filas de dos tablas
+    aleatorias fijas; textos distintos dan (casi siempre) vectores distintos
+    y el costo por texto es de microsegundos, así que se mide el pipeline y
+    no el transformer.
+    """
+
+    def __init__(self, dimension: int = 384, seed: int = 0, rows: int = 1024):
+        rng = np.random.default_rng(seed)
+        self.dimension = dimension
+        self._rows = rows
+        self._first = rng.standard_normal((rows, dimension)).astype('float32')
+        self._second = rng.standard_normal((rows, dimension)).astype('float32')
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        hashes = np.fromiter((zlib.crc32(str(t).encode('utf-8')) for t in texts), dtype=np.int64, count=len(texts))
+        vectors = self._first[hashes % self._rows] + self._second[(hashes // self._rows) % self._rows]
+        return vectors[0] if single else vectors
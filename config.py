@@ -4,9 +4,55 @@ from typing import List
 class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     CORS_ORIGINS: List[str] = ["http://localhost:5173"]
+    # Uno o varios CSV separados por comas (p. ej. varias ediciones); se compilan por bloques
     DATA_PATH: str = "data/players_21.csv"
+    INGEST_CHUNK_ROWS: int = 100000
+    PLAYER_STORE_PATH: str = "data/players_21.store"
     EMBEDDINGS_PATH: str = "models/embeddings.faiss"
     MODEL_NAME: str = "paraphrase-MiniLM-L6-v2"
+    PRELOAD_RESOURCES: bool = True
+    EMBEDDING_CACHE_SIZE: int = 4096
+    EMBEDDING_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    ENCODER_MAX_BATCH_SIZE: int = 32
+    ENCODER_MAX_WAIT_MS: float = 5.0
+    CPU_MAX_CONCURRENCY: int = 4
+    CPU_QUEUE_DEPTH: int = 32
+    CPU_RETRY_AFTER_SECONDS: int = 1
+    # python -m app.server: workers creados con fork() tras precargar los recursos en el padre
+    SERVER_WORKERS: int = 4
+    WORKER_NATIVE_THREADS: int = 1
+    # Spans de latencia por etapa (/metrics y encabezado Server-Timing)
+    METRICS_ENABLED: bool = True
+    # Caché de equipos generados (por solicitud canónica); 0 la desactiva
+    TEAM_CACHE_SIZE: int = 1024
+    TEAM_CACHE_TTL_SECONDS: int = 600
+    # Índice FAISS: flat | ivf | hnsw, con métrica l2 o ip (coseno sobre vectores normalizados)
+    FAISS_INDEX_TYPE: str = "flat"
+    FAISS_METRIC: str = "l2"
+    FAISS_NLIST: int = 0
+    FAISS_NPROBE: int = 16
+    FAISS_HNSW_M: int = 32
+    FAISS_HNSW_EF_CONSTRUCTION: int = 80
+    FAISS_HNSW_EF_SEARCH: int = 64
+    FAISS_MMAP: bool = True
+    # Vectores dentro del índice: float32 | float16 | sq8 | pq (sq8 y pq re-ordenan con float16)
+    EMBEDDING_STORAGE: str = "float32"
+    FAISS_PQ_M: int = 48
+    FAISS_RERANK_FACTOR: int = 4
+    # Sesiones del chat: memory (por proceso) | sqlite (compartidas por los workers del nodo)
+    SESSION_BACKEND: str = "memory"
+    SESSION_PATH: str = "data/sessions.sqlite3"
+    SESSION_TTL_SECONDS: int = 1800
+    SESSION_MAX_ENTRIES: int = 10000
+    SESSION_MAX_BYTES: int = 16 * 1024 * 1024
+    # Historial de equipos generados (SQLite); 0 desactiva cada límite de retención
+    HISTORY_PATH: str = "data/team_history.sqlite3"
+    HISTORY_MAX_ENTRIES: int = 100000
+    HISTORY_MAX_AGE_DAYS: float = 90
+    # MinHash/LSH de plantillas: 16 bandas de 4 filas ~ candidatos a partir de Jaccard 0.5
+    HISTORY_MINHASH_PERMUTATIONS: int = 64
+    HISTORY_LSH_BANDS: int = 16
+    HISTORY_LSH_BY_POSITION: bool = False
     
     class Config:
         env_file = ".env"
@@ -1,7 +1,75 @@
+import hashlib
 import pytest
+import numpy as np
+import pandas as pd
 from fastapi.testclient import TestClient
 from app.main import app
 
 @pytest.fixture
 def client():
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+
+class StubEmbedder:
+    """Embedder determinista para pruebas: vectores derivados del hash del texto"""
+
+    def __init__(self, dimension: int = 16):
+        self.dimension = dimension
+        self.encoded = 0
+
+    def encode(self, sentences, **kwargs):
+        self.encoded += len(sentences)
+        vectors = [
+            np.random.default_rng(
+                int.from_bytes(hashlib.md5(str(s).encode()).digest()[:8], 'little')
+            ).standard_normal(self.dimension)
+            for s in sentences
+        ]
+        return np.asarray(vectors, dtype='float32').reshape(len(sentences), self.dimension)
+
+
+def make_players(n: int = 60, seed: int = 0) -> pd.DataFrame:
+    """Dataset sintético con las columnas que espera TeamRecommender"""
+    rng = np.random.default_rng(seed)
+    positions = ['GK', 'CB', 'LB', 'RB', 'CM', 'CAM', 'CDM', 'ST', 'LW', 'RW']
+    rating = lambda: rng.integers(40, 95, n)
+    best = [positions[i % len(positions)] for i in range(n)]
+    return pd.DataFrame({
+        'ID': np.arange(1000, 1000 + n),
+        'Name': [f"Player{i}" for i in range(n)],
+        'Age': rng.integers(17, 38, n),
+        'BestPosition': best,
+        'Positions': best,
+        'Overall': rating(),
+        'ValueEUR': rng.integers(1, 100, n) * 500000,
+        'Nationality': rng.choice(['Argentina', 'Spain', 'France', 'Brazil'], n),
+        'Potential': rating(),
+        'Height': rng.integers(165, 200, n),
+        'SprintSpeed': rating(),
+        'Agility': rating(),
+        'Dribbling': rating(),
+        'BallControl': rating(),
+        'Jumping': rating(),
+        'Interceptions': rating(),
+        'Marking': rating(),
+        'Crossing': rating(),
+        'ShortPassing': rating(),
+        'Positioning': rating(),
+        'Vision': rating(),
+        'Penalties': rating(),
+        'ShotPower': rating(),
+        'DefendingTotal': rating(),
+        'PhysicalityTotal': rating(),
+        'ShootingTotal': rating(),
+        'PassingTotal': rating(),
+    })
+
+
+@pytest.fixture
+def players_df():
+    return make_players()
+
+
+@pytest.fixture
+def stub_embedder():
+    return StubEmbedder()
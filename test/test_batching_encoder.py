@@ -0,0 +1,49 @@
+import asyncio
+import numpy as np
+import pytest
+from conftest import StubEmbedder
+from app.services.batching_encoder import BatchingEncoder
+
+
+class RecordingEmbedder(StubEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def encode(self, sentences, **kwargs):
+        self.calls.append(list(sentences))
+        return super().encode(sentences, **kwargs)
+
+
+def test_concurrent_requests_share_one_batch():
+    embedder = RecordingEmbedder()
+
+    async def scenario():
+        encoder = BatchingEncoder(embedder, max_batch_size=8, max_wait_ms=50)
+        texts = [f"mensaje {i}" for i in range(5)]
+        vectors = await asyncio.gather(*(encoder.encode(t) for t in texts))
+        await encoder.close()
+        return texts, vectors, encoder.stats()
+
+    texts, vectors, stats = asyncio.run(scenario())
+
+    assert embedder.calls == [texts]
+    np.testing.assert_allclose(np.stack(vectors), StubEmbedder().encode(texts))
+    assert stats['batches'] == 1 and stats['largest_batch'] == 5
+
+def test_batches_are_capped_and_errors_propagate():
+    embedder = RecordingEmbedder()
+
+    async def scenario():
+        encoder = BatchingEncoder(embedder, max_batch_size=3, max_wait_ms=20)
+        await asyncio.gather(*(encoder.encode(str(i)) for i in range(7)))
+        await encoder.close()
+
+        failing = BatchingEncoder(None, max_wait_ms=1)
+        with pytest.raises(AttributeError):
+            await failing.encode("hola")
+        await failing.close()
+
+    asyncio.run(scenario())
+
+    assert [len(call) for call in embedder.calls] == [3, 3, 1]
@@ -0,0 +1,44 @@
+import numpy as np
+from conftest import StubEmbedder
+from app.services.embedding_cache import CachedEmbedder
+from app.ai_assistant.intent_matrix import clean_message
+
+
+def test_repeated_messages_hit_the_cache():
+    embedder = StubEmbedder()
+    cached = CachedEmbedder(embedder, max_entries=10)
+
+    first = cached.encode([clean_message("¡Hola!")])
+    second = cached.encode([clean_message("hola")])
+
+    assert embedder.encoded == 1
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(first, embedder.encode(["hola"]))
+    assert cached.stats()['hits'] == 1
+    assert cached.stats()['misses'] == 1
+
+def test_batch_only_encodes_missing_texts():
+    embedder = StubEmbedder()
+    cached = CachedEmbedder(embedder)
+    cached.encode(["a", "b"])
+
+    result = cached.encode(["b", "c", "c", "a"])
+
+    assert embedder.encoded == 3
+    np.testing.assert_array_equal(result, embedder.encode(["b", "c", "c", "a"]))
+    assert cached.encode("c").shape == (embedder.dimension,)
+
+def test_entry_and_byte_limits_evict_least_recent():
+    embedder = StubEmbedder(dimension=16)
+    cached = CachedEmbedder(embedder, max_entries=2)
+    cached.encode(["a", "b"])
+    cached.encode(["a"])
+    cached.encode(["c"])
+
+    assert set(cached._entries) == {"a", "c"}
+    assert cached.stats()['evictions'] == 1
+
+    by_bytes = CachedEmbedder(embedder, max_entries=100, max_bytes=3 * 16 * 4)
+    by_bytes.encode(["a", "b", "c", "d"])
+    assert by_bytes.stats()['entries'] == 3
+    assert by_bytes.stats()['bytes'] <= 3 * 16 * 4
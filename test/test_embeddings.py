@@ -0,0 +1,180 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.embeddings import generate_embeddings
+
+
+def test_unchanged_dataset_is_loaded_from_disk(tmp_path, players_df, stub_embedder):
+    save_path = str(tmp_path / "embeddings.faiss")
+    first, _ = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+    assert stub_embedder.encoded == len(players_df)
+
+    second, index = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+
+    assert stub_embedder.encoded == len(players_df)
+    assert index.ntotal == len(players_df)
+    np.testing.assert_array_equal(first, second)
+
+def test_only_changed_players_are_encoded(tmp_path, players_df, stub_embedder):
+    save_path = str(tmp_path / "embeddings.faiss")
+    generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+
+    changed = players_df.copy()
+    changed.loc[3, 'Overall'] = 99
+    new_row = changed.iloc[[0]].assign(ID=1, Name='Nuevo')
+    changed = pd.concat([changed.iloc[::-1], new_row], ignore_index=True)
+    before = stub_embedder.encoded
+
+    embeddings, index = generate_embeddings(changed, save_path, embedder=stub_embedder, model_name="stub")
+
+    assert stub_embedder.encoded - before == 2
+    assert index.ntotal == len(changed)
+    # El orden de filas cambió: cada vector debe seguir correspondiendo a su jugador
+    expected = stub_embedder.encode(changed['player_description'].tolist())
+    np.testing.assert_allclose(embeddings, expected)
+
+def test_half_replaced_store_is_not_reused(tmp_path, players_df, stub_embedder):
+    from app.services.embeddings import load_embedding_store
+    save_path = str(tmp_path / "embeddings.faiss")
+    generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+    assert load_embedding_store(save_path) is not None
+
+    # Corte entre los reemplazos: vectores nuevos (mismas filas) con hashes y manifiesto viejos
+    vectors_path = tmp_path / "embeddings.vectors.npy"
+    np.save(vectors_path, np.load(vectors_path)[::-1].copy())
+    assert load_embedding_store(save_path) is None
+
+    changed = players_df.copy()
+    changed.loc[3, 'Overall'] = 99
+    before = stub_embedder.encoded
+    embeddings, _ = generate_embeddings(changed, save_path, embedder=stub_embedder, model_name="stub")
+
+    assert stub_embedder.encoded - before == len(changed)
+    np.testing.assert_allclose(embeddings, stub_embedder.encode(changed['player_description'].tolist()))
+    assert load_embedding_store(save_path) is not None
+
+def test_manifest_and_model_change(tmp_path, players_df, stub_embedder):
+    save_path = str(tmp_path / "embeddings.faiss")
+    generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+
+    manifest = json.loads((tmp_path / "embeddings.manifest.json").read_text())
+    assert manifest['model_name'] == "stub"
+    assert manifest['dimension'] == stub_embedder.dimension
+    assert manifest['rows'] == len(players_df)
+
+    before = stub_embedder.encoded
+    generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="otro-modelo")
+    assert stub_embedder.encoded - before == len(players_df)
+
+def test_index_type_change_rebuilds_without_encoding(tmp_path, players_df, stub_embedder):
+    from app.services.vector_index import index_params
+    save_path = str(tmp_path / "embeddings.faiss")
+    embeddings, flat = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+    before = stub_embedder.encoded
+    expected = flat.search(embeddings[:5], 5)[1]
+
+    for params in (index_params(type='ivf', nlist=4, nprobe=4), index_params(type='hnsw'),
+                   index_params(type='flat', metric='ip')):
+        _, index = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder,
+                                       model_name="stub", index_params=params)
+        manifest = json.loads((tmp_path / "embeddings.manifest.json").read_text())
+        assert manifest['index']['type'] == params['type']
+        assert index.ntotal == len(players_df)
+        # Cada vector se encuentra a sí mismo como vecino más cercano
+        assert np.array_equal(index.search(embeddings[:5], 1)[1][:, 0], expected[:, 0])
+
+    assert stub_embedder.encoded == before
+
+def test_search_params_do_not_trigger_rebuild(tmp_path, players_df, stub_embedder):
+    from app.services.vector_index import index_params
+    save_path = str(tmp_path / "embeddings.faiss")
+    generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub",
+                        index_params=index_params(type='ivf', nlist=4, nprobe=1))
+    mtime = (tmp_path / "embeddings.faiss").stat().st_mtime_ns
+
+    _, index = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder, model_name="stub",
+                                   index_params=index_params(type='ivf', nlist=4, nprobe=4))
+
+    assert (tmp_path / "embeddings.faiss").stat().st_mtime_ns == mtime
+    assert index.nprobe == 4
+
+def test_similar_players_filter_inside_search(tmp_path, stub_embedder):
+    from conftest import make_players
+    from app.services.embeddings import get_similar_players
+    from app.services.vector_index import index_params
+    df = make_players(600, seed=3)
+    strict = {'Overall': 88, 'Potential': 60}
+    valid = df[(df['Overall'] >= 88) & (df['Potential'] >= 60)]
+    assert 5 <= len(valid) < 60
+
+    for params in (index_params(type='flat'), index_params(type='ivf', nlist=24, nprobe=1),
+                   index_params(type='hnsw', ef_search=4)):
+        embeddings, index = generate_embeddings(df.copy(), str(tmp_path / f"{params['type']}.faiss"),
+                                                embedder=stub_embedder, model_name="stub",
+                                                index_params=params)
+        query = embeddings[0]
+        result = get_similar_players(query, df, index, strict, stub_embedder, top_k=5)
+
+        assert len(result) == 5
+        assert set(result.index) <= set(valid.index)
+        if params['type'] == 'flat':
+            distances = ((embeddings[valid.index] - query) ** 2).sum(axis=1)
+            assert set(result.index) == set(valid.index[np.argsort(distances)[:5]])
+
+def test_compressed_storage_reranks_from_float16(tmp_path, stub_embedder):
+    from conftest import make_players
+    from app.services.vector_index import index_params
+    df = make_players(300, seed=5)
+    save_path = str(tmp_path / "embeddings.faiss")
+    embeddings, flat = generate_embeddings(df.copy(), save_path, embedder=stub_embedder, model_name="stub")
+    expected = flat.search(embeddings[:10], 1)[1]
+    encoded = stub_embedder.encoded
+
+    for storage in ('float16', 'sq8', 'pq'):
+        vectors, index = generate_embeddings(df.copy(), save_path, embedder=stub_embedder, model_name="stub",
+                                             index_params=index_params(storage=storage, pq_m=4, rerank=8))
+        assert np.load(tmp_path / "embeddings.vectors.npy").dtype == np.float16
+        assert vectors.dtype == np.float16
+        np.testing.assert_array_equal(index.search(embeddings[:10], 1)[1], expected)
+
+    assert stub_embedder.encoded == encoded
+
+@pytest.mark.parametrize("without_refine_params", [False, True])
+def test_filtered_search_on_compressed_storage(tmp_path, stub_embedder, monkeypatch, without_refine_params):
+    import faiss
+    from conftest import make_players
+    from app.services.vector_index import filtered_search, index_params
+    if without_refine_params:
+        # faiss < 1.8 no tiene IndexRefineSearchParameters
+        monkeypatch.delattr(faiss, "IndexRefineSearchParameters", raising=False)
+    df = make_players(300, seed=7)
+    ids = np.arange(0, 300, 3)
+
+    for storage in ('sq8', 'pq'):
+        embeddings, index = generate_embeddings(df.copy(), str(tmp_path / f"{storage}.faiss"),
+                                                embedder=stub_embedder, model_name="stub",
+                                                index_params=index_params(storage=storage, pq_m=4, rerank=8))
+        query = embeddings[1].astype('float32')
+        distances, labels = filtered_search(index, query, ids, 5)
+
+        assert set(labels[0]) <= set(ids)
+        exact = ((embeddings[ids].astype('float32') - query) ** 2).sum(axis=1)
+        assert labels[0][0] == ids[np.argmin(exact)]
+        assert np.all(np.diff(distances[0]) >= 0)
+
+def test_chunked_generation_matches_single_pass(tmp_path, players_df, stub_embedder):
+    whole, _ = generate_embeddings(players_df.copy(), str(tmp_path / "whole.faiss"),
+                                   embedder=stub_embedder, model_name="stub")
+    save_path = str(tmp_path / "chunked.faiss")
+    chunked, index = generate_embeddings(players_df.copy(), save_path, embedder=stub_embedder,
+                                         model_name="stub", chunk_rows=7)
+
+    np.testing.assert_array_equal(chunked, whole)
+    assert index.ntotal == len(players_df)
+
+    changed = players_df.copy()
+    changed.loc[10, 'Overall'] = 99
+    before = stub_embedder.encoded
+    generate_embeddings(changed, save_path, embedder=stub_embedder, model_name="stub", chunk_rows=7)
+    assert stub_embedder.encoded - before == 1
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.teams import get_recommender
+from app.services.executor import BoundedExecutor, ExecutorSaturated, cpu_executor
+
+
+def test_event_loop_stays_free_while_work_runs():
+    executor = BoundedExecutor(max_concurrency=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        async with executor.admit():
+            work = asyncio.ensure_future(executor.run(release.wait, 5))
+            # El loop sigue atendiendo otras corrutinas mientras el hilo trabaja
+            await asyncio.sleep(0.01)
+            assert not work.done()
+            with pytest.raises(ExecutorSaturated):
+                async with executor.admit():
+                    pass
+            release.set()
+            return await work
+
+    assert asyncio.run(scenario()) is True
+    assert executor.stats()['rejected'] == 1
+    assert executor.stats()['in_flight'] == 0
+    executor.shutdown()
+
+def test_saturated_endpoint_returns_retry_after(monkeypatch):
+    monkeypatch.setattr(cpu_executor, "admitted", cpu_executor.capacity)
+    app.dependency_overrides[get_recommender] = lambda: object()
+    try:
+        response = TestClient(app).post("/api/teams/generate", json={
+            "team_description": "equipo de prueba saturado",
+            "team_formation": "4-3-3",
+            "budget": 1000000,
+            "criteria": {},
+        })
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(cpu_executor.retry_after)
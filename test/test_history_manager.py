@@ -0,0 +1,137 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from app.services.history_manager import HistoryManager, team_hash
+
+
+def make_manager(tmp_path, **kwargs):
+    kwargs.setdefault('legacy_path', None)
+    return HistoryManager(str(tmp_path / "history.sqlite3"), **kwargs)
+
+
+def test_team_hash_is_stable_and_order_independent():
+    assert team_hash({"a": 1, "b": [1, 2]}) == team_hash({"b": [1, 2], "a": 1})
+    assert team_hash({"a": 1}) != team_hash({"a": 2})
+
+def test_entries_are_indexed_by_user_and_hash(tmp_path):
+    manager = make_manager(tmp_path)
+    first = manager.add_request("u1", {"f": "4-3-3"}, {"formation": "4-3-3"})
+    manager.add_request("u2", {"f": "4-4-2"}, {"formation": "4-4-2"})
+    manager.add_request("u1", {"f": "4-4-2"}, {"formation": "4-4-2"})
+
+    assert [e["request"]["f"] for e in manager.get_history("u1")] == ["4-3-3", "4-4-2"]
+    assert len(manager.get_history()) == 3
+    assert manager.get_last_team("u1")["response"] == {"formation": "4-4-2"}
+    assert manager.get_last_team("nadie") is None
+    similar = manager.get_similar_teams(team_hash({"formation": "4-4-2"}))
+    assert [e["user_id"] for e in similar] == ["u2", "u1"]
+    assert manager.get_similar_teams(first["team_hash"])[0]["user_id"] == "u1"
+    manager.close()
+
+def test_retention_by_count(tmp_path):
+    manager = make_manager(tmp_path, max_entries=5)
+    for i in range(12):
+        manager.add_request("u", {"i": i}, {})
+    assert [e["request"]["i"] for e in manager.get_history()] == [7, 8, 9, 10, 11]
+    manager.close()
+
+def test_concurrent_writers_do_not_lose_entries(tmp_path):
+    managers = [make_manager(tmp_path) for _ in range(3)]
+
+    def write(manager, worker):
+        for i in range(50):
+            manager.add_request(f"u{worker}", {"i": i}, {"i": i})
+
+    threads = [threading.Thread(target=write, args=(managers[w % 3], w)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for manager in managers:
+        manager.flush()
+    assert len(managers[0].get_history()) == 300
+    assert [e["request"]["i"] for e in managers[1].get_history("u4")] == list(range(50))
+    for manager in managers:
+        manager.close()
+
+def test_legacy_json_history_is_imported(tmp_path):
+    legacy = tmp_path / "team_history.json"
+    old = (datetime.now() - timedelta(days=400)).isoformat()
+    legacy.write_text(json.dumps([
+        {"timestamp": old, "user_id": "u", "request": {}, "response": {"x": 0}, "team_hash": 1},
+        {"timestamp": datetime.now().isoformat(), "user_id": "u", "request": {}, "response": {"x": 1}, "team_hash": 2},
+    ]))
+    manager = make_manager(tmp_path, legacy_path=str(legacy), max_age_days=90)
+    assert len(manager.get_history("u")) == 2
+
+    # La retención por antigüedad se aplica en la siguiente escritura
+    manager.add_request("u", {}, {"x": 2})
+    assert [e["response"]["x"] for e in manager.get_history("u")] == [1, 2]
+    assert manager.get_history("u")[0]["team_hash"] == team_hash({"x": 1})
+    manager.close()
+
+def roster(ids, position="ST"):
+    return {"players": [{"id": i, "position": position} for i in ids]}
+
+def test_similar_rosters_are_found_through_lsh(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.add_request("u1", {}, roster(range(11)))
+    manager.add_request("u2", {}, roster(list(range(10)) + [99]))
+    manager.add_request("u3", {}, roster(range(100, 111)))
+
+    similar = manager.get_similar_rosters(roster(range(11)))
+
+    assert [e["user_id"] for e in similar] == ["u1", "u2"]
+    assert similar[0]["similarity"] == 1.0
+    assert similar[1]["similarity"] == 10 / 12
+    assert manager.get_similar_rosters(roster(range(200, 211))) == []
+    manager.close()
+
+def test_lsh_index_follows_retention_and_parameter_changes(tmp_path):
+    manager = make_manager(tmp_path, max_entries=2)
+    for user in ("u1", "u2", "u3"):
+        manager.add_request(user, {}, roster(range(11)))
+    assert [e["user_id"] for e in manager.get_similar_rosters(roster(range(11)))] == ["u3", "u2"]
+    manager.close()
+
+    # Otros parámetros de LSH reindexan las entradas existentes
+    reopened = make_manager(tmp_path, by_position=True)
+    assert [e["similarity"] for e in reopened.get_similar_rosters(roster(range(11)))] == [1.0, 1.0]
+    # Mismos jugadores en otra posición: 11 fichas compartidas de 33
+    assert reopened.get_similar_rosters(roster(range(11), position="GK"), min_similarity=0.5) == []
+    reopened.close()
+
+def test_user_read_does_not_wait_for_other_users_pending_entries(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path)
+    manager.add_request("u1", {"i": 1}, {})
+    manager.flush()
+    release, blocked = threading.Event(), threading.Event()
+    insert = manager._insert
+
+    def slow_insert(conn, entries):
+        if any(entry["user_id"] == "lento" for entry in entries):
+            blocked.set()
+            release.wait(5)
+            blocked.clear()
+        insert(conn, entries)
+
+    monkeypatch.setattr(manager, "_insert", slow_insert)
+    manager.add_request("lento", {"i": 2}, {})
+    try:
+        # El escritor sigue bloqueado con la entrada de otro usuario
+        assert blocked.wait(5)
+        assert [e["request"]["i"] for e in manager.get_history("u1")] == [1]
+        assert blocked.is_set()
+    finally:
+        release.set()
+    assert [e["request"]["i"] for e in manager.get_history()] == [1, 2]
+    manager.close()
+
+def test_close_unregisters_atexit_hook(tmp_path, monkeypatch):
+    import atexit
+    unregistered = []
+    monkeypatch.setattr(atexit, "unregister", unregistered.append)
+    manager = make_manager(tmp_path)
+    manager.close()
+    assert unregistered == [manager.close]
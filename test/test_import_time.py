@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app.lazy import HEAVY_MODULES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_app_import_defers_heavy_dependencies():
+    # Proceso nuevo: en este ya pueden estar cargadas por otras pruebas
+    code = ("import json, sys; import app.main; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    heavy = json.loads(output.strip().splitlines()[-1])
+
+    assert heavy == [], f"Se cargaron al importar app.main: {heavy}"
+
+def test_lazy_package_exports_still_resolve():
+    import app
+    import app.services
+
+    assert app.TeamRecommender.__name__ == 'TeamRecommender'
+    assert callable(app.services.filter_by_position)
+    assert 'FIFAAssistant' in dir(app)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+from conftest import StubEmbedder
+from app.ai_assistant import intent_matrix
+from app.ai_assistant.intent_matrix import IntentMatrix, clean_message
+from app.ai_assistant.intent_detection import IntentDetector
+from app.ai_assistant.chat_processor import FIFAAssistant
+
+INTENTS = {
+    'greeting': {'patterns': ['hola', 'buenos días', 'hello']},
+    'empty': {'patterns': []},
+    'team_creation': {'patterns': ['quiero crear un equipo', 'armar un equipo']},
+    'thanks': {'patterns': ['gracias']},
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    intent_matrix._memo.clear()
+    yield
+    intent_matrix._memo.clear()
+
+def _reference_best(embedder, message, threshold):
+    """Detección original: cosine_similarity de sklearn intención por intención"""
+    msg_embedding = embedder.encode([clean_message(message)])
+    best_intent, best_similarity = None, 0.0
+    for intent, data in INTENTS.items():
+        if data['patterns']:
+            sim = np.max(cosine_similarity(msg_embedding, embedder.encode(data['patterns'])))
+            if sim > best_similarity and sim > threshold:
+                best_intent, best_similarity = intent, sim
+    return best_intent, best_similarity
+
+def test_scores_match_pairwise_cosine():
+    embedder = StubEmbedder()
+    matrix = IntentMatrix(INTENTS, embedder, model_name="stub")
+
+    assert matrix.labels == ['greeting', 'team_creation', 'thanks']
+    for message in ['Hola!', 'armar un equipo', 'gracias', 'algo distinto']:
+        for threshold in (-1.0, 0.5):
+            expected, similarity = _reference_best(embedder, message, threshold)
+            match = matrix.best(embedder.encode([clean_message(message)]), threshold)
+            if expected is None:
+                assert match is None
+            else:
+                assert match[0] == expected
+                assert match[1] == pytest.approx(similarity, abs=1e-5)
+
+def test_matrix_is_persisted_and_shared(tmp_path):
+    first = StubEmbedder()
+    IntentMatrix(INTENTS, first, model_name="stub", cache_dir=str(tmp_path))
+    assert first.encoded == 6
+    assert len(list(tmp_path.glob("intents-*.npz"))) == 1
+
+    # Otra instancia en el mismo proceso reutiliza la matriz en memoria
+    second = StubEmbedder()
+    IntentMatrix(INTENTS, second, model_name="stub", cache_dir=str(tmp_path))
+    assert second.encoded == 0
+
+    # Un proceso nuevo la lee del disco; otro modelo obliga a regenerarla
+    intent_matrix._memo.clear()
+    loaded = IntentMatrix(INTENTS, second, model_name="stub", cache_dir=str(tmp_path))
+    assert second.encoded == 0
+    assert loaded.matrix.shape == (6, second.dimension)
+    IntentMatrix(INTENTS, second, model_name="otro-modelo", cache_dir=str(tmp_path))
+    assert second.encoded == 6
+
+def test_detectors_use_the_intent_matrix():
+    embedder = StubEmbedder()
+    detector = IntentDetector(embedder, model_name="stub")
+    assistant = FIFAAssistant(df=None, embedder=embedder, model_name="stub")
+
+    assert detector.detect_intent("Hola")['intent'] == 'greeting'
+    assert assistant.detect_intent("gracias") == 'thanks'
+    assert assistant.detect_intent("mensaje sin relación") is None
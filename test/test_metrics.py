@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.teams import get_recommender
+from app.services import metrics
+from app.services.result_cache import team_cache
+
+
+class SpanningRecommender:
+    def generate_team(self, description, formation, **kwargs):
+        with metrics.span('team.select'):
+            pass
+        player = {"id": 1, "name": "A", "position": "GK", "overall": 80, "value": 1.0,
+                  "age": 25, "nationality": "Spain", "selection_reason": "x"}
+        return {"formation": formation, "description": description, "players": [player], "total_value": 1.0,
+                "avg_rating": 80.0, "team_analysis": ""}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('test_seconds', "prueba", ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, 'a')
+    histogram.observe(0.5, 'a')
+    histogram.observe(5, 'a')
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+
+def test_spans_are_collected_per_request():
+    spans, token = metrics.start_request()
+    with metrics.span('chat.encode'):
+        pass
+    metrics.observe_stage('chat.encode', 0.002)
+    metrics.end_request(token)
+    with metrics.span('fuera.del.request'):
+        pass
+
+    assert [stage for stage, _ in spans] == ['chat.encode', 'chat.encode']
+    header = metrics.server_timing(spans, total=0.01)
+    assert header.startswith('chat.encode;dur=') and header.endswith('total;dur=10.00')
+
+def test_endpoint_returns_server_timing_and_metrics():
+    team_cache.invalidate()
+    app.dependency_overrides[get_recommender] = lambda: SpanningRecommender()
+    client = TestClient(app)
+    try:
+        response = client.post("/api/teams/generate", json={
+            "team_description": "equipo con métricas", "team_formation": "4-3-3",
+            "budget": 1000000, "criteria": {},
+        })
+    finally:
+        app.dependency_overrides.clear()
+        team_cache.invalidate()
+
+    assert response.status_code == 200
+    # Los spans del hilo del executor llegan al encabezado del request
+    stages = [part.split(';')[0] for part in response.headers["Server-Timing"].split(', ')]
+    assert {'executor.queue', 'team.select', 'total'} <= set(stages)
+
+    body = client.get("/metrics").text
+    assert 'fifa_stage_duration_seconds_count{stage="team.select"}' in body
+    assert 'fifa_http_request_duration_seconds_count{method="POST",route="/api/teams/generate",status="200"}' in body
+    assert 'fifa_team_cache_misses' in body
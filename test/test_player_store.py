@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from app.services.player_store import (
+    compact_frame, compile_player_store, load_player_store, load_players, is_fresh, memory_report, read_schema
+)
+from app.services.data_processing import load_and_preprocess_data, preprocess_players
+
+
+def test_compile_keeps_only_needed_columns(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.assign(Club="X", Weight=70).to_csv(csv_path, index=False)
+
+    store = compile_player_store(str(csv_path))
+    schema = read_schema(str(store))
+
+    assert schema['rows'] == len(players_df)
+    names = [c['name'] for c in schema['columns']]
+    assert 'Club' not in names and 'Weight' not in names
+    assert 'Overall' in names and 'Positions' in names
+
+def test_roundtrip_matches_csv(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.to_csv(csv_path, index=False)
+
+    df = load_player_store(str(compile_player_store(str(csv_path))))
+
+    np.testing.assert_array_equal(df['Overall'].to_numpy(), players_df['Overall'].to_numpy())
+    assert df['Name'].tolist() == players_df['Name'].tolist()
+    assert (df['BestPosition'] == 'GK').sum() == (players_df['BestPosition'] == 'GK').sum()
+
+def test_stale_store_is_recompiled(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.to_csv(csv_path, index=False)
+    load_players(str(csv_path))
+    store_path = str(tmp_path / "players.store")
+    assert is_fresh(store_path, str(csv_path))
+
+    players_df.head(10).to_csv(csv_path, index=False)
+    assert not is_fresh(store_path, str(csv_path))
+    assert len(load_players(str(csv_path))) == 10
+
+def test_preprocess_reads_from_store(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.to_csv(csv_path, index=False)
+
+    df = load_and_preprocess_data(str(csv_path))
+
+    assert (tmp_path / "players.store" / "schema.json").exists()
+    assert set(df['position_group']) <= {'Goalkeeper', 'Defender', 'Midfielder', 'Forward', 'Other'}
+    assert len(df) == len(players_df)
+
+def test_preprocess_keeps_detailed_attributes(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    pace = np.where(players_df['BestPosition'] == 'GK', np.nan, 70.0)
+    players_df.assign(pace=pace, skill_curve=55).to_csv(csv_path, index=False)
+
+    df = load_and_preprocess_data(str(csv_path))
+
+    assert df['skill_curve'].eq(55).all()
+    assert df['pace'].isna().sum() == (players_df['BestPosition'] == 'GK').sum()
+    assert df.loc[df['pace'].notna(), 'pace'].eq(70).all()
+
+def test_store_uses_compact_schema(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.to_csv(csv_path, index=False)
+
+    df = load_players(str(csv_path))
+
+    assert df['Overall'].dtype == np.uint8 and df['ID'].dtype == np.int32
+    assert df['ValueEUR'].dtype == np.int32
+    assert df['Nationality'].dtype == 'category' and df['Name'].dtype == 'category'
+    np.testing.assert_array_equal(df['ValueEUR'].to_numpy(), players_df['ValueEUR'].to_numpy())
+
+def test_integer_columns_with_gaps_fall_back_to_float32(players_df):
+    df = players_df.astype({'Overall': 'float64'})
+    df.loc[0, 'Overall'] = np.nan
+    df.loc[1, 'ValueEUR'] = 5e9
+
+    compact = compact_frame(df)
+
+    assert compact['Overall'].dtype == np.float32 and np.isnan(compact['Overall'].iloc[0])
+    assert compact['ValueEUR'].dtype == np.float32
+    assert compact['Potential'].dtype == np.uint8
+
+def test_memory_report_breaks_down_columns(players_df):
+    report = memory_report(players_df)
+
+    assert report.loc['Overall', 'dtype_after'] == 'uint8'
+    assert report.loc['Overall', 'bytes_after'] * 8 == report.loc['Overall', 'bytes_before']
+    assert report.loc['total', 'bytes_after'] == report['bytes_after'].drop('total').sum()
+    assert report.loc['total', 'saved_pct'] > 50
+
+def test_chunked_compile_matches_single_pass(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    players_df.to_csv(csv_path, index=False)
+
+    whole = load_player_store(str(compile_player_store(str(csv_path), str(tmp_path / "whole.store"))))
+    chunked = load_player_store(str(compile_player_store(str(csv_path), str(tmp_path / "chunked.store"), chunksize=7)))
+
+    assert list(chunked.columns) == list(whole.columns)
+    for col in whole.columns:
+        assert chunked[col].dtype == whole[col].dtype
+        assert chunked[col].tolist() == whole[col].tolist()
+
+def test_multiple_editions_are_appended(tmp_path, players_df):
+    first, second = tmp_path / "fifa21.csv", tmp_path / "fifa22.csv"
+    players_df.to_csv(first, index=False)
+    later = players_df.drop(columns=['Potential']).assign(Nationality='Uruguay')
+    later['Overall'] = later['Overall'].astype('float64')
+    later.loc[5, 'Overall'] = np.nan
+    later.to_csv(second, index=False)
+    sources = [str(first), str(second)]
+    store = str(tmp_path / "all.store")
+
+    df = load_players(sources, store, chunksize=16)
+
+    assert len(df) == 2 * len(players_df)
+    # Un faltante en la segunda edición pasa la columna completa a float32
+    assert df['Overall'].dtype == np.float32 and np.isnan(df['Overall'].iloc[len(players_df) + 5])
+    assert df['Overall'].iloc[:len(players_df)].tolist() == players_df['Overall'].astype(float).tolist()
+    assert df['Potential'].iloc[len(players_df):].isna().all()
+    assert (df['Nationality'].iloc[len(players_df):] == 'Uruguay').all()
+    assert is_fresh(store, sources) and not is_fresh(store, [str(first)])
+
+def test_compile_preprocesses_each_chunk(tmp_path, players_df):
+    csv_path = tmp_path / "players.csv"
+    pace = np.where(players_df['BestPosition'] == 'GK', '-', '70')
+    players_df.assign(pace=pace).to_csv(csv_path, index=False)
+
+    store = load_player_store(str(compile_player_store(str(csv_path), chunksize=25)))
+
+    assert store['main_position'].dtype == 'category' and store['position_group'].dtype == 'category'
+    assert store['pace'].dtype == np.float32
+    assert store['pace'].isna().sum() == (players_df['BestPosition'] == 'GK').sum()
+    expected = preprocess_players(pd.read_csv(csv_path))
+    assert store['position_group'].tolist() == expected['position_group'].tolist()
+    assert load_and_preprocess_data(str(csv_path))['main_position'].tolist() == expected['main_position'].tolist()
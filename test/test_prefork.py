@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.services.prefork import Prefork, memory_usage
+from app.services.registry import registry
+from app.services.session_store import SQLiteSessionStore
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="requiere fork()")
+
+
+def _run_in_workers(worker, workers=1):
+    """Ejecuta `worker` en procesos hijos y devuelve (código, líneas que escribieron)"""
+    read_fd, write_fd = os.pipe()
+
+    def report():
+        os.close(read_fd)
+        os.write(write_fd, (json.dumps(worker()) + '\n').encode())
+
+    code = Prefork(report, workers, respawn=False).run()
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        return code, [json.loads(line) for line in f if line.strip()]
+
+
+def test_workers_share_parent_arrays():
+    scores = np.arange(1_000_000, dtype=np.float64)
+    code, results = _run_in_workers(lambda: {'pid': os.getpid(), 'sum': float(scores.sum())}, workers=3)
+
+    assert code == 0
+    assert len({result['pid'] for result in results}) == 3
+    assert all(result['sum'] == float(scores.sum()) for result in results)
+
+def test_failed_worker_is_reported():
+    def worker():
+        raise RuntimeError("falla al arrancar")
+
+    assert Prefork(worker, 2, respawn=False).run() == 1
+
+def test_sqlite_sessions_reconnect_after_fork(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    store.put("padre", {"step": 1})
+
+    def worker():
+        with store.session("hijo") as context:
+            context["seen"] = store.get("padre")
+        return store.stats()["entries"]
+
+    code, results = _run_in_workers(worker)
+
+    assert code == 0 and results == [2]
+    assert store.get("hijo") == {"seen": {"step": 1}}
+    store.close()
+
+def test_memory_usage_reports_private_bytes():
+    usage = memory_usage()
+    if not usage:
+        pytest.skip("/proc/self/smaps_rollup no disponible")
+    assert usage["rss_bytes"] >= usage["private_bytes"] > 0
+
+def test_lifespan_skips_loading_when_preloaded(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "load_resources", lambda: calls.append(1))
+    monkeypatch.setattr(main.settings, "PRELOAD_RESOURCES", True)
+    monkeypatch.setattr(registry, "recommender", object())
+    monkeypatch.setattr(registry, "assistant", object())
+
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+
+    assert calls == []
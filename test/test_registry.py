@@ -0,0 +1,127 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.registry import ResourceRegistry, registry
+from app.routers.teams import get_recommender
+from app.routers.chat import get_assistant
+
+
+@pytest.fixture
+def loaded_registry(tmp_path, players_df, stub_embedder):
+    """Registro cargado a partir de un CSV temporal"""
+    data_path = tmp_path / "players.csv"
+    players_df.to_csv(data_path, index=False)
+    resources = ResourceRegistry()
+    resources.load(str(data_path), str(tmp_path / "embeddings.faiss"), "stub", embedder=stub_embedder)
+    return resources
+
+def test_load_registers_components(loaded_registry):
+    """Cada componente se carga una vez y registra su tiempo"""
+    status = loaded_registry.status()
+
+    assert status["ready"]
+    assert set(status["components"]) == {'dataframe', 'index', 'recommender', 'assistant'}
+    assert status["players"] == 60
+
+def test_reuses_persisted_index(tmp_path, players_df, stub_embedder):
+    """Un segundo arranque con el mismo dataset no vuelve a codificar jugadores"""
+    data_path = tmp_path / "players.csv"
+    players_df.to_csv(data_path, index=False)
+    index_path = str(tmp_path / "embeddings.faiss")
+
+    ResourceRegistry().load(str(data_path), index_path, "stub", embedder=stub_embedder)
+    encoded = stub_embedder.encoded
+    ResourceRegistry().load(str(data_path), index_path, "stub", embedder=stub_embedder)
+
+    # Tanto el índice como la matriz de intenciones se leen del disco
+    assert stub_embedder.encoded == encoded
+
+def test_reload_closes_previous_encoder(tmp_path, loaded_registry, stub_embedder):
+    import asyncio
+    data_path = str(tmp_path / "players.csv")
+    index_path = str(tmp_path / "embeddings.faiss")
+
+    async def scenario():
+        previous = loaded_registry.encoder
+        await previous.encode("delantero rápido")
+        worker = previous._worker
+        await asyncio.to_thread(loaded_registry.load, data_path, index_path, "stub", embedder=stub_embedder)
+        for _ in range(100):
+            if worker.done():
+                break
+            await asyncio.sleep(0.01)
+        await loaded_registry.encoder.close()
+        return previous is not loaded_registry.encoder, worker.done()
+
+    assert asyncio.run(scenario()) == (True, True)
+
+def test_reload_keeps_or_closes_previous_sessions(tmp_path, loaded_registry, stub_embedder):
+    from app.services.session_store import MemorySessionStore
+    data_path = str(tmp_path / "players.csv")
+    index_path = str(tmp_path / "embeddings.faiss")
+    first = loaded_registry.sessions
+    first.put("u1", {"turnos": 1})
+
+    # Sin almacén nuevo se conservan las conversaciones
+    loaded_registry.load(data_path, index_path, "stub", embedder=stub_embedder)
+    assert loaded_registry.sessions is first
+    assert loaded_registry.assistant.sessions is first
+    assert first.get("u1") == {"turnos": 1}
+
+    closed = []
+    first.close = lambda: closed.append(first)
+    replacement = MemorySessionStore()
+    loaded_registry.load(data_path, index_path, "stub", embedder=stub_embedder, sessions=replacement)
+    assert loaded_registry.sessions is replacement
+    assert closed == [first]
+
+def test_failed_load_closes_new_sessions(tmp_path, stub_embedder):
+    from app.services.session_store import MemorySessionStore
+    sessions = MemorySessionStore()
+    closed = []
+    sessions.close = lambda: closed.append(sessions)
+    with pytest.raises(FileNotFoundError):
+        ResourceRegistry().load(str(tmp_path / "nada.csv"), str(tmp_path / "embeddings.faiss"), "stub",
+                                embedder=stub_embedder, sessions=sessions)
+    assert closed == [sessions]
+
+def test_initialize_writes_where_the_registry_reads(tmp_path, players_df, stub_embedder, monkeypatch):
+    import app.initialize as initialize
+    import app.services.registry as registry_module
+    from app.services.embeddings import generate_embeddings
+    players_df.to_csv(tmp_path / "players.csv", index=False)
+    monkeypatch.setattr(registry_module, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(initialize.settings, "DATA_PATH", "players.csv")
+    monkeypatch.setattr(initialize.settings, "PLAYER_STORE_PATH", "data/players.store")
+    monkeypatch.setattr(initialize.settings, "EMBEDDINGS_PATH", "models/embeddings.faiss")
+    monkeypatch.setattr(initialize, "generate_embeddings",
+                        lambda df, path, **kwargs: generate_embeddings(df, path, embedder=stub_embedder, **kwargs))
+    # Otro directorio de trabajo: las rutas relativas no deben resolverse contra él
+    monkeypatch.chdir(tmp_path / "..")
+
+    initialize.main()
+
+    assert (tmp_path / "data" / "players.store" / "schema.json").exists()
+    assert (tmp_path / "models" / "embeddings.faiss").exists()
+
+def test_missing_data_file(tmp_path, stub_embedder):
+    resources = ResourceRegistry()
+    with pytest.raises(FileNotFoundError):
+        resources.load(str(tmp_path / "missing.csv"), str(tmp_path / "e.faiss"), "stub", embedder=stub_embedder)
+
+    assert not resources.status()["ready"]
+    assert "missing.csv" in resources.status()["error"]
+
+def test_dependencies_return_singletons(loaded_registry, monkeypatch):
+    monkeypatch.setattr(registry, "recommender", loaded_registry.recommender)
+    monkeypatch.setattr(registry, "assistant", loaded_registry.assistant)
+
+    assert get_recommender() is get_recommender() is loaded_registry.recommender
+    assert get_assistant() is loaded_registry.assistant
+
+def test_ready_endpoint_reports_unavailable(monkeypatch):
+    monkeypatch.setattr(registry, "recommender", None)
+    response = TestClient(app).get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
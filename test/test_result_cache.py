@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.teams import get_recommender
+from app.services.result_cache import ResultCache, canonical_key, etag_matches, team_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingRecommender:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_team(self, description, formation, **kwargs):
+        with self.lock:
+            self.calls += 1
+        return {
+            "formation": formation, "description": description, "players": [
+                {"id": 1, "name": "A", "position": "GK", "overall": 80, "value": 1.0,
+                 "age": 25, "nationality": "Spain", "selection_reason": "x"}
+            ],
+            "total_value": 1.0, "avg_rating": 80.0, "team_analysis": "ok",
+        }
+
+
+@pytest.fixture(autouse=True)
+def clean_team_cache():
+    team_cache.invalidate()
+    yield
+    team_cache.invalidate()
+    app.dependency_overrides.clear()
+
+
+def test_equivalent_requests_share_a_key():
+    a = {"formation": "4-3-3", "budget": 1000000.0, "criteria": {"GK": {"min_overall": 80}, "CB": {"min_overall": 70}}}
+    b = {"criteria": {"CB": {"min_overall": 70.0}, "GK": {"min_overall": 80}}, "budget": 1000000, "formation": "4-3-3 "}
+    assert canonical_key(a) == canonical_key(b)
+    assert canonical_key(a) != canonical_key({**a, "budget": 1000001})
+
+def test_lru_and_ttl():
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, ttl_seconds=10, clock=clock)
+
+    async def fill(key):
+        async def compute():
+            return key
+        return await cache.get_or_compute(key, compute)
+
+    async def scenario():
+        for key in ("a", "b", "a", "c"):
+            await fill(key)
+
+    asyncio.run(scenario())
+    assert cache.get("b") is None and cache.get("a") is not None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['hits'] == 1
+
+def test_identical_concurrent_requests_compute_once():
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"team": 1}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(source for _, _, source in results) == ['coalesced'] * 4 + ['miss']
+    assert cache.stats()['coalesced'] == 4
+
+def test_failures_are_shared_but_not_cached():
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+    assert cache.get("k") is None
+
+def test_cancelled_leader_does_not_fail_waiters():
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"team": 1}
+
+    async def scenario():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_compute("k", compute)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader.cancelled(), results
+
+    cancelled, results = asyncio.run(scenario())
+    assert cancelled
+    assert [value for value, _, _ in results] == [{"team": 1}] * 2
+    assert len(calls) == 1 and cache.get("k") is not None
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+
+    async def compute():
+        return {"players": []}
+
+    async def scenario():
+        return await cache.get_or_compute("k", compute, cacheable=lambda team: bool(team["players"]))
+
+    value, _, source = asyncio.run(scenario())
+    assert value == {"players": []} and source == 'miss'
+    assert cache.get("k") is None
+
+def test_invalidate_from_another_thread_runs_on_the_loop():
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    threads = []
+    invalidate = cache._invalidate
+    cache._invalidate = lambda: (threads.append(threading.get_ident()), invalidate())
+
+    async def compute():
+        return {"team": 1}
+
+    async def scenario():
+        await cache.get_or_compute("k", compute)
+        await asyncio.to_thread(cache.invalidate)
+        await asyncio.sleep(0)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads == [loop_thread]
+    assert cache.get("k") is None and cache.generation == 1
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+def test_endpoint_caches_and_honours_if_none_match():
+    recommender = CountingRecommender()
+    app.dependency_overrides[get_recommender] = lambda: recommender
+    client = TestClient(app)
+    body = {"team_description": "equipo cacheado de prueba", "team_formation": "4-3-3",
+            "budget": 1000000, "criteria": {"GK": {"min_overall": 80}}}
+
+    first = client.post("/api/teams/generate", json=body)
+    second = client.post("/api/teams/generate", json={**body, "budget": 1000000.0})
+    not_modified = client.post("/api/teams/generate", json=body, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-Cache"] == "miss" and second.headers["X-Cache"] == "hit"
+    assert second.json() == first.json()
+    assert not_modified.status_code == 304
+    assert recommender.calls == 1
+
+    # Recargar el dataset invalida los resultados
+    team_cache.invalidate()
+    client.post("/api/teams/generate", json=body)
+    assert recommender.calls == 2
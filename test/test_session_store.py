@@ -0,0 +1,124 @@
+import threading
+import pytest
+from conftest import StubEmbedder
+from app.ai_assistant.chat_processor import FIFAAssistant
+from app.services.session_store import MemorySessionStore, SQLiteSessionStore, create_session_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_store_expires_idle_sessions():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl_seconds=10, clock=clock)
+    store.put("a", {"style": "ofensivo"})
+    store.put("b", {})
+
+    clock.now += 6
+    assert store.get("a") == {"style": "ofensivo"}
+    store.put("a", {"style": "ofensivo"})
+    clock.now += 6
+
+    assert store.get("b") is None
+    assert store.get("a") == {"style": "ofensivo"}
+    assert store.stats()['expirations'] == 1
+
+def test_memory_store_bounds_entries_and_bytes():
+    store = MemorySessionStore(max_entries=2)
+    for key in ("a", "b", "c"):
+        store.put(key, {"n": key})
+
+    assert store.get("a") is None
+    assert store.stats()['entries'] == 2
+    assert store.stats()['evictions'] == 1
+
+    small = MemorySessionStore(max_bytes=100)
+    for i in range(20):
+        small.put(f"user-{i}", {"style": "x" * 10})
+    assert small.stats()['bytes'] <= 100
+    small.put("big", {"style": "x" * 200})
+    assert small.get("big") is None
+
+def test_memory_store_returns_copies():
+    store = MemorySessionStore()
+    store.put("a", {"style": "ofensivo"})
+    store.get("a")["style"] = "defensivo"
+    assert store.get("a") == {"style": "ofensivo"}
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_concurrent_updates_to_one_session_are_not_lost(backend, tmp_path):
+    store = create_session_store(backend, str(tmp_path / "sessions.sqlite3"))
+
+    def increment():
+        for _ in range(50):
+            with store.session("u") as ctx:
+                ctx["count"] = ctx.get("count", 0) + 1
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert store.get("u") == {"count": 200}
+    store.close()
+
+def test_sqlite_store_is_shared_and_pruned(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SQLiteSessionStore(path, ttl_seconds=10, max_entries=2, prune_every=1000, clock=clock)
+    second = SQLiteSessionStore(path, ttl_seconds=10, max_entries=2, clock=clock)
+
+    with first.session("a") as ctx:
+        ctx["style"] = "ofensivo"
+    assert second.get("a") == {"style": "ofensivo"}
+
+    first.put("b", {})
+    clock.now += 5
+    first.put("c", {})
+    first.put("d", {})
+    clock.now += 6
+    first.prune()
+
+    assert second.stats()['entries'] == 2
+    assert first.get("a") is None and first.get("b") is None
+    assert first.get("d") == {}
+    first.close()
+    second.close()
+
+def test_sqlite_store_is_bounded_by_bytes(tmp_path):
+    clock = FakeClock()
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_bytes=200, prune_every=1, clock=clock)
+
+    for i in range(10):
+        clock.now += 1
+        store.put(f"u{i}", {"history": "x" * 40})
+
+    stats = store.stats()
+    assert stats['bytes'] <= 200 and stats['entries'] == 3
+    assert store.get("u9") is not None and store.get("u0") is None
+
+    store.put("u9", {"history": "x" * 500})
+    assert store.get("u9") is None
+    store.close()
+
+def test_assistant_keeps_conversation_in_the_store(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    assistant = FIFAAssistant(df=None, embedder=StubEmbedder(), model_name="stub", sessions=store)
+
+    assistant.process_message("u1", "crear equipo")
+    assistant.process_message("u1", "juego ofensivo")
+
+    # Otro proceso con el mismo archivo ve la conversación
+    other = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    assert other.get("u1") == {"awaiting_style": True, "awaiting_formation": True, "style": "juego ofensivo"}
+    assert not assistant.is_ready_to_generate_team("u1")
+    assert assistant.generate_team_from_context("u1") == {"error": "Falta información para generar el equipo"}
+    assert assistant.generate_team_from_context("u2") == {"error": "No hay contexto para este usuario"}
+    store.close()
+    other.close()
@@ -0,0 +1,85 @@
+import itertools
+import numpy as np
+from unittest.mock import MagicMock
+from conftest import make_players
+from app.ai_assistant.recommendation_engine import TeamRecommender
+from app.ai_assistant.team_optimizer import GroupCandidates, cost_unit, prune_candidates, solve_team
+
+
+def _brute_force(groups, budget):
+    best = -1.0
+    options = [list(itertools.combinations(range(len(g.values)), g.slots)) for g in groups]
+    for combo in itertools.product(*options):
+        cost = sum(g.values[list(c)].sum() for g, c in zip(groups, combo))
+        score = sum(g.scores[list(c)].sum() for g, c in zip(groups, combo))
+        if cost <= budget and score > best:
+            best = score
+    return best
+
+def test_solve_team_matches_brute_force():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        groups = [
+            GroupCandidates(
+                values=rng.integers(0, 40, 7).astype(float) * 25000,
+                scores=rng.uniform(40, 90, 7),
+                slots=slots
+            )
+            for slots in (1, 2, 2)
+        ]
+        budget = float(rng.integers(10, 80) * 25000)
+
+        selections = solve_team(groups, budget)
+
+        cost = sum(g.values[s].sum() for g, s in zip(groups, selections))
+        score = sum(g.scores[s].sum() for g, s in zip(groups, selections))
+        assert cost <= budget
+        assert all(len(set(s)) == len(s) <= g.slots for g, s in zip(groups, selections))
+        expected = _brute_force(groups, budget)
+        if expected >= 0:
+            assert np.isclose(score, expected)
+
+def test_market_values_are_solved_exactly():
+    # Valores reales: múltiplos de 25.000 con presupuestos de ~1e8
+    rng = np.random.default_rng(7)
+    for _ in range(10):
+        groups = [
+            GroupCandidates(values=rng.integers(40, 1600, 6).astype(float) * 25000,
+                            scores=rng.uniform(40, 90, 6), slots=slots)
+            for slots in (1, 2, 2)
+        ]
+        budget = float(rng.integers(2100, 4000) * 25000)
+        assert cost_unit(groups, budget) == (25000.0, True)
+
+        selections = solve_team(groups, budget)
+
+        score = sum(g.scores[s].sum() for g, s in zip(groups, selections))
+        assert sum(g.values[s].sum() for g, s in zip(groups, selections)) <= budget
+        expected = _brute_force(groups, budget)
+        if expected >= 0:
+            assert np.isclose(score, expected)
+
+def test_fine_grained_values_are_approximate():
+    groups = [GroupCandidates(values=np.array([1000., 3000.]), scores=np.array([1., 2.]), slots=1)]
+    unit, exact = cost_unit(groups, 1e8)
+    assert not exact and unit > 1000
+
+def test_prune_keeps_non_dominated():
+    values = np.array([1., 2., 3., 4.])
+    scores = np.array([50., 40., 60., 55.])
+
+    assert sorted(prune_candidates(values, scores, 1)) == [0, 2]
+    assert sorted(prune_candidates(values, scores, 2)) == [0, 1, 2, 3]
+
+def test_exact_never_worse_than_greedy():
+    recommender = TeamRecommender(df=make_players(600, seed=2), embedder=MagicMock(), index=MagicMock())
+    criteria = {"GK": {"min_overall": 50}, "DEF": {}, "MID": {}, "ATT": {}}
+
+    for budget in (20e6, 60e6, 150e6):
+        greedy = recommender.generate_team("prueba", "4-4-2", criteria, budget)
+        exact = recommender.generate_team("prueba", "4-4-2", criteria, budget, optimizer='exact')
+
+        assert exact['total_value'] <= budget
+        assert len({p['id'] for p in exact['players']}) == len(exact['players']) >= len(greedy['players'])
+        assert recommender.team_score(exact) >= recommender.team_score(greedy) - 1e-9
+        assert [p['position'] for p in exact['players']][:5] == ['GK', 'CB', 'CB', 'FB', 'FB']
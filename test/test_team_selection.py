@@ -0,0 +1,198 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from conftest import make_players
+from app.ai_assistant.recommendation_engine import (
+    TeamRecommender, POSITION_POOLS, SCORE_ATTRIBUTES, weight_matrix
+)
+
+
+@pytest.fixture
+def recommender():
+    return TeamRecommender(df=make_players(400, seed=1), embedder=MagicMock(), index=MagicMock())
+
+def _reference_pick(df, positions, score_col, criteria, budget, used_ids):
+    """Selección original: filtro completo del DataFrame y nlargest"""
+    filtered = df[
+        (df['BestPosition'].isin(positions)) &
+        (~df['ID'].isin(used_ids)) &
+        (df['ValueEUR'] <= budget)
+    ]
+    for attr, min_val in criteria.items():
+        col = attr.replace('min_', '').capitalize()
+        if col in filtered.columns:
+            filtered = filtered[filtered[col] >= min_val]
+    if filtered.empty:
+        return None
+    return filtered.nlargest(1, score_col).iloc[0]['ID']
+
+def test_pools_are_sorted_by_score(recommender):
+    for positions, score_col in POSITION_POOLS.values():
+        pool = recommender._get_pool(positions, score_col)
+        assert len(pool.rows) > 0
+        assert np.all(np.diff(pool.scores) <= 0)
+        assert set(recommender.df['BestPosition'].iloc[pool.rows]) <= set(positions)
+
+def test_pool_selection_matches_full_scan(recommender):
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        positions, score_col = list(POSITION_POOLS.values())[rng.integers(len(POSITION_POOLS))]
+        criteria = {'min_overall': int(rng.integers(40, 90))}
+        budget = float(rng.integers(1, 60) * 1000000)
+        used_ids = set(rng.choice(recommender.df['ID'], 40).tolist())
+
+        picked = recommender._select_player(list(positions), score_col, criteria, budget, used_ids, 'X')
+        expected = _reference_pick(recommender.df, positions, score_col, criteria, budget, used_ids)
+
+        assert (picked is None and expected is None) or picked['ID'] == expected
+
+def test_generate_team_respects_budget_and_uniqueness(recommender):
+    team = recommender.generate_team(
+        description="equipo de prueba",
+        formation="4-3-3",
+        criteria={"GK": {"min_overall": 50}, "DEF": {}, "MID": {}, "ATT": {}},
+        budget=300000000
+    )
+
+    ids = [p['id'] for p in team['players']]
+    assert len(ids) == 11
+    assert len(set(ids)) == 11
+    assert team['total_value'] <= 300000000
+
+def test_matrix_scores_match_column_formulas(recommender):
+    # Las valoraciones son uint8: se suman en float para que no desborden
+    df = recommender.df.astype({col: 'float64' for col in SCORE_ATTRIBUTES})
+    np.testing.assert_allclose(df['GK_Score'], (df['Overall'] + df['Penalties'] + df['ShotPower']) / 3)
+    np.testing.assert_allclose(df['CB_Score'], (
+        df['Potential'] + df['Height'] + df['ShootingTotal'] + df['PassingTotal'] +
+        df['DefendingTotal'] + df['BallControl'] + df['Jumping'] + df['Interceptions'] +
+        df['Marking']) / 9)
+    # CM suma 13 atributos: el promedio divide por 13
+    np.testing.assert_allclose(df['CM_Score'], (
+        df['Potential'] + df['ShootingTotal'] + df['PassingTotal'] + df['DefendingTotal'] +
+        df['BallControl'] + df['Jumping'] + df['Interceptions'] + df['Marking'] +
+        df['Crossing'] + df['PhysicalityTotal'] + df['ShortPassing'] + df['Positioning'] +
+        df['Vision']) / 13)
+
+def test_custom_score_weights_reorder_candidates(recommender):
+    criteria = {"GK": {}, "DEF": {}, "MID": {}, "ATT": {}}
+    team = recommender.generate_team(
+        "pesos propios", "4-3-3", criteria, 500e6,
+        score_weights={'ST': {'SprintSpeed': 1.0}}
+    )
+
+    attackers = [p for p in team['players'] if p['position'] in ('ST', 'LW', 'RW')]
+    pool = recommender._get_pool(*POSITION_POOLS['ST'])
+    fastest = recommender.df.iloc[pool.rows].nlargest(3, 'SprintSpeed')['ID']
+    assert sorted(p['id'] for p in attackers) == sorted(fastest)
+
+    with pytest.raises(ValueError):
+        recommender.generate_team("pesos propios", "4-3-3", criteria, 500e6,
+                                  score_weights={'XX': {'Overall': 1.0}})
+    with pytest.raises(ValueError):
+        weight_matrix({'custom': {'Overall': -1.0}})
+
+def test_batch_matches_individual_requests(recommender):
+    requests = [
+        {
+            'description': "lote de prueba",
+            'formation': formation,
+            'criteria': {"GK": {"min_overall": 55}, "DEF": {"min_overall": 50}, "MID": {}, "ATT": {}},
+            'budget': budget,
+            'optimizer': optimizer,
+        }
+        for formation in ("4-3-3", "4-4-2")
+        for budget in (30e6, 90e6, 90e6)
+        for optimizer in ("greedy", "exact")
+    ]
+
+    teams = recommender.generate_teams(requests)
+
+    assert len(teams) == len(requests)
+    for request, team in zip(requests, teams):
+        assert team == recommender.generate_team(**request)
+
+def test_batch_endpoint(recommender):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.routers.teams import get_recommender
+
+    app.dependency_overrides[get_recommender] = lambda: recommender
+    try:
+        body = {
+            "team_description": "equipo ofensivo de prueba",
+            "budget": 80000000,
+            "criteria": {"GK": {"min_overall": 50}},
+        }
+        response = TestClient(app).post("/api/teams/generate:batch", json={"requests": [
+            {**body, "team_formation": "4-3-3"},
+            {**body, "team_formation": "4-4-2", "optimizer": "exact"},
+        ]})
+        invalid = TestClient(app).post("/api/teams/generate:batch", json={"requests": [
+            {**body, "team_formation": "4-4-3"},
+        ]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [team["formation"] for team in response.json()["teams"]] == ["4-3-3", "4-4-2"]
+    assert invalid.status_code == 400
+    assert "Solicitud 0" in invalid.json()["detail"]
+
+class CountingIndex:
+    """Envoltorio que cuenta las búsquedas sobre un índice FAISS real"""
+
+    def __init__(self, index):
+        self.index = index
+        self.searches = 0
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+    def search(self, *args, **kwargs):
+        self.searches += 1
+        return self.index.search(*args, **kwargs)
+
+def test_semantic_blend_uses_one_encode_and_one_search(tmp_path, stub_embedder):
+    from app.services.embeddings import generate_embeddings
+    df = make_players(400, seed=1)
+    embeddings, index = generate_embeddings(df.copy(), str(tmp_path / "e.faiss"),
+                                            embedder=stub_embedder, model_name="stub")
+    counting = CountingIndex(index)
+    recommender = TeamRecommender(df=df, embedder=stub_embedder, index=counting)
+    criteria = {"GK": {}, "DEF": {}, "MID": {}, "ATT": {}}
+
+    for optimizer in ("greedy", "exact"):
+        encoded, searches = stub_embedder.encoded, counting.searches
+        team = recommender.generate_team("equipo de toque", "4-3-3", criteria, 500e6,
+                                         optimizer=optimizer, semantic_weight=1.0)
+        assert len(team['players']) == 11
+        assert stub_embedder.encoded - encoded == 1
+        assert counting.searches - searches == 1
+
+    # Con peso 1 el portero elegido es el más cercano a la descripción
+    query = stub_embedder.encode(["equipo de toque"])[0]
+    gk_rows = recommender._get_pool(*POSITION_POOLS['GK']).rows
+    nearest = gk_rows[np.argmin(((embeddings[gk_rows] - query) ** 2).sum(axis=1))]
+    gk = next(p for p in team['players'] if p['position'] == 'GK')
+    assert gk['id'] == df['ID'].iloc[nearest]
+
+    # En un lote la misma descripción se codifica y busca una sola vez
+    encoded, searches = stub_embedder.encoded, counting.searches
+    recommender.generate_teams([
+        {'description': "equipo de toque", 'formation': formation, 'criteria': criteria,
+         'budget': 500e6, 'semantic_weight': 0.5}
+        for formation in ("4-3-3", "4-4-2", "3-5-2")
+    ])
+    assert stub_embedder.encoded - encoded == 1
+    assert counting.searches - searches == 1
+
+def test_picks_are_built_from_compact_arrays(recommender):
+    assert recommender.df['Overall'].dtype == np.uint8
+    assert recommender.df['GK_Score'].dtype == np.float32
+
+    player = recommender._player_from_row(0, 'GK')
+
+    # Escalares de Python: la suma de 11 valoraciones uint8 no debe desbordar
+    assert type(player['ID']) is int and type(player['Overall']) is int
+    assert type(player['ValueEUR']) is float